@@ -0,0 +1,317 @@
+"""
+桌面程序结果面板的分段文案
+
+每个函数都是生成器，按计算先后依次产出一段文字：先出四柱与八字分析，再出紫微斗数，
+最后才是需要检索知识库的古籍引证。界面层在后台线程中迭代，每得到一段就追加到结果面板。
+这里不依赖 Qt，可以直接在脚本或服务中复用。
+"""
+from bazi_calculator import (
+    calculate_bazi, analyze_bazi_lazy, generate_fortune_report, match_bazi, calculate_10_year_luck,
+    enrich_analysis, STEM_ELEMENT
+)
+from bazi_core import ELEMENT_INDEX
+from chart_context import chart_context
+from ziwei_calculator import generate_ziwei_report
+
+# 日元五行关系：(女方五行 - 男方五行) % 5
+ELEMENT_RELATIONS = ('比和', '相生', '相克', '被相克', '被相生')
+
+STRONG_ELEMENT_ADVICE = {
+    '木': ["穿着上可多选择白色、金色系衣物（金克木）", "居住环境中可增加金属类装饰物品"],
+    '火': ["穿着上可多选择黑色、蓝色系衣物（水克火）", "居住环境中可增加水元素装饰"],
+    '土': ["穿着上可多选择绿色、青色系衣物（木克土）", "居住环境中可增加植物"],
+    '金': ["穿着上可多选择红色、紫色系衣物（火克金）", "居住环境中可增加暖色调装饰"],
+    '水': ["穿着上可多选择黄色、棕色系衣物（土克水）", "居住环境中可增加陶瓷、石材装饰"]
+}
+
+WEAK_ELEMENT_ADVICE = {
+    '木': ["穿着上可多选择绿色、青色系衣物", "多接触大自然，种植绿色植物"],
+    '火': ["穿着上可多选择红色、紫色系衣物", "适当增加室内光线，使用暖色灯光"],
+    '土': ["穿着上可多选择黄色、棕色系衣物", "可佩戴玉石、玛瑙等土属性饰品"],
+    '金': ["穿着上可多选择白色、金色系衣物", "可佩戴金银饰品增强金气"],
+    '水': ["穿着上可多选择黑色、蓝色系衣物", "可在家中放置鱼缸或水培植物"]
+}
+
+STAR_ADVICE = [
+    ('紫微', "紫微坐命者，宜保持谦逊，避免过于自我，多倾听他人意见。"),
+    ('贪狼', "贪狼坐命者，宜控制欲望，专注于目标，避免三心二意。"),
+    ('七杀', "七杀坐命者，宜培养耐心，避免冲动行事，学会冷静思考。"),
+    ('破军', "破军坐命者，宜稳定情绪，避免变化过大，培养持之以恒的精神。"),
+    ('廉贞', "廉贞坐命者，宜保持正直，避免虚荣，培养务实作风。"),
+    ('天府', "天府坐命者，宜发挥领导才能，同时保持节俭，避免铺张浪费。")
+]
+
+# 女命额外参考的主星
+FEMALE_STAR_ADVICE = [
+    ('太阴', "太阴坐命者，宜保持乐观，避免多愁善感，培养积极心态。"),
+    ('天同', "天同坐命者，宜积极进取，避免懒散，培养上进心。")
+]
+
+
+def _stars_text(ziwei_report):
+    return '、'.join(ziwei_report['命宫主星']) if ziwei_report['命宫主星'] else '无主星'
+
+
+def _ziwei_text(ziwei_report, title='【紫微斗数分析】', judgment=True):
+    text = f"{title}\n"
+    text += f"命宫位置: {ziwei_report['命宫位置']}\n"
+    text += f"命宫主星: {_stars_text(ziwei_report)}\n"
+    text += f"身宫位置: {ziwei_report['身宫位置']}\n"
+    if judgment:
+        text += f"总体评断: {ziwei_report['总体评断']}\n"
+    return text + "\n"
+
+
+def _elements_text(analysis):
+    return ' '.join(f"{element}{count}" for element, count in analysis['五行分布'].items())
+
+
+def _citation_text(analysis, bazi_info):
+    cited = analysis.copy()
+    enrich_analysis(cited, analysis['日元'], bazi_info)
+    return "【古籍引证】\n" + cited['古籍引证'] + "\n"
+
+
+def _luck_text(luck_periods, brief=False):
+    text = ""
+    for i, period in enumerate(luck_periods):
+        summary = period['analysis'][:20] + "..." if brief else period['analysis']
+        text += f"第{i+1}步大运: {period['ganZhi']}\n"
+        text += f"年龄范围: {period['age']}-{period['endAge']}岁\n"
+        text += f"运势简析: {summary}\n"
+        text += "-" * (20 if brief else 40) + "\n"
+    return text
+
+
+def element_relation(male_stem, female_stem):
+    """男女日元的五行关系，以男方为主"""
+    diff = (ELEMENT_INDEX[STEM_ELEMENT[female_stem]] - ELEMENT_INDEX[STEM_ELEMENT[male_stem]]) % 5
+    return ELEMENT_RELATIONS[diff]
+
+
+def fortune_sections(year, month, day, hour, gender):
+    """个人算命页"""
+    ctx = chart_context(year, month, day, hour, gender)
+    bazi_info = calculate_bazi(ctx)
+    # 八字分析直接取自（有缓存的）运势报告，不再单独分析一遍
+    report = generate_fortune_report(ctx)
+    analysis = report['命理分析']
+    text = "个人命理分析报告\n"
+    text += "=" * 50 + "\n"
+    text += "【基本信息】\n"
+    text += f"出生日期: {year}年{month}月{day}日 {hour}时\n"
+    text += f"性别: {gender}\n"
+    text += f"八字: {bazi_info['four_pillars']}\n\n"
+    text += "【八字五行分析】\n"
+    text += f"日元: {analysis['日元']}\n"
+    text += f"日元五行: {STEM_ELEMENT[analysis['日元']]}\n"
+    text += "五行分布: " + ', '.join(f"{elem}: {count}个" for elem, count in analysis['五行分布'].items()) + "\n"
+    text += f"强弱势分析: {analysis['日主强弱']}\n"
+    text += f"性格分析: {analysis['性格分析']}\n"
+    text += f"事业分析: {analysis['事业分析']}\n"
+    text += f"运势概要: {analysis['运势概要']}\n\n"
+    yield text
+
+    yield _ziwei_text(generate_ziwei_report(ctx))
+
+    yield "【综合建议】\n" + f"{report['建议']}\n\n"
+
+    yield _citation_text(analysis, bazi_info)
+
+
+def person_sections(year, month, day, hour, gender, time_text=None):
+    """配对页单人算命（含十年大运）"""
+    ctx = chart_context(year, month, day, hour, gender)
+    bazi_info = calculate_bazi(ctx)
+    analysis = analyze_bazi_lazy(bazi_info)
+    me_stem = analysis['日元']
+    text = f"{gender}性命理分析报告\n"
+    text += "=" * 50 + "\n"
+    text += "【基本信息】\n"
+    text += f"出生日期: {year}年{month}月{day}日{time_text or f'{hour}时'}\n"
+    text += f"性别: {gender}\n"
+    text += f"八字: {bazi_info['four_pillars']}\n\n"
+    text += "【八字五行分析】\n"
+    text += f"日元: {me_stem}\n"
+    text += f"日元五行: {STEM_ELEMENT[me_stem]}\n"
+    text += f"五行分布: {_elements_text(analysis)}\n"
+    text += f"强弱势分析: {analysis['日主强弱']}\n"
+    text += f"性格分析: {analysis['性格分析']}\n"
+    text += f"运势概要: {analysis['运势概要']}\n"
+    text += f"事业分析: {analysis['事业分析']}\n\n"
+    yield text
+
+    yield _ziwei_text(generate_ziwei_report(ctx))
+
+    luck_periods = calculate_10_year_luck(ctx, me_stem=me_stem)
+    yield "【10年大运分析】\n" + _luck_text(luck_periods) + "\n"
+
+    yield _citation_text(analysis, bazi_info)
+
+
+def person_solution_sections(year, month, day, hour, gender):
+    """单人化解建议"""
+    ctx = chart_context(year, month, day, hour, gender)
+    bazi_info = calculate_bazi(ctx)
+    analysis = analyze_bazi_lazy(bazi_info)
+    text = f"{gender}性命理化解建议\n"
+    text += "=" * 50 + "\n\n"
+    text += "【八字五行要点】\n"
+    text += f"日元: {analysis['日元']}({STEM_ELEMENT[analysis['日元']]})\n"
+    text += f"五行分布: {_elements_text(analysis)}\n"
+    text += f"强弱势分析: {analysis['日主强弱']}\n\n"
+    yield text
+
+    ziwei_report = generate_ziwei_report(ctx)
+    yield _ziwei_text(ziwei_report, '【紫微斗数要点】', judgment=False)
+
+    # 根据五行强弱给出具体建议
+    counts = analysis['五行分布']
+    strong_element = max(counts.items(), key=lambda x: x[1])[0]
+    weak_element = min(counts.items(), key=lambda x: x[1])[0]
+    text = "【五行化解建议】\n"
+    text += f"1. 您的八字中{strong_element}元素较强，建议适当平衡，可通过以下方式：\n"
+    text += ''.join(f"   - {line}\n" for line in STRONG_ELEMENT_ADVICE[strong_element])
+    text += f"2. 您的八字中{weak_element}元素较弱，建议适当补充：\n"
+    text += ''.join(f"   - {line}\n" for line in WEAK_ELEMENT_ADVICE[weak_element])
+
+    text += "\n【紫微斗数化解建议】\n"
+    stars = ziwei_report.get('命宫主星', [])
+    rules = STAR_ADVICE + (FEMALE_STAR_ADVICE if gender == '女' else [])
+    advice = next((line for star, line in rules if star in stars),
+                  "根据您的命宫主星特点，建议保持积极心态，发挥自身优势。")
+    text += f"1. {advice}\n"
+    text += "2. 定期关注自己的运势变化，在不利年份采取保守策略。\n"
+    text += "3. 保持良好的心态和健康的生活习惯，是最根本的化解方法。\n"
+    yield text
+
+
+def _contexts(male, female):
+    """male / female: {'year', 'month', 'day', 'hour'}"""
+    return (chart_context(male['year'], male['month'], male['day'], male['hour'], '男'),
+            chart_context(female['year'], female['month'], female['day'], female['hour'], '女'))
+
+
+def _couple_charts(male, female):
+    male_ctx, female_ctx = _contexts(male, female)
+    male_bazi = calculate_bazi(male_ctx)
+    female_bazi = calculate_bazi(female_ctx)
+    return male_bazi, analyze_bazi_lazy(male_bazi), female_bazi, analyze_bazi_lazy(female_bazi)
+
+
+def _couple_ziwei(male, female):
+    male_ctx, female_ctx = _contexts(male, female)
+    return generate_ziwei_report(male_ctx), generate_ziwei_report(female_ctx)
+
+
+def couple_sections(male, female):
+    """男女配对分析；male / female 另可带 'time_text' 用于显示时辰"""
+    male_bazi, male_analysis, female_bazi, female_analysis = _couple_charts(male, female)
+    text = "男女配对分析报告\n"
+    text += "=" * 50 + "\n"
+    text += "【双方信息】\n"
+    for label, info, bazi, analysis in (('男性', male, male_bazi, male_analysis),
+                                        ('女性', female, female_bazi, female_analysis)):
+        text += f"{label}: {info['year']}年{info['month']}月{info['day']}日{info.get('time_text') or str(info['hour']) + '时'}\n"
+        text += f"八字: {bazi['four_pillars']}\n"
+        text += f"日元: {analysis['日元']}({STEM_ELEMENT[analysis['日元']]})\n\n"
+
+    compatibility = match_bazi(male, female)
+    text += "【八字配对分析】\n"
+    text += f"配对指数: {compatibility['score']}\n"
+    text += f"合婚关系: {element_relation(male_analysis['日元'], female_analysis['日元'])}\n"
+    text += f"{compatibility['level']}\n"
+    text += ''.join(f"{point}\n" for point in compatibility['analysis'])
+    yield text + "\n"
+
+    male_ziwei, female_ziwei = _couple_ziwei(male, female)
+    text = "【紫微斗数配对分析】\n"
+    text += f"男方命宫主星: {_stars_text(male_ziwei)}\n"
+    text += f"女方命宫主星: {_stars_text(female_ziwei)}\n"
+    male_main_star = male_ziwei.get('命宫主星', [])
+    female_main_star = female_ziwei.get('命宫主星', [])
+    if '紫微' in male_main_star and '天府' in female_main_star:
+        text += "主星配对评价: 紫微天府，帝王搭配，相辅相成，贵气十足。\n"
+    elif '贪狼' in male_main_star and '七杀' in female_main_star:
+        text += "主星配对评价: 贪狼七杀，个性强烈，需要相互包容理解。\n"
+    elif '天机' in male_main_star and '太阴' in female_main_star:
+        text += "主星配对评价: 天机太阴，聪明睿智，情感细腻，心灵相通。\n"
+    else:
+        text += "主星配对评价: 两人主星各具特色，需要相互欣赏对方的优点。\n"
+    yield text
+
+    male_ctx, female_ctx = _contexts(male, female)
+    male_luck = calculate_10_year_luck(male_ctx, me_stem=male_analysis['日元'])
+    female_luck = calculate_10_year_luck(female_ctx, me_stem=female_analysis['日元'])
+    text = "【双方大运分析】\n"
+    text += "男方大运:\n" + _luck_text(male_luck, brief=True)
+    text += "\n女方大运:\n" + _luck_text(female_luck, brief=True)
+    # 简化的大运配对建议，可按双方大运的五行生克关系细化
+    text += "\n【大运配对建议】\n"
+    text += "根据双方大运走势，建议关注以下几点：\n"
+    text += "1. 在对方大运波动较大的时期，给予更多理解和支持\n"
+    text += "2. 利用双方大运互补的阶段，共同规划重要人生决策\n"
+    text += "3. 注意双方大运可能产生冲突的时期，保持沟通和包容\n"
+    yield text
+
+
+def couple_solution_sections(male, female):
+    """配对化解建议"""
+    male_bazi, male_analysis, female_bazi, female_analysis = _couple_charts(male, female)
+    compatibility = match_bazi(male, female)
+    relation = element_relation(male_analysis['日元'], female_analysis['日元'])
+    text = "配对关系化解建议\n"
+    text += "=" * 50 + "\n\n"
+    text += "【配对要点】\n"
+    text += f"配对指数: {compatibility['score']}\n"
+    text += f"八字合婚关系: {relation}\n"
+    text += f"男方日元: {male_analysis['日元']}({STEM_ELEMENT[male_analysis['日元']]})\n"
+    text += f"女方日元: {female_analysis['日元']}({STEM_ELEMENT[female_analysis['日元']]})\n"
+    yield text
+
+    male_ziwei, female_ziwei = _couple_ziwei(male, female)
+    text = f"男方命宫主星: {_stars_text(male_ziwei)}\n"
+    text += f"女方命宫主星: {_stars_text(female_ziwei)}\n"
+
+    text += "【八字五行化解建议】\n"
+    if relation in ['相生', '被相生']:
+        text += "1. 两人五行相生，关系融洽，建议：\n"
+        text += "   - 保持现有的相处模式，相互支持鼓励\n"
+        text += "   - 在重要决策时，多听取对方意见\n"
+    elif relation in ['相克', '被相克']:
+        text += "1. 两人五行相克，需要注意：\n"
+        text += "   - 在沟通中保持耐心，避免正面冲突\n"
+        text += "   - 可通过中间五行来调和关系（如木克土，可用火来调和）\n"
+        text += "   - 在居住环境中，可放置两人都适合的风水物品\n"
+    else:
+        text += "1. 两人五行无特殊关系，建议：\n"
+        text += "   - 培养共同兴趣爱好，增进彼此了解\n"
+        text += "   - 尊重对方的生活习惯和个人空间\n"
+
+    text += "\n【紫微斗数化解建议】\n"
+    male_main_star = male_ziwei.get('命宫主星', [])
+    female_main_star = female_ziwei.get('命宫主星', [])
+    if ('紫微' in male_main_star and '天府' in female_main_star) or ('天府' in male_main_star and '紫微' in female_main_star):
+        text += "1. 紫微天府组合，贵气十足，但需注意：\n"
+        text += "   - 避免过于强势，学会相互包容\n"
+        text += "   - 合理分工，发挥各自优势\n"
+    elif ('贪狼' in male_main_star and '七杀' in female_main_star) or ('七杀' in male_main_star and '贪狼' in female_main_star):
+        text += "1. 贪狼七杀组合，个性强烈，建议：\n"
+        text += "   - 培养沟通技巧，避免冲动争吵\n"
+        text += "   - 寻找共同目标，增强协作精神\n"
+    elif ('天机' in male_main_star and '太阴' in female_main_star) or ('太阴' in male_main_star and '天机' in female_main_star):
+        text += "1. 天机太阴组合，聪明睿智，建议：\n"
+        text += "   - 多交流思想，分享心得\n"
+        text += "   - 共同学习成长，提升自我\n"
+    else:
+        text += "1. 根据两人主星特点，建议：\n"
+        text += "   - 相互欣赏对方的优点，包容缺点\n"
+        text += "   - 建立良好的沟通机制，及时解决问题\n"
+
+    text += "\n【关系改善建议】\n"
+    text += "1. 定期进行情感交流，分享生活点滴\n"
+    text += "2. 共同参与一些有益身心健康的活动，增进感情\n"
+    text += "3. 尊重彼此的家族文化和生活习惯\n"
+    text += "4. 在重要节日或纪念日，用心准备小礼物或惊喜\n"
+    text += "5. 如有需要，可咨询专业命理师进行更详细的合婚调理\n"
+    yield text
@@ -0,0 +1,297 @@
+"""
+命盘批量计算命令行
+
+从 CSV 或 JSONL 流式读取出生记录，分块交给进程池计算，按输入顺序逐块写出 JSONL 或 Parquet，
+内存占用只与在途块数有关。每写完一块就记录检查点，中断后加 --resume 从上次完成的位置继续。
+
+    python -m batch_cli births.csv -o charts.jsonl --sections pillars,analysis --workers 4
+    python -m batch_cli births.jsonl -o charts.parquet --sections pillars,ziwei --resume
+
+输入字段：year, month, day, hour, gender（男/女、M/F、1/0），其余字段原样带到输出。
+Parquet 输出是一个目录，每块一个 part 文件，各 part 共用同一个全字符串列的 schema；
+除四柱外的各部分以 JSON 字符串列存放。
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# 可选的计算部分，按开销从低到高
+SECTIONS = ('pillars', 'analysis', 'dayun', 'liunian', 'ziwei')
+DEFAULT_SECTIONS = ('pillars', 'analysis')
+CHUNK_SIZE = 500
+LIU_NIAN_START = 2025
+
+_GENDERS = {'男': '男', '女': '女', 'm': '男', 'f': '女', 'male': '男', 'female': '女', '1': '男', '0': '女'}
+
+# 各部分写入输出行的列
+SECTION_COLUMNS = {
+    'pillars': ('year_pillar', 'month_pillar', 'day_pillar', 'hour_pillar', 'four_pillars'),
+    'analysis': ('analysis',),
+    'dayun': ('dayun',),
+    'liunian': ('liunian',),
+    'ziwei': ('ziwei',),
+}
+
+
+def read_records(path):
+    """逐条产出输入记录（dict）；按扩展名区分 CSV 与 JSONL"""
+    if path.lower().endswith('.csv'):
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                yield row
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def _chunks(records, size, skip=0):
+    chunk = []
+    for i, record in enumerate(records):
+        if i < skip:
+            continue
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def output_columns(input_path, sections):
+    """输出行的全部列：输入字段在前，其后是选中部分的列，最后是 error"""
+    columns = {}
+    if input_path.lower().endswith('.csv'):
+        with open(input_path, 'r', encoding='utf-8-sig', newline='') as f:
+            columns.update(dict.fromkeys(csv.DictReader(f).fieldnames or ()))
+    else:
+        # JSONL 各行字段可能不同，先扫一遍取并集
+        for record in read_records(input_path):
+            columns.update(dict.fromkeys(record))
+    for section in sections:
+        columns.update(dict.fromkeys(SECTION_COLUMNS[section]))
+    columns['error'] = None
+    return list(columns)
+
+
+def compute_record(record, sections, liu_nian_start=LIU_NIAN_START):
+    """计算一条记录选中的部分，返回输出行（dict）"""
+    from bazi_calculator import calculate_bazi, analyze_bazi, calculate_10_year_luck, generate_liu_nians
+    from chart_context import ChartContext
+    from ziwei_calculator import generate_ziwei_report
+
+    out = dict(record)
+    try:
+        year, month, day, hour = (int(record[k]) for k in ('year', 'month', 'day', 'hour'))
+        gender = _GENDERS[str(record.get('gender', '男')).strip().lower()]
+        # 批量记录几乎不重复，直接新建上下文，不占用进程内的上下文缓存
+        ctx = ChartContext(year, month, day, hour, gender)
+        bazi_info = calculate_bazi(ctx)
+        if 'pillars' in sections:
+            out.update({
+                'year_pillar': bazi_info['year'],
+                'month_pillar': bazi_info['month'],
+                'day_pillar': bazi_info['day'],
+                'hour_pillar': bazi_info['hour'],
+                'four_pillars': bazi_info['four_pillars']
+            })
+        me_stem = bazi_info['day'][0]
+        if 'analysis' in sections:
+            out['analysis'] = analyze_bazi(bazi_info)
+        if 'dayun' in sections:
+            out['dayun'] = calculate_10_year_luck(ctx, me_stem=me_stem)
+        if 'liunian' in sections:
+            out['liunian'] = generate_liu_nians(liu_nian_start, me_stem)
+        if 'ziwei' in sections:
+            out['ziwei'] = generate_ziwei_report(ctx)
+    except Exception as e:
+        out['error'] = f"{type(e).__name__}: {e}"
+    return out
+
+
+def compute_chunk(records, sections, liu_nian_start=LIU_NIAN_START):
+    """在工作进程中执行"""
+    return [compute_record(record, sections, liu_nian_start) for record in records]
+
+
+class _InlineExecutor:
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class JsonlWriter:
+    def __init__(self, path, resume_state=None):
+        self.path = path
+        if resume_state is not None:
+            # 截掉检查点之后写了一半的内容
+            with open(path, 'a+b') as f:
+                f.truncate(resume_state['bytes'])
+            self.f = open(path, 'a', encoding='utf-8')
+        else:
+            self.f = open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        for row in rows:
+            self.f.write(json.dumps(row, ensure_ascii=False, default=str) + '\n')
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def state(self):
+        return {'bytes': self.f.tell()}
+
+    def close(self):
+        self.f.close()
+
+
+class ParquetWriter:
+    """每块写一个 part 文件，目录整体可由 pyarrow / pandas 作为数据集读取"""
+
+    def __init__(self, path, resume_state=None, columns=()):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise SystemExit("Parquet 输出需要安装 pyarrow: pip install pyarrow")
+        self.path = path
+        # 所有列统一为字符串类型，不按各块数据推断，某块整列为空时 part 之间的 schema 也一致
+        self.schema = pa.schema([(name, pa.string()) for name in columns])
+        os.makedirs(path, exist_ok=True)
+        self.parts = resume_state['parts'] if resume_state is not None else 0
+        # 清理检查点之后（或上次整体运行）留下的 part
+        for name in os.listdir(path):
+            if name.startswith('part-') and name.endswith('.parquet') and int(name[5:10]) >= self.parts:
+                os.remove(os.path.join(path, name))
+
+    def write(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.table({
+            name: [self._cell(row.get(name)) for row in rows] for name in self.schema.names
+        }, schema=self.schema)
+        target = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+        pq.write_table(table, target + '.tmp')
+        os.replace(target + '.tmp', target)
+        self.parts += 1
+
+    @staticmethod
+    def _cell(value):
+        # 嵌套结构转成 JSON 字符串，其余值转成字符串，与 schema 的字符串列对应
+        if isinstance(value, (dict, list, tuple)):
+            return json.dumps(value, ensure_ascii=False, default=str)
+        return None if value is None else str(value)
+
+    def state(self):
+        return {'parts': self.parts}
+
+    def close(self):
+        pass
+
+
+def _checkpoint_path(output):
+    return output.rstrip('/\\') + '.ckpt'
+
+
+def load_checkpoint(output, input_path, sections):
+    path = _checkpoint_path(output)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        ckpt = json.load(f)
+    if ckpt.get('input') != os.path.abspath(input_path) or ckpt.get('sections') != list(sections):
+        raise SystemExit(f"检查点 {path} 与本次的输入或 --sections 不一致，请删除后重新运行")
+    return ckpt
+
+
+def save_checkpoint(output, input_path, sections, offset, writer_state):
+    path = _checkpoint_path(output)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'input': os.path.abspath(input_path), 'sections': list(sections), 'offset': offset,
+                   'writer': writer_state}, f)
+    os.replace(path + '.tmp', path)
+
+
+def run(input_path, output, sections=DEFAULT_SECTIONS, workers=None, chunk_size=CHUNK_SIZE,
+        resume=False, liu_nian_start=LIU_NIAN_START, progress=None):
+    """批量计算，返回本次处理的记录数"""
+    sections = [s for s in SECTIONS if s in sections]
+    ckpt = load_checkpoint(output, input_path, sections) if resume else None
+    offset = ckpt['offset'] if ckpt else 0
+    writer_state = ckpt['writer'] if ckpt else None
+    if output.lower().endswith('.parquet'):
+        writer = ParquetWriter(output, writer_state, output_columns(input_path, sections))
+    else:
+        writer = JsonlWriter(output, writer_state)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else _InlineExecutor()
+    # 在途块数有上限，读入、计算、写出三者的内存都受控
+    max_in_flight = max(workers, 1) * 2
+    pending = deque()
+    processed = 0
+
+    def drain_one():
+        nonlocal offset, processed
+        future, count = pending.popleft()
+        writer.write(future.result())
+        offset += count
+        processed += count
+        save_checkpoint(output, input_path, sections, offset, writer.state())
+        if progress is not None:
+            progress(offset)
+
+    try:
+        for chunk in _chunks(read_records(input_path), chunk_size, skip=offset):
+            pending.append((executor.submit(compute_chunk, chunk, sections, liu_nian_start), len(chunk)))
+            if len(pending) >= max_in_flight:
+                drain_one()
+        while pending:
+            drain_one()
+    finally:
+        for future, _ in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+        writer.close()
+    return processed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m batch_cli', description='命盘批量计算')
+    parser.add_argument('input', help='输入文件（.csv 或 .jsonl）')
+    parser.add_argument('-o', '--output', required=True, help='输出文件（.jsonl，或 .parquet 目录）')
+    parser.add_argument('--sections', default=','.join(DEFAULT_SECTIONS),
+                        help=f"逗号分隔，可选 {','.join(SECTIONS)}；'all' 为全部")
+    parser.add_argument('--workers', type=int, default=None, help='进程数，默认 CPU 核数；1 为单进程')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='每块记录数，也是检查点粒度')
+    parser.add_argument('--liunian-start', type=int, default=LIU_NIAN_START, help='流年起始年份')
+    parser.add_argument('--resume', action='store_true', help='从检查点继续')
+    args = parser.parse_args(argv)
+
+    sections = SECTIONS if args.sections == 'all' else [s.strip() for s in args.sections.split(',') if s.strip()]
+    unknown = [s for s in sections if s not in SECTIONS]
+    if unknown:
+        parser.error(f"未知的部分: {', '.join(unknown)}")
+
+    count = run(args.input, args.output, sections, workers=args.workers, chunk_size=args.chunk_size,
+                resume=args.resume, liu_nian_start=args.liunian_start,
+                progress=lambda n: print(f"已完成 {n} 条", file=sys.stderr))
+    print(f"本次处理 {count} 条，结果写入 {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+八字批量分析 (NumPy)
+
+面向大批量人群的统计分析：整批出生时刻一次性转成整数编码，用数组运算得出
+四柱、五行计数、十神、旺衰与天乙贵人，全程不生成任何中文文案。
+需要展示时再用 iter_labels 按行惰性转换成中文。
+"""
+from datetime import date
+
+import numpy as np
+
+from fast_calendar import get_calendar, _EPOCH_ORDINAL, _JDN_OFFSET
+from bazi_core import (
+    TEN_GODS, STRENGTH, WU_XING, JIA_ZI,
+    TEN_GOD_MATRIX, TEN_GOD_BRANCH_MATRIX, STRENGTH_MATRIX, NOBLEMAN_MASK,
+    STEM_ELEMENT, BRANCH_ELEMENT
+)
+
+# 每行一张命盘；pillars 为年月日时的六十甲子序号，ten_gods 依次为 年干/月干/时干/日支
+BATCH_DTYPE = np.dtype([
+    ('pillars', np.uint8, (4,)),
+    ('elements', np.uint8, (5,)),
+    ('ten_gods', np.uint8, (4,)),
+    ('strength', np.uint8),
+    ('nobleman', np.bool_),
+    ('gender', np.uint8),
+])
+
+_TEN_GOD_MATRIX = np.array(TEN_GOD_MATRIX, dtype=np.uint8)
+_TEN_GOD_BRANCH_MATRIX = np.array(TEN_GOD_BRANCH_MATRIX, dtype=np.uint8)
+_STRENGTH_MATRIX = np.array(STRENGTH_MATRIX, dtype=np.uint8)
+_NOBLEMAN_MASK = np.array(NOBLEMAN_MASK, dtype=np.int32)
+_STEM_ELEMENT = np.array(STEM_ELEMENT, dtype=np.uint8)
+_BRANCH_ELEMENT = np.array(BRANCH_ELEMENT, dtype=np.uint8)
+_UNIX_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _ordinals(years, months, days):
+    """年月日数组转 date.toordinal() 序号数组；月、日不合法时抛 ValueError（与 date() 一致，不顺延）"""
+    if months.size and (months.min() < 1 or months.max() > 12):
+        raise ValueError("存在不合法的月份（应为 1-12）")
+    ym = (years - 1970).astype('datetime64[Y]').astype('datetime64[M]') + (months - 1).astype('timedelta64[M]')
+    first = ym.astype('datetime64[D]')
+    month_len = ((ym + 1).astype('datetime64[D]') - first).astype(np.int64)
+    if days.size and ((days < 1) | (days > month_len)).any():
+        raise ValueError("存在不合法的日期（日超出当月天数）")
+    d = first + (days - 1).astype('timedelta64[D]')
+    return d.astype(np.int64) + _UNIX_ORDINAL
+
+
+def _hours(hours):
+    """时数组，超出 0-23 时抛 ValueError"""
+    hours = np.asarray(hours, dtype=np.int64)
+    if hours.size and (hours.min() < 0 or hours.max() > 23):
+        raise ValueError("存在不合法的时辰（应为 0-23 时）")
+    return hours
+
+
+def pillar_codes_batch(years, months, days, hours):
+    """批量查四柱，返回 (N, 4) 的六十甲子序号数组；日期须在历表范围内"""
+    cal = get_calendar()
+    years = np.asarray(years, dtype=np.int64)
+    months = np.asarray(months, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    hours = _hours(hours)
+
+    ordinals = _ordinals(years, months, days)
+    start = date(cal.start_year, 1, 1).toordinal()
+    end = date(cal.end_year, 12, 31).toordinal()
+    if ordinals.size and (ordinals.min() < start or ordinals.max() > end):
+        raise ValueError(f"存在超出历表范围({cal.start_year}-{cal.end_year})的日期")
+    secs = (ordinals - _EPOCH_ORDINAL) * 86400 + hours * 3600
+
+    li_chun = np.frombuffer(cal.li_chun, dtype=np.int64)
+    jie = np.frombuffer(cal.jie, dtype=np.int64)
+
+    codes = np.empty((len(ordinals), 4), dtype=np.uint8)
+    codes[:, 0] = (cal._li_chun_year0 - 5 + np.searchsorted(li_chun, secs, side='right')) % 60
+    codes[:, 1] = (cal._month_base + np.searchsorted(jie, secs, side='right')) % 60
+    day_gz = (ordinals + _JDN_OFFSET - 11) % 60
+    codes[:, 2] = day_gz
+    zhi = ((hours + 1) // 2) % 12
+    day_gan = (day_gz + (hours == 23)) % 10
+    time_gan = (day_gan % 5 * 2 + zhi) % 10
+    codes[:, 3] = (6 * time_gan - 5 * zhi) % 60
+    return codes
+
+
+def _gender_codes(genders, n):
+    genders = np.asarray(genders)
+    if genders.dtype.kind in 'USO':
+        genders = genders == '男'
+    return np.broadcast_to(genders.astype(np.uint8), (n,))
+
+
+def analyze_bazi_batch(years, months, days, hours, genders):
+    """
+    批量八字分析，输入为等长数组（性别可为 '男'/'女' 或 1/0）。
+    返回 BATCH_DTYPE 结构化数组，result['elements'] 即 (N, 5) 五行计数（木火土金水）。
+    """
+    codes = pillar_codes_batch(years, months, days, hours)
+    n = len(codes)
+    stems = codes % 10
+    branches = codes % 12
+    me = stems[:, 2]
+
+    result = np.zeros(n, dtype=BATCH_DTYPE)
+    result['pillars'] = codes
+    result['gender'] = _gender_codes(genders, n)
+
+    # 五行计数：八个字各自的五行做 one-hot 后求和
+    elems = np.concatenate([_STEM_ELEMENT[stems], _BRANCH_ELEMENT[branches]], axis=1)
+    result['elements'] = np.eye(5, dtype=np.uint8)[elems].sum(axis=1)
+
+    # 十神：年干、月干、时干、日支本气
+    result['ten_gods'][:, 0] = _TEN_GOD_MATRIX[me, stems[:, 0]]
+    result['ten_gods'][:, 1] = _TEN_GOD_MATRIX[me, stems[:, 1]]
+    result['ten_gods'][:, 2] = _TEN_GOD_MATRIX[me, stems[:, 3]]
+    result['ten_gods'][:, 3] = _TEN_GOD_BRANCH_MATRIX[me, branches[:, 2]]
+
+    result['strength'] = _STRENGTH_MATRIX[me, branches[:, 1]]
+    masks = _NOBLEMAN_MASK[me]
+    result['nobleman'] = ((masks[:, None] >> branches.astype(np.int32)) & 1).any(axis=1)
+    return result
+
+
+def iter_labels(result):
+    """按行惰性地把批量结果转换为中文标签字典，只在需要展示时调用"""
+    for row in result:
+        pillars = [JIA_ZI[c] for c in row['pillars']]
+        gods = [TEN_GODS[c] for c in row['ten_gods']]
+        yield {
+            'four_pillars': ' '.join(pillars),
+            'gender': '男' if row['gender'] else '女',
+            '日元': pillars[2][0],
+            '旺衰': STRENGTH[row['strength']],
+            '十神': {'年干': gods[0], '月干': gods[1], '时干': gods[2], '日支': gods[3]},
+            '五行分布': dict(zip(WU_XING, (int(c) for c in row['elements']))),
+            '天乙贵人': bool(row['nobleman'])
+        }
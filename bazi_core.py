@@ -0,0 +1,94 @@
+"""
+八字整数编码核心
+
+天干 0-9 (甲..癸)、地支 0-11 (子..亥)、五行 0-4 (木火土金水)、六十甲子 0-59 (甲子..癸亥)。
+所有关系表在导入时一次算好，排盘分析只做下标运算，中文标签仅在输出时转换。
+"""
+
+TIAN_GAN = ('甲', '乙', '丙', '丁', '戊', '己', '庚', '辛', '壬', '癸')
+DI_ZHI = ('子', '丑', '寅', '卯', '辰', '巳', '午', '未', '申', '酉', '戌', '亥')
+WU_XING = ('木', '火', '土', '金', '水')
+# 十神编码 = 生克类别 * 2 + (阴阳不同 ? 1 : 0)
+TEN_GODS = ('比肩', '劫财', '食神', '伤官', '偏财', '正财', '七杀', '正官', '枭神', '正印')
+STRENGTH = ('旺', '相', '弱')
+
+STEM_INDEX = {s: i for i, s in enumerate(TIAN_GAN)}
+BRANCH_INDEX = {b: i for i, b in enumerate(DI_ZHI)}
+ELEMENT_INDEX = {e: i for i, e in enumerate(WU_XING)}
+JIA_ZI = tuple(TIAN_GAN[i % 10] + DI_ZHI[i % 12] for i in range(60))
+JIA_ZI_INDEX = {gz: i for i, gz in enumerate(JIA_ZI)}
+
+# 天干五行、阴阳(1阳0阴)
+STEM_ELEMENT = tuple(i // 2 for i in range(10))
+STEM_POLARITY = tuple(1 - i % 2 for i in range(10))
+# 地支五行
+BRANCH_ELEMENT = (4, 2, 0, 0, 2, 1, 1, 2, 3, 3, 2, 4)
+# 地支藏干，首位为本气
+BRANCH_HIDDEN_STEMS = (
+    (9,), (5, 9, 7), (0, 2, 4), (1,),
+    (4, 1, 9), (2, 6, 4), (3, 5), (5, 3, 1),
+    (6, 8, 4), (7,), (4, 7, 3), (8, 0)
+)
+BRANCH_MAIN_STEM = tuple(h[0] for h in BRANCH_HIDDEN_STEMS)
+
+
+def _ten_god(me, target):
+    relation = (STEM_ELEMENT[target] - STEM_ELEMENT[me]) % 5
+    return relation * 2 + (0 if STEM_POLARITY[me] == STEM_POLARITY[target] else 1)
+
+
+# 十神矩阵：TEN_GOD_MATRIX[日干][他干]
+TEN_GOD_MATRIX = tuple(tuple(_ten_god(me, t) for t in range(10)) for me in range(10))
+# 日干对地支本气的十神：TEN_GOD_BRANCH_MATRIX[日干][地支]
+TEN_GOD_BRANCH_MATRIX = tuple(tuple(TEN_GOD_MATRIX[me][BRANCH_MAIN_STEM[b]] for b in range(12)) for me in range(10))
+
+
+def _strength(stem, month_branch):
+    me = STEM_ELEMENT[stem]
+    month = BRANCH_ELEMENT[month_branch]
+    if me == month:
+        return 0
+    if (month + 1) % 5 == me:
+        return 1
+    return 2
+
+
+# 月令旺衰：STRENGTH_MATRIX[日干][月支]，0旺 1相 2弱
+STRENGTH_MATRIX = tuple(tuple(_strength(s, b) for b in range(12)) for s in range(10))
+
+# 天乙贵人（按日干取地支），以位掩码存放
+_GUI_REN = {0: (1, 7), 4: (1, 7), 6: (1, 7), 1: (0, 8), 5: (0, 8)}
+NOBLEMAN_MASK = tuple(sum(1 << b for b in _GUI_REN.get(s, ())) for s in range(10))
+
+
+def split(gz):
+    """六十甲子序号拆为 (天干, 地支)"""
+    return gz % 10, gz % 12
+
+
+def pillar_codes(y, m, d, h):
+    """四柱文字转六十甲子序号"""
+    return JIA_ZI_INDEX[y], JIA_ZI_INDEX[m], JIA_ZI_INDEX[d], JIA_ZI_INDEX[h]
+
+
+def element_counts(codes):
+    """四柱八字的五行计数，返回长度为5的列表（木火土金水）"""
+    counts = [0, 0, 0, 0, 0]
+    for gz in codes:
+        counts[STEM_ELEMENT[gz % 10]] += 1
+        counts[BRANCH_ELEMENT[gz % 12]] += 1
+    return counts
+
+
+def chart_codes(codes):
+    """
+    一张命盘的核心编码
+    返回 (日干, 十神(年干,月干,时干,日支), 五行计数, 旺衰, 是否带贵人)
+    """
+    y, m, d, h = codes
+    me = d % 10
+    row = TEN_GOD_MATRIX[me]
+    gods = (row[y % 10], row[m % 10], row[h % 10], TEN_GOD_BRANCH_MATRIX[me][d % 12])
+    mask = NOBLEMAN_MASK[me]
+    has_gui_ren = bool(mask & ((1 << (y % 12)) | (1 << (m % 12)) | (1 << (d % 12)) | (1 << (h % 12))))
+    return me, gods, element_counts(codes), STRENGTH_MATRIX[me][m % 12], has_gui_ren
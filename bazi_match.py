@@ -0,0 +1,155 @@
+"""
+批量合婚匹配 (NumPy)
+
+match_bazi 每评一对都要重新排两人的盘。这里先把每个人压缩成一条特征（日干、日支、年支、
+最弱/最强五行编码），再用查表 + 数组运算一次给成千上万对打分，规则与 match_bazi 完全一致：
+    基础 60 分；日干五合 +20，否则日干五行相同 +8；
+    日支相同 +5，日支相冲 -15；男方最弱五行 = 女方最强五行 +15；年支相冲 -5。
+
+一对多返回得分最高的 k 位候选；多对多按块流式产出，每块只保留各行的前 k 名，内存与候选池大小无关。
+"""
+import numpy as np
+
+from bazi_batch import analyze_bazi_batch
+
+# 每人一行
+FEATURE_DTYPE = np.dtype([
+    ('day_stem', np.uint8),
+    ('day_branch', np.uint8),
+    ('year_branch', np.uint8),
+    ('weak', np.uint8),
+    ('strong', np.uint8),
+])
+
+BASE_SCORE = 60
+COMPLEMENT_SCORE = 15
+# 单个分块最多的 (男 x 女) 格数，控制临时矩阵大小
+DEFAULT_BLOCK_CELLS = 1 << 22
+
+
+def _stem_pair(m, f):
+    if abs(m - f) == 5:
+        return 20
+    if m // 2 == f // 2:
+        return 8
+    return 0
+
+
+def _branch_pair(m, f):
+    if m == f:
+        return 5
+    if abs(m - f) == 6:
+        return -15
+    return 0
+
+
+# 日干配对分 STEM_PAIR_SCORE[男日干][女日干]，日支配对分、年支相冲扣分同理
+STEM_PAIR_SCORE = np.array([[_stem_pair(m, f) for f in range(10)] for m in range(10)], dtype=np.int16)
+BRANCH_PAIR_SCORE = np.array([[_branch_pair(m, f) for f in range(12)] for m in range(12)], dtype=np.int16)
+YEAR_PAIR_SCORE = np.array([[-5 if abs(m - f) == 6 else 0 for f in range(12)] for m in range(12)], dtype=np.int16)
+
+# 与 match_bazi 相同的等级划分
+LEVELS = ('磨合婚', '中等婚', '上等婚')
+
+
+def match_level(scores):
+    """得分 -> 等级编码（LEVELS 下标）"""
+    scores = np.asarray(scores)
+    return (scores >= 70).astype(np.uint8) + (scores >= 85)
+
+
+def features_from_batch(result):
+    """由 analyze_bazi_batch 的结果提取匹配特征"""
+    pillars = result['pillars']
+    feats = np.zeros(len(result), dtype=FEATURE_DTYPE)
+    feats['day_stem'] = pillars[:, 2] % 10
+    feats['day_branch'] = pillars[:, 2] % 12
+    feats['year_branch'] = pillars[:, 0] % 12
+    # argmin / argmax 取第一个极值，与 min/max 按 木火土金水 顺序遍历字典一致
+    feats['weak'] = result['elements'].argmin(axis=1)
+    feats['strong'] = result['elements'].argmax(axis=1)
+    return feats
+
+
+def person_features(years, months, days, hours):
+    """批量计算匹配特征；日期须在历表范围内"""
+    n = len(np.atleast_1d(years))
+    return features_from_batch(analyze_bazi_batch(years, months, days, hours, np.ones(n, dtype=np.uint8)))
+
+
+def _scores(m, f):
+    scores = (BASE_SCORE
+              + STEM_PAIR_SCORE[m['day_stem'], f['day_stem']]
+              + BRANCH_PAIR_SCORE[m['day_branch'], f['day_branch']]
+              + YEAR_PAIR_SCORE[m['year_branch'], f['year_branch']]
+              + COMPLEMENT_SCORE * (m['weak'] == f['strong']).astype(np.int16))
+    return np.clip(scores, 0, 100).astype(np.int16)
+
+
+def score_matrix(males, females):
+    """男 x 女 的得分矩阵 (int16)"""
+    return _scores(males[:, None], females[None, :])
+
+
+def score_pairs(males, females):
+    """逐对打分，males 与 females 等长"""
+    return _scores(males, females)
+
+
+def _top_k(scores, index, k):
+    """每行取前 k 名，分高在前、同分时序号小在前；返回 (序号, 得分)"""
+    k = min(k, scores.shape[1])
+    # 得分与序号合成一个排序键，分界处同分的候选也按序号取舍
+    span = int(index.max()) + 1 if index.size else 1
+    key = (100 - scores.astype(np.int64)) * span + index
+    if k < scores.shape[1]:
+        key = np.take_along_axis(key, np.argpartition(key, k - 1, axis=1)[:, :k], axis=1)
+    key.sort(axis=1)
+    return key % span, (100 - key // span).astype(np.int16)
+
+
+def iter_top_matches(males, females, k=10, block_cells=DEFAULT_BLOCK_CELLS):
+    """
+    多对多：按男方分块流式产出 (男方序号数组, 前 k 名女方序号 (b, k), 得分 (b, k))。
+    候选池过大时女方也分段计算，段间合并前 k 名，单块内存约为 block_cells 个 int16。
+    """
+    n_f = len(females)
+    if n_f == 0 or len(males) == 0:
+        return
+    col_block = min(n_f, max(k, block_cells))
+    row_block = max(1, block_cells // col_block)
+    for r0 in range(0, len(males), row_block):
+        rows = males[r0:r0 + row_block]
+        best_idx = best_scores = None
+        for c0 in range(0, n_f, col_block):
+            scores = score_matrix(rows, females[c0:c0 + col_block])
+            index = np.broadcast_to(np.arange(c0, c0 + scores.shape[1], dtype=np.int64), scores.shape)
+            idx, sc = _top_k(scores, index, k)
+            if best_idx is not None:
+                idx, sc = _top_k(np.concatenate([best_scores, sc], axis=1),
+                                 np.concatenate([best_idx, idx], axis=1), k)
+            best_idx, best_scores = idx, sc
+        yield np.arange(r0, r0 + len(rows)), best_idx, best_scores
+
+
+def top_matches(client, candidates, client_gender='男', k=10, block_cells=DEFAULT_BLOCK_CELLS):
+    """
+    一对多：client 为一条特征（FEATURE_DTYPE 标量或长度 1 的数组），candidates 为候选特征数组。
+    client_gender 决定谁按男方规则计分。返回 (候选序号, 得分)，按得分降序。
+    """
+    client = np.atleast_1d(np.asarray(client, dtype=FEATURE_DTYPE))[:1]
+    if client_gender == '男':
+        _, idx, scores = next(iter_top_matches(client, candidates, k, block_cells), (None, None, None))
+        if idx is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int16)
+        return idx[0], scores[0]
+    # 女方为客户：候选按男方计分，转置后即是一行
+    best_idx = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=np.int16)
+    step = max(k, block_cells)
+    for c0 in range(0, len(candidates), step):
+        scores = score_matrix(candidates[c0:c0 + step], client)[:, 0]
+        idx, sc = _top_k(np.concatenate([best_scores, scores])[None, :],
+                         np.concatenate([best_idx, np.arange(c0, c0 + len(scores))])[None, :], k)
+        best_idx, best_scores = idx[0], sc[0]
+    return best_idx, best_scores
@@ -0,0 +1,460 @@
+"""
+八字文案渲染层
+
+analyze_bazi_lazy 只算出一组紧凑编码（BaziCodes：四柱、十神、五行计数、旺衰、贵人、性别），
+返回的 BaziAnalysis 在某个字段第一次被访问时才把编码渲染成文字，并记住结果；
+analyze_bazi 仍返回渲染好全部字段的普通字典。
+合婚、批量统计等只读 日元 / 五行分布 的调用方因此不会为性格、事业、命程等长文案付出任何代价。
+
+所有文案都是模块级常量：能穷举的（性格、事业、人生命程、开运建议等）在导入时按编码拼好整句，
+渲染时只是下标查表；其余用模块级模板 format。
+"""
+from collections import namedtuple
+from collections.abc import MutableMapping
+
+from bazi_core import TIAN_GAN, WU_XING, TEN_GODS, STRENGTH, JIA_ZI, chart_codes
+
+# 一张命盘的分析编码：codes 为四柱六十甲子序号，gods 依次为 年干/月干/时干/日支 的十神，
+# counts 为木火土金水计数，strength 为 STRENGTH 下标
+BaziCodes = namedtuple('BaziCodes', ['codes', 'gods', 'counts', 'strength', 'gui_ren', 'gender'])
+
+NA_YIN_MAP = {
+    '甲子': '海中金', '乙丑': '海中金', '丙寅': '炉中火', '丁卯': '炉中火', '戊辰': '大林木', '己巳': '大林木',
+    '庚午': '路旁土', '辛未': '路旁土', '壬申': '剑锋金', '癸酉': '剑锋金', '甲戌': '山头火', '乙亥': '山头火',
+    '丙子': '涧下水', '丁丑': '涧下水', '戊寅': '城头土', '己卯': '城头土', '庚辰': '白蜡金', '辛巳': '白蜡金',
+    '壬午': '杨柳木', '癸未': '杨柳木', '甲申': '泉中水', '乙酉': '泉中水', '丙戌': '屋上土', '丁亥': '屋上土',
+    '戊子': '霹雳火', '己丑': '霹雳火', '庚寅': '松柏木', '辛卯': '松柏木', '壬辰': '长流水', '癸巳': '长流水',
+    '甲午': '沙中金', '乙未': '沙中金', '丙申': '山下火', '丁酉': '山下火', '戊戌': '平地木', '己亥': '平地木',
+    '庚子': '壁上土', '辛丑': '壁上土', '壬寅': '金箔金', '癸卯': '金箔金', '甲辰': '覆灯火', '乙巳': '覆灯火',
+    '丙午': '天河水', '丁未': '天河水', '戊申': '大驿土', '己酉': '大驿土', '庚戌': '钗钏金', '辛亥': '钗钏金',
+    '壬子': '桑柘木', '癸丑': '桑柘木', '甲寅': '大溪水', '乙卯': '大溪水', '丙辰': '沙中土', '丁巳': '沙中土',
+    '戊午': '天上火', '己未': '天上火', '庚申': '石榴木', '辛酉': '石榴木', '壬戌': '大海水', '癸亥': '大海水'
+}
+
+NA_YIN = tuple(NA_YIN_MAP[gz] for gz in JIA_ZI)
+
+GOD_POSITIONS = ('年干', '月干', '时干', '日支')
+
+STATUS_TEXT = (
+    '能量非常强（生正逢时）',
+    '能量比较稳（得令之助）',
+    '自身能量稍显不足（需要借力）'
+)
+
+SHEN_SHA_TEXT = (
+    "运势较为平稳，凡事需亲力亲为，一步一个脚印。",
+    "命中带【天乙贵人】：生活中总有‘及时雨’帮忙，遇到困难容易遇到愿意拉你一把的人。"
+)
+
+SUMMARY_TEMPLATE = "日元{stem}{element}，{status}，五行最缺【{weakest}】，宜以此为喜用。"
+
+# ---- 健康：按木火土金水依次检查“该行缺失或克它的一行过旺” ----
+
+HEALTH_DEFAULT = "身体底子不错，各方面气场还算平衡，注意保持锻炼。"
+HEALTH_TEXT = (
+    "【要注意肝胆】：最近是不是有点爱熬夜？别太累了。另外金气太旺对木有克制，注意下筋骨酸痛和眼部疲劳。",
+    "【要注意循环系统】：可能有点畏寒或者气血运行慢，平时多运动，少吃生冷，保护好心脏和眼睛。",
+    "【要注意脾胃】：容易消化不良或者胃口不好。吃饭要定时，别想太多，心思太重也伤脾胃。",
+    "【要注意呼吸道】：季节交替容易感冒咳嗽，皮肤也容易过敏。平时多喝温水，保持家里空气流通。",
+    "【要注意泌尿系统】：平时别憋尿，多喝淡盐水。冬天要注意保暖，别冻着腰部。"
+)
+
+# ---- 家庭：配偶按日支十神与性别，长辈按年干十神 ----
+
+SPOUSE_TEXT = (
+    "你的另一半比较务实能干，是你的‘贤内助’，对你的事业有实质性的支持。",
+    "你的另一半比较有威严，有事业心，你们性格上可能需要一定的磨合，但对方很有担当。",
+    "你的另一半很有才华，挺有生活格调，但也比较感性，你们在一起要注意情绪沟通。",
+    "你对感情看得很重，配偶和你比较同心，适合细水长流的生活。"
+)
+PARENTS_TEXT = (
+    "你属于白手起家型，早年比较辛苦，主要是靠自己闯荡。",
+    "家里长辈对你帮助很大，早期能从父母那儿得到不少照应。"
+)
+FAMILY_TEMPLATE = "{spouse} {parents}"
+_ZHENG_YIN = TEN_GODS.index('正印')
+
+# ---- 事业：月干十神 × 旺衰 ----
+
+CAREER_TYPES = {
+    '正官': '【公职管理型】：你做事有章法，适合在体制内、大型企业做管理。',
+    '七杀': '【开创英雄型】：你很有魄力，适合做销售、军警或自主创业。',
+    '正财': '【稳健商业型】：你对数字敏感，适合财务或固定的技术活儿。',
+    '偏财': '【灵活投资型】：你很有商业头脑，适合搞贸易、投资或跨行经营。',
+    '正印': '【名声教育型】：你很有学问气质，适合做老师、医生或事业单位。',
+    '枭神': '【奇才技术型】：你观察力敏锐，适合钻研偏门技术或玄学研究。',
+    '食神': '【福气才艺型】：你挺会享受生活，适合做设计、餐饮或演艺行业。',
+    '伤官': '【创意演说型】：你口才极好，适合做广告、咨询、律师。'
+}
+
+CAREER_DEFAULT = "综合素质全面，适合多元化发展。"
+CAREER_ADVICE = (
+    '当前你能量充沛，正是大施拳脚的好时机，建议主动出击，不宜过于保守。',
+    '当前气场平衡，适合稳步上升，在现有的平台上深耕细作会有极好收获。',
+    '当前能量稍显内敛，适合‘借势’发展，多寻找有能力的合伙人或依靠大平台，切忌单打独斗。'
+)
+CAREER_TEMPLATE = "你的格局属于【{god}格】。{base} \n{advice}"
+CAREER_TEXT = tuple(
+    tuple(CAREER_TEMPLATE.format(god=god, base=CAREER_TYPES.get(god, CAREER_DEFAULT), advice=advice)
+          for advice in CAREER_ADVICE)
+    for god in TEN_GODS
+)
+
+# ---- 性格：日干 × 旺衰 × 月令季节 ----
+
+SEASONS = ('春', '夏', '秋', '冬')
+BRANCH_SEASON = (3, 3, 0, 0, 0, 1, 1, 1, 2, 2, 2, 3)
+
+_TRAITS = {
+    '甲': {
+        '春': '生于春季，木气最旺，你像森林中的领头树，极具生命力和进取心。',
+        '夏': '生于夏季，火旺泄木，你虽然才华横溢，但容易感到疲惫，需要多沉淀自己。',
+        '秋': '生于秋季，金旺克木，你经过磨砺，性格异常坚韧，办事有规有矩。',
+        '冬': '生于冬季，水多木漂，你心思细腻但容易焦虑，需要寻找稳固的依靠。'
+    },
+    '乙': {
+        '春': '春天的花草最是娇艳，你人缘极好，性格温柔且极具韧性。',
+        '夏': '夏天的草木渴望甘露，你情感丰富且敏感，非常善于察言观色。',
+        '秋': '秋天的草木虽然干枯，却更有风骨，你办事利落，从不拖泥带水。',
+        '冬': '冬天的草木处于蛰伏，你性格低调，善于保护自己，是个深藏不露的高手。'
+    },
+    '丙': {
+        '春': '春阳和煦，你性格热情且懂得节制，是个极具号召力的伙伴。',
+        '夏': '盛夏骄阳，你气场强大，办事风风火火，但要注意控制脾气。',
+        '秋': '秋阳爽朗，你为人刚正不阿，喜欢直言不讳，办事讲效率。',
+        '冬': '冬日暖阳，你最是重情重义，在困难时刻总能给周围人带来希望。'
+    },
+    '丁': {
+        '春': '春季的灯火，温暖而不夺目，你心思缜密，非常有才气。',
+        '夏': '夏季的火焰，能量内敛，你对自己要求极高，注重精神追求。',
+        '秋': '秋季的烛光，显得格外珍贵，你观察力极其敏锐，能看透事物的本质。',
+        '冬': '冬夜的炉火，你是朋友圈里的主心骨，总能让人感到安心。'
+    },
+    '戊': {
+        '春': '春天的山峦，万物生发，你诚实稳重且富有创新精神。',
+        '夏': '夏季的大地，火土燥热，你性格固执但极度忠诚，是值得信赖的基石。',
+        '秋': '秋天的山川，宏伟深沉，你办事极有主见，格局非常大。',
+        '冬': '冬天的土地，厚重收敛，你喜欢独立思考，不随波逐流。'
+    },
+    '己': {
+        '春': '春季的田园，最适合耕耘，你多才多艺，是那种‘样样精通’的人。',
+        '夏': '夏季的干土，性格坚毅，虽然有时会感到委屈，但都能默默承受。',
+        '秋': '秋季的田野，正是收获时，你非常有经济头脑，很会理财。',
+        '冬': '冬季的泥土，包容性极强，你性格极好，是所有人公认的‘和事佬’。'
+    },
+    '庚': {
+        '春': '春天的铁器，不仅锋利且带有生机，你办事果断且敢于尝试新领域。',
+        '夏': '盛夏的熔炉，你经历过磨砺，眼光极高，极具开拓神精。',
+        '秋': '秋季的金气最旺，你就是那种典型的‘硬汉’性格，义薄云天。',
+        '冬': '冬天的金属，冰冷内含，你冷静睿智，在压力下表现最稳。'
+    },
+    '辛': {
+        '春': '春天的珠玉，光彩夺目，你追求极致的完美，生活极具品位。',
+        '夏': '夏季的饰品，清凉宜人，你性格高调但外冷内热，非常有才华。',
+        '秋': '秋天的金器，质地最正，你自尊心极强，不屑于与人同流合污。',
+        '冬': '冬天的白银，纯净无暇，你心思纯粹，对认定的事非常执着。'
+    },
+    '壬': {
+        '春': '春江水暖，你极具灵活性，脑筋转得比谁都快，总有新点子。',
+        '夏': '夏季的水流，能消暑降温，你是个极佳的协调者，擅长解决冲突。',
+        '秋': '秋汛之水，格局极其宏大，你志向远大，绝不甘于平凡。',
+        '冬': '冬天的寒潭，深不可测，你极具城府，是大规模谋划的天才。'
+    },
+    '癸': {
+        '春': '春雨润物，你好学且博爱，总是能给人带来温润的感受。',
+        '夏': '夏天的阵雨，性格直爽，虽然偶尔有脾气，但大家都知道那是为了大家好。',
+        '秋': '秋天的露水，灵感极强，你对艺术或玄学有天生的感悟力。',
+        '冬': '冬天的冰雪，外表清高内心纯洁，你有自己的独立世界，不被打扰。'
+    }
+}
+
+PERSONALITY_TEXT = tuple(
+    tuple(
+        tuple(f"你是【{TIAN_GAN[stem]}】{WU_XING[stem // 2]}命人，生于【{season}】季，"
+              f"状态{'（能量充沛）' if strength < 2 else '（需人扶持）'}：{_TRAITS[TIAN_GAN[stem]][season]}"
+              for season in SEASONS)
+        for strength in range(len(STRENGTH))
+    )
+    for stem in range(10)
+)
+
+# ---- 人生命程：年、月、时柱天干与日支的十神 ----
+
+_STAGE_DESCS = {
+    '年': {
+        '印': '早年得长辈庇佑，学业顺遂，根基稳固。',
+        '财': '出身环境较好，从小对金钱有概念，早年生活富足。',
+        '官': '家教甚严，从小表现出远超同龄人的自律。',
+        '杀': '早年生活多波折感，性格较同龄人更早成熟。',
+        '食': '童年生活无忧无虑，颇受宠爱，口福极佳。',
+        '比': '早年多与同辈玩闹，竞争感强，性格开朗。'
+    },
+    '月': {
+        '印': '青年时期贵人多助，适合在稳定机构发展名声。',
+        '财': '正值壮年，求财欲强，是事业积累的黄金期。',
+        '官': '职场运旺，易得领导提拔，适合在体制内发展。',
+        '杀': '青年期压力较大，但极具开创精神，适合自主创业。',
+        '才': '思维极其活跃，适合在多变的环境中寻求机遇。'
+    },
+    '时': {
+        '印': '晚年生活安逸，受后辈尊敬，精神世界富足。',
+        '财': '晚年财力雄厚，生活优渥，能享儿女之福。',
+        '官': '晚年德高望重，在家族或社群中极具威信。',
+        '杀': '晚年依然充满活力，闲不下来，喜欢折腾。',
+        '食': '晚年有口福，心态年轻，与子孙关系和谐。'
+    }
+}
+
+STAGE_DEFAULT = "平稳发展，波澜不惊。"
+
+
+def _stage_text(stage, god):
+    # 按十神名中的关键字依次匹配
+    for key, text in _STAGE_DESCS[stage].items():
+        if key in god:
+            return text
+    return STAGE_DEFAULT
+
+
+STAGE_NAMES = ('早年(1-16岁)', '青年(17-32岁)', '中年(33-48岁)', '晚年(49岁后)')
+STAGE_TEXT = (
+    tuple(f"【年柱：根基】{_stage_text('年', god)}" for god in TEN_GODS),
+    tuple(f"【月柱：事业】{_stage_text('月', god)}" for god in TEN_GODS),
+    tuple(f"【日柱：核心】日坐‘{god}’。这是你人生最关键的转化期，家庭与自我的平衡是主题。" for god in TEN_GODS),
+    tuple(f"【时柱：归宿】{_stage_text('时', god)}" for god in TEN_GODS)
+)
+
+# ---- 开运建议：最弱的一行 ----
+
+_LUCKY = {
+    '木': {
+        '颜色': '绿色、青色、翠色、藏青色',
+        '饰品': '木质手串（如小叶紫檀、沉香、黄花梨）、绿幽灵水晶、绿松石、翡翠、孔雀石',
+        '家装': '室内多摆放阔叶长青植物，装修风格宜偏向原木风，多用棉麻质地的窗帘或地毯。',
+        '建议': '多前往公园、森林等植被茂密处散步。心态上要保持生发之气，多学习新知识，像树木一样向上生长。服饰宜选择舒适透气的天然材质。'
+    },
+    '火': {
+        '颜色': '红色、粉色、紫色、暖橘色',
+        '饰品': '红玛瑙、南红、红宝石、朱砂、紫水晶、石榴石',
+        '家装': '室内灯光宜选择暖色调，可以点缀一些红色系的靠枕或挂画，营造温馨、热烈的氛围。',
+        '建议': '性格要积极阳光，多参加聚会、演讲等社交活动。工作上适合站在前台展示自己。服饰宜选择鲜艳、亮丽的色调，材质可以多用丝绸。'
+    },
+    '土': {
+        '颜色': '黄色、咖啡色、棕色、卡其色、米灰色',
+        '饰品': '玉石（和氏璧、黄龙玉）、蜜蜡、黄水晶、陶瓷质地饰品、琥珀',
+        '家装': '家具宜稳重厚实，多用陶瓷、石材作为装饰品。色调应保持沉稳，给人以安全感。',
+        '建议': '为人处世要脚踏实地，诚信为本。适合进行冥想、登山等活动，多亲近土地和自然。服饰宜选择厚实耐穿的布料，剪裁大方得体。'
+    },
+    '金': {
+        '颜色': '白色、金色、银色、杏色、金属色',
+        '饰品': '金银首饰、白水晶、钛晶、金属材质的手表、砗磲、珍珠',
+        '家装': '可以多使用一些金属材质的线条进行点缀，整体风格宜简约明亮，保持环境的整洁干净。',
+        '建议': '处事要果断利落，坚持正义和原则。适合进行器械健身等有质感的运动。服饰宜选择挺括的空间感版型，展现利落的气质。'
+    },
+    '水': {
+        '颜色': '黑色、蓝色、暗蓝色、灰黑色',
+        '饰品': '黑曜石、海蓝宝、深色珍珠、黑发晶、蓝宝石、深色墨玉',
+        '家装': '可以考虑在室内放置流水摆件或鱼缸，家具色调宜沉静。空间动线宜圆润，避免过多尖锐棱角。',
+        '建议': '处事要圆润灵活，顺势而为，像水一样具有包容力。适合游泳、垂钓等水边的休闲活动。服饰宜选择轻盈、飘逸的材质。'
+    }
+}
+
+LUCKY_TEXT = tuple(
+    f"【色彩开运】：建议日常多穿着【{res['颜色']}】系的服饰。 \n【饰品改运】：佩戴【{res['饰品']}】能有效增强你的气场，平衡五行，驱邪避灾。 \n【居家开运】：{res['家装']} \n【生活智慧】：{res['建议']}"
+    for res in (_LUCKY[e] for e in WU_XING)
+)
+
+
+# ---- 编码 ----
+
+def analysis_codes(codes, gender):
+    """由四柱序号与性别得到分析编码"""
+    _, gods, counts, strength, has_gui_ren = chart_codes(codes)
+    return BaziCodes(tuple(codes), gods, tuple(counts), strength, has_gui_ren, gender)
+
+
+def weakest_element(counts):
+    """计数最少的五行下标，并列时取木火土金水中靠前者"""
+    return counts.index(min(counts))
+
+
+def health_code(counts):
+    """HEALTH_TEXT 下标；各行都平衡时为 None"""
+    for e in range(5):
+        if counts[e] == 0 or counts[(e + 3) % 5] >= 4:
+            return e
+    return None
+
+
+def spouse_code(spouse_god, gender):
+    if spouse_god in (4, 5) and gender == '男':
+        return 0
+    if spouse_god in (6, 7) and gender == '女':
+        return 1
+    if spouse_god in (2, 3):
+        return 2
+    return 3
+
+
+# ---- 文案 ----
+
+def health_text(counts):
+    code = health_code(counts)
+    return HEALTH_DEFAULT if code is None else HEALTH_TEXT[code]
+
+
+def family_text(spouse_god, year_god, gender):
+    """spouse_god 为日支十神，year_god 为年干十神"""
+    return FAMILY_TEMPLATE.format(spouse=SPOUSE_TEXT[spouse_code(spouse_god, gender)],
+                                  parents=PARENTS_TEXT[year_god == _ZHENG_YIN])
+
+
+def life_stages_text(year_god, month_god, day_god, hour_god):
+    """四柱对应的人生四个阶段；day_god 为日支十神，其余为天干十神"""
+    return {
+        STAGE_NAMES[0]: STAGE_TEXT[0][year_god],
+        STAGE_NAMES[1]: STAGE_TEXT[1][month_god],
+        STAGE_NAMES[2]: STAGE_TEXT[2][day_god],
+        STAGE_NAMES[3]: STAGE_TEXT[3][hour_god]
+    }
+
+
+# ---- 各字段渲染 ----
+
+def _me(c):
+    return c.codes[2] % 10
+
+
+def _render_day_master(c):
+    return TIAN_GAN[_me(c)]
+
+
+def _render_status(c):
+    return STATUS_TEXT[c.strength]
+
+
+def _render_ten_gods(c):
+    return {pos: TEN_GODS[g] for pos, g in zip(GOD_POSITIONS, c.gods)}
+
+
+def _render_elements(c):
+    return dict(zip(WU_XING, c.counts))
+
+
+def _render_na_yin(c):
+    return {'年': NA_YIN[c.codes[0]], '月': NA_YIN[c.codes[1]], '日': NA_YIN[c.codes[2]], '时': NA_YIN[c.codes[3]]}
+
+
+def _render_shen_sha(c):
+    return SHEN_SHA_TEXT[c.gui_ren]
+
+
+def _render_personality(c):
+    return PERSONALITY_TEXT[_me(c)][c.strength][BRANCH_SEASON[c.codes[1] % 12]]
+
+
+def _render_career(c):
+    return CAREER_TEXT[c.gods[1]][c.strength]
+
+
+def _render_family(c):
+    return family_text(c.gods[3], c.gods[0], c.gender)
+
+
+def _render_health(c):
+    return health_text(c.counts)
+
+
+def _render_life_stages(c):
+    return life_stages_text(c.gods[0], c.gods[1], c.gods[3], c.gods[2])
+
+
+def _render_summary(c):
+    me = _me(c)
+    return SUMMARY_TEMPLATE.format(stem=TIAN_GAN[me], element=WU_XING[me // 2], status=STATUS_TEXT[c.strength],
+                                   weakest=WU_XING[weakest_element(c.counts)])
+
+
+def _render_lucky(c):
+    return LUCKY_TEXT[weakest_element(c.counts)]
+
+
+# 字段顺序即 analyze_bazi 原有的输出顺序
+RENDERERS = {
+    '日元': _render_day_master,
+    '日主强弱': _render_status,
+    '十神': _render_ten_gods,
+    '五行分布': _render_elements,
+    '纳音': _render_na_yin,
+    '神煞提示': _render_shen_sha,
+    '性格分析': _render_personality,
+    '事业分析': _render_career,
+    '家庭分析': _render_family,
+    '健康分析': _render_health,
+    '人生命程': _render_life_stages,
+    '运势概要': _render_summary,
+    '开运建议': _render_lucky
+}
+ANALYSIS_FIELDS = tuple(RENDERERS)
+
+
+class BaziAnalysis(MutableMapping):
+    """
+    analyze_bazi_lazy 的结果：按字段惰性渲染的映射，读写用法与字典相同，但不是 dict，序列化前先 to_dict()。
+    写入的新键（如 enrich_analysis 的 古籍引证）追加在末尾；to_dict 渲染全部字段得到普通字典。
+    """
+    __slots__ = ('codes', '_values', '_keys')
+
+    def __init__(self, codes):
+        self.codes = codes
+        self._values = {}
+        self._keys = ANALYSIS_FIELDS
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        if key not in self._keys:
+            raise KeyError(key)
+        value = self._values[key] = RENDERERS[key](self.codes)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self._keys:
+            self._keys = self._keys + (key,)
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        self._keys = tuple(k for k in self._keys if k != key)
+        self._values.pop(key, None)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __getstate__(self):
+        return self.codes, self._values, self._keys
+
+    def __setstate__(self, state):
+        self.codes, self._values, self._keys = state
+
+    def copy(self):
+        """浅拷贝，已渲染的字段随之复制，其余仍按需渲染"""
+        other = BaziAnalysis(self.codes)
+        other._values = dict(self._values)
+        other._keys = self._keys
+        return other
+
+    def to_dict(self):
+        return {key: self[key] for key in self._keys}
+
+    def __repr__(self):
+        return f"BaziAnalysis({self.to_dict()!r})"
@@ -0,0 +1,11 @@
+"""
+性能基准
+
+覆盖八字、紫微与知识库检索的热点路径，结果写成 JSON，可与保存的基线比较找出退化：
+
+    python -m benchmarks run --out bench.json            # 全量
+    python -m benchmarks run --quick --out bench.json    # 缩小样本，适合日常改动后快速对比
+    python -m benchmarks compare baseline.json bench.json --threshold 0.15
+
+需在仓库根目录下运行。
+"""
@@ -0,0 +1,61 @@
+import argparse
+import sys
+
+from benchmarks import harness
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='八字/紫微/知识库性能基准')
+    sub = parser.add_subparsers(dest='command')
+
+    run = sub.add_parser('run', help='运行基准并写出 JSON')
+    run.add_argument('--out', default='bench_results.json', help='结果文件')
+    run.add_argument('--quick', action='store_true', help='缩小样本规模')
+    run.add_argument('--repeat', type=int, default=5, help='每项计时轮数')
+    run.add_argument('-k', dest='select', action='append', help='只运行名称包含该子串的基准，可多次指定')
+    run.add_argument('--baseline', help='运行后直接与该基线比较')
+    run.add_argument('--threshold', type=float, default=0.1, help='判定退化的相对阈值')
+
+    cmp_ = sub.add_parser('compare', help='与基线比较，出现退化时返回非零退出码')
+    cmp_.add_argument('baseline')
+    cmp_.add_argument('current')
+    cmp_.add_argument('--threshold', type=float, default=0.1, help='判定退化的相对阈值')
+
+    startup = sub.add_parser('startup', help='检查各模块的导入耗时预算与重型依赖，超出时返回非零退出码')
+    startup.add_argument('-m', dest='modules', action='append', help='只检查该模块，可多次指定')
+    startup.add_argument('--repeat', type=int, default=5, help='每个模块导入的次数，取中位数')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        from benchmarks import cases  # noqa: F401  注册用例
+        data = harness.run_all(quick=args.quick, select=args.select, repeat=args.repeat)
+        harness.save(data, args.out)
+        print(f"结果已写入 {args.out}")
+        if args.baseline:
+            return _report(harness.load(args.baseline), data, args.threshold)
+        return 0
+    if args.command == 'startup':
+        from benchmarks import startup as startup_check
+        failures = startup_check.check(args.modules, repeat=args.repeat)
+        if failures:
+            print("\n" + "\n".join(failures))
+            return 1
+        return 0
+    if args.command == 'compare':
+        return _report(harness.load(args.baseline), harness.load(args.current), args.threshold)
+    parser.print_help()
+    return 2
+
+
+def _report(baseline, current, threshold):
+    rows = harness.compare(baseline, current, threshold)
+    print(harness.format_comparison(rows))
+    regressions = [row for row in rows if row[4] == '退化']
+    if regressions:
+        print(f"\n{len(regressions)} 项退化超过 {threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
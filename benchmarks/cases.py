@@ -0,0 +1,403 @@
+"""
+基准用例
+
+出生时刻从 1920–2030 年间“每一天的每一个小时”中均匀抽样（固定随机种子，结果可复现）；
+知识库用例按 10 ~ 10000 篇合成文档分档，文档由命理术语与常用词随机拼成。
+"""
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import date
+
+from benchmarks.harness import case, measure, measure_once, ROOT, ensure_path
+
+ensure_path()
+
+SEED = 20240601
+FIRST_DAY = date(1920, 1, 1).toordinal()
+LAST_DAY = date(2030, 12, 31).toordinal()
+KB_SIZES = (10, 100, 1000, 10000)
+KB_SIZES_QUICK = (10, 100, 1000)
+
+
+def birth_sample(n, seed=SEED):
+    """[(年, 月, 日, 时, 性别)]，在 1920–2030 的所有小时中均匀抽样"""
+    rng = random.Random(seed)
+    sample = []
+    for _ in range(n):
+        d = date.fromordinal(rng.randint(FIRST_DAY, LAST_DAY))
+        sample.append((d.year, d.month, d.day, rng.randrange(24), rng.choice('男女')))
+    return sample
+
+
+def _size(quick, full, small):
+    return small if quick else full
+
+
+@case('bazi.calculate_bazi')
+def bench_calculate_bazi(quick):
+    from bazi_calculator import calculate_bazi
+    births = birth_sample(_size(quick, 5000, 500))
+
+    def op():
+        for y, m, d, h, g in births:
+            calculate_bazi(y, m, d, h, g)
+    return op, len(births)
+
+
+@case('bazi.analyze_bazi')
+def bench_analyze_bazi(quick):
+    """只取 五行分布（合婚等调用方的用法） vs 渲染全部文案"""
+    from bazi_calculator import calculate_bazi, analyze_bazi, analyze_bazi_lazy
+    infos = [calculate_bazi(*b) for b in birth_sample(_size(quick, 5000, 500))]
+
+    def op():
+        for info in infos:
+            analyze_bazi_lazy(info)['五行分布']
+
+    def render_all():
+        for info in infos:
+            analyze_bazi(info)
+    return {'bazi.analyze_bazi': (op, len(infos)), 'bazi.analyze_bazi.render_all': (render_all, len(infos))}
+
+
+@case('bazi.calculate_10_year_luck')
+def bench_10_year_luck(quick):
+    from bazi_calculator import calculate_bazi, calculate_10_year_luck
+    births = birth_sample(_size(quick, 500, 50))
+    stems = [calculate_bazi(*b)['day'][0] for b in births]
+
+    def op():
+        for (y, m, d, h, g), stem in zip(births, stems):
+            calculate_10_year_luck(y, m, d, h, g, stem)
+    return op, len(births)
+
+
+@case('bazi.generate_liu_nians')
+def bench_liu_nians(quick):
+    from bazi_calculator import generate_liu_nians
+    from bazi_core import TIAN_GAN
+    rounds = _size(quick, 200, 20)
+
+    def op():
+        for i in range(rounds):
+            generate_liu_nians(2000 + i % 50, TIAN_GAN[i % 10])
+    return op, rounds
+
+
+@case('ziwei.analyze_ziwei')
+def bench_analyze_ziwei(quick):
+    from ziwei_calculator import analyze_ziwei
+    births = birth_sample(_size(quick, 2000, 200))
+
+    def op():
+        for b in births:
+            analyze_ziwei(*b)
+    return op, len(births)
+
+
+@case('ziwei.chart')
+def bench_ziwei_chart(quick):
+    """纯编码排盘：仅十四主星 vs 含辅星、四化的完整命盘"""
+    from chart_context import ChartContext
+    from ziwei_core import ziwei_codes, ziwei_chart
+    keys = []
+    for b in birth_sample(_size(quick, 20000, 2000)):
+        ctx = ChartContext(*b)
+        keys.append((ctx.lunar_month, ctx.lunar_day, ctx.time_zhi, (ctx.lunar_year - 4) % 10, (ctx.lunar_year - 4) % 12))
+
+    def main_only():
+        for m, d, h, s, _ in keys:
+            ziwei_codes(m, d, h, s)
+
+    def full():
+        for key in keys:
+            ziwei_chart(*key)
+    return {'ziwei.chart.main_stars': (main_only, len(keys)), 'ziwei.chart.full': (full, len(keys))}
+
+
+@case('ziwei.analyze_ziwei_batch')
+def bench_analyze_ziwei_batch(quick):
+    import numpy as np
+    from ziwei_batch import analyze_ziwei_batch
+    births = birth_sample(_size(quick, 100000, 10000))
+    columns = [np.array(col) for col in list(zip(*births))[:4]]
+
+    def op():
+        analyze_ziwei_batch(*columns)
+    return op, len(births)
+
+
+@case('codec.chart')
+def bench_chart_codec(quick):
+    """紧凑编码：编码、解码与由编码渲染完整报告（清空报告缓存后计时）"""
+    from chart_cache import report_cache
+    from chart_context import ChartContext
+    from chart_codec import encode_chart, decode_chart, render_report
+    contexts = [ChartContext(*b) for b in birth_sample(_size(quick, 5000, 500))]
+    blobs = [encode_chart(ctx) for ctx in contexts]
+
+    def encode():
+        for ctx in contexts:
+            encode_chart(ctx)
+
+    def decode():
+        for data in blobs:
+            decode_chart(data)
+
+    def render():
+        report_cache.clear()
+        for data in blobs[:200]:
+            render_report(data)
+    return {'codec.chart.encode': (encode, len(contexts)), 'codec.chart.decode': (decode, len(blobs)),
+            'codec.chart.render': (render, min(len(blobs), 200))}
+
+
+@case('bazi.match_bazi')
+def bench_match_bazi(quick):
+    from bazi_calculator import match_bazi
+    births = birth_sample(_size(quick, 2000, 200))
+    pairs = [({'year': a[0], 'month': a[1], 'day': a[2], 'hour': a[3]},
+              {'year': b[0], 'month': b[1], 'day': b[2], 'hour': b[3]})
+             for a, b in zip(births[::2], births[1::2])]
+
+    def op():
+        for male, female in pairs:
+            match_bazi(male, female)
+    return op, len(pairs)
+
+
+@case('match.top_k')
+def bench_match_top_k(quick):
+    """一对多取前 10 名：全量向量化打分 vs 分桶索引"""
+    import numpy as np
+    from bazi_match import person_features, top_matches
+    from match_index import MatchIndex
+    births = birth_sample(_size(quick, 50000, 5000), seed=SEED + 2)
+    feats = person_features(*(np.array(col) for col in list(zip(*births))[:4]))
+    index = MatchIndex()
+    index.add_many(range(len(feats)), feats)
+    clients = feats[:_size(quick, 200, 50)]
+
+    def scan():
+        for client in clients:
+            top_matches(client, feats, k=10)
+
+    def indexed():
+        for client in clients:
+            index.query(client, k=10)
+    return {
+        f'match.top_k.scan.{len(feats)}': (scan, len(clients)),
+        f'match.top_k.index.{len(feats)}': (indexed, len(clients))
+    }
+
+
+@case('report.generate_fortune_report')
+def bench_fortune_report(quick):
+    """冷：清空缓存后首次生成；热：同一批命盘再次请求，全部命中缓存"""
+    from bazi_calculator import generate_fortune_report
+    from chart_cache import report_cache
+    births = birth_sample(_size(quick, 300, 30), seed=SEED + 1)
+
+    def op():
+        for b in births:
+            generate_fortune_report(*b)
+
+    report_cache.clear()
+    cold = measure_once(op, len(births))
+    return {
+        'report.generate_fortune_report.cold': cold,
+        'report.generate_fortune_report.warm': (op, len(births))
+    }
+
+
+@case('startup.import')
+def bench_import(quick):
+    """新进程导入主要模块的耗时（进程冷启动）"""
+    workdir = tempfile.mkdtemp(prefix='bench_import_')
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+
+    def importer(module):
+        def op():
+            subprocess.run([sys.executable, '-c', f'import {module}'], cwd=workdir, env=env,
+                           check=True, capture_output=True)
+        return op
+
+    try:
+        return {
+            'startup.import.bazi_calculator': measure(importer('bazi_calculator'), 1, repeat=3),
+            'startup.import.ziwei_calculator': measure(importer('ziwei_calculator'), 1, repeat=3),
+            'startup.import.knowledge_base': measure(importer('knowledge_base'), 1, repeat=3)
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ---- 知识库 ----
+
+_FILLER = ['命主', '一生', '早年', '中年', '晚年', '财运', '官运', '婚姻', '子女', '父母', '兄弟', '朋友',
+           '身强', '身弱', '喜用', '忌神', '格局', '清贵', '富贵', '辛劳', '平稳', '波折', '吉利', '凶险',
+           '大运', '流年', '逢之', '则主', '必然', '多有', '少见', '可期', '不宜', '宜于']
+_GODS = ['比肩', '劫财', '食神', '伤官', '偏财', '正财', '七杀', '正官', '偏印', '正印']
+_STARS = ['紫微', '天机', '太阳', '武曲', '天同', '廉贞', '天府', '太阴', '贪狼', '巨门', '天相', '天梁', '破军']
+_STEMS = ['甲', '乙', '丙', '丁', '戊', '己', '庚', '辛', '壬', '癸']
+
+
+def synthetic_document(rng, length=500):
+    parts = []
+    size = 0
+    while size < length:
+        roll = rng.random()
+        if roll < 0.15:
+            word = rng.choice(_GODS)
+        elif roll < 0.25:
+            word = rng.choice(_STARS)
+        elif roll < 0.32:
+            word = rng.choice(_STEMS) + '日'
+        else:
+            word = rng.choice(_FILLER)
+        parts.append(word)
+        size += len(word)
+        if rng.random() < 0.12:
+            parts.append('。')
+    return ''.join(parts)
+
+
+def synthetic_entries(n, seed=SEED):
+    rng = random.Random(seed)
+    return [{
+        'category': rng.choice(['八字', '紫微斗数', '基础']),
+        'title': f"{rng.choice(_STEMS)}{rng.choice(_GODS)}论 第{i}篇",
+        'content': synthetic_document(rng, rng.randint(300, 700)),
+        'source': '合成语料'
+    } for i in range(n)]
+
+
+def query_sample(n, seed=SEED):
+    rng = random.Random(seed)
+    return [{
+        'day_stem': rng.choice(_STEMS),
+        'ten_gods': {'年干': rng.choice(_GODS), '月干': rng.choice(_GODS), '时干': rng.choice(_GODS)},
+        'stars': rng.sample(_STARS, 2),
+        'pattern': rng.choice(_GODS) + '格'
+    } for _ in range(n)]
+
+
+@case('knowledge')
+def bench_knowledge(quick):
+    """每档：入库建索引（单次）、重新打开并首次检索（冷）、反复检索（热）"""
+    from knowledge_base import KnowledgeBase
+    from knowledge_index import analyze
+    # 分词器初始化单独计时，不摊到第一档入库上
+    results = {'knowledge.tokenizer_init': measure_once(lambda: analyze('甲日正官'), 1)}
+    queries = query_sample(_size(quick, 200, 50))
+    for n in (KB_SIZES_QUICK if quick else KB_SIZES):
+        workdir = tempfile.mkdtemp(prefix='bench_kb_')
+        try:
+            entries = synthetic_entries(n)
+            kb = KnowledgeBase(workdir)
+            results[f'knowledge.ingest.{n}'] = measure_once(lambda: kb.add_knowledge_many(entries), n)
+            kb.store.close()
+
+            def cold_query():
+                reopened = KnowledgeBase(workdir)
+                reopened.get_relevant_judgment(queries[0])
+                reopened.store.close()
+            results[f'knowledge.open_and_first_query.{n}'] = measure_once(cold_query, 1)
+
+            kb = KnowledgeBase(workdir)
+
+            def op():
+                for params in queries:
+                    kb.get_relevant_judgment(params)
+            results[f'knowledge.get_relevant_judgment.{n}'] = measure(op, len(queries), repeat=3)
+            kb.store.close()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+@case('knowledge.first_launch')
+def bench_first_launch(quick):
+    """升级后首次启动：由旧版 knowledge.json 迁移到 SQLite 并建索引（桌面程序在后台任务中进行）"""
+    from benchmarks.startup import write_legacy_knowledge
+    from knowledge_base import KnowledgeBase
+    n = _size(quick, 1000, 200)
+    workdir = tempfile.mkdtemp(prefix='bench_legacy_')
+    try:
+        write_legacy_knowledge(workdir, n)
+
+        def first_launch():
+            KnowledgeBase(workdir).store.close()
+        return {f'knowledge.first_launch.{n}': measure_once(first_launch, 1)}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+@case('knowledge.catalog')
+def bench_catalog(quick):
+    """内存目录：按 id 取条目、取最近 20 条、删除后再加入同一条、知识列表取 id 列表"""
+    from knowledge_catalog import KnowledgeCatalog
+    n = _size(quick, 100000, 20000)
+    rng = random.Random(SEED)
+    catalog = KnowledgeCatalog()
+    for i in range(n):
+        category = rng.choice(('八字', '紫微斗数', '易经', '堪舆', '基础'))
+        catalog.add(category, {'id': catalog.new_id(category), 'title': f'文档{i}',
+                               'added_at': f'2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}.{i:06d}'})
+    ids = rng.sample(list(catalog.items), 1000)
+
+    def get():
+        for item_id in ids:
+            catalog.get(item_id)
+
+    def recent():
+        for _ in ids:
+            catalog.recent(20)
+
+    def churn():
+        for item_id in ids:
+            category = catalog.category(item_id)
+            catalog.add(category, catalog.remove(item_id))
+
+    def list_ids():
+        # 知识列表打开或切换分类时取一次 id 列表
+        catalog.ids()
+        catalog.ids('紫微斗数')
+        catalog.ids(order_by='title')
+    return {
+        'knowledge.catalog.get': measure(get, len(ids)),
+        'knowledge.catalog.recent_20': measure(recent, len(ids)),
+        'knowledge.catalog.delete_add': measure(churn, len(ids)),
+        f'knowledge.catalog.list_ids.{n}': measure(list_ids, 3, repeat=3),
+    }
+
+
+@case('knowledge.keywords')
+def bench_keywords(quick):
+    """分词器冷启动（新进程，缓存已建好）、单篇关键词与多进程批量关键词"""
+    from knowledge_tokenizer import get_tokenizer, extract_keywords_many
+    get_tokenizer().jieba
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    texts = [e['content'] for e in synthetic_entries(_size(quick, 2000, 200))]
+
+    def cold_start():
+        subprocess.run([sys.executable, '-c', 'from knowledge_tokenizer import get_tokenizer; get_tokenizer().jieba'],
+                       env=env, check=True, capture_output=True)
+
+    def single():
+        tokenizer = get_tokenizer()
+        for text in texts:
+            tokenizer.keywords(text)
+
+    def many():
+        extract_keywords_many(texts)
+    return {
+        'knowledge.keywords.cold_start': measure(cold_start, 1, repeat=3),
+        'knowledge.keywords.single': (single, len(texts)),
+        'knowledge.keywords.many': measure_once(many, len(texts))
+    }
+
@@ -0,0 +1,148 @@
+"""计时、结果记录与基线比较"""
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 已注册的基准: [(名称, 函数)]
+CASES = []
+
+
+def case(name):
+    """
+    注册一个基准。被装饰的函数接收 quick 参数，返回 (op, n)：
+    op() 执行一轮、包含 n 次操作；也可返回 {'子名称': (op, n)} 一次登记多项。
+    """
+    def wrap(fn):
+        CASES.append((name, fn))
+        return fn
+    return wrap
+
+
+def measure(op, n, repeat=5, warmup=1):
+    """多轮计时，返回每次操作的耗时统计（微秒）"""
+    for _ in range(warmup):
+        op()
+    times = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            op()
+            times.append((time.perf_counter() - start) / n * 1e6)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {
+        'median_us': statistics.median(times),
+        'min_us': min(times),
+        'mean_us': statistics.mean(times),
+        'ops': n,
+        'repeat': repeat
+    }
+
+
+def measure_once(op, n):
+    """只计时一次（冷启动类场景，重复执行就不再是冷的）"""
+    start = time.perf_counter()
+    op()
+    elapsed = (time.perf_counter() - start) / n * 1e6
+    return {'median_us': elapsed, 'min_us': elapsed, 'mean_us': elapsed, 'ops': n, 'repeat': 1}
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_all(quick=False, select=None, repeat=5, echo=print):
+    results = {}
+    for name, fn in CASES:
+        if select and not any(s in name for s in select):
+            continue
+        produced = fn(quick)
+        entries = produced if isinstance(produced, dict) else {name: produced}
+        for full_name, entry in entries.items():
+            if select and not any(s in full_name for s in select):
+                continue
+            if isinstance(entry, dict):
+                # 用例自己完成了计时（如冷启动）
+                stats = entry
+            else:
+                op, n = entry
+                stats = measure(op, n, repeat=repeat)
+            results[full_name] = stats
+            echo(f"{full_name:<48} {stats['median_us']:>14.2f} us/op  (n={stats['ops']})")
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'revision': git_revision(),
+            'quick': quick
+        },
+        'results': results
+    }
+
+
+def save(data, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=0.1):
+    """
+    按中位数比较两份结果，返回 [(名称, 基线, 当前, 比值, 结论)]。
+    比值 = 当前 / 基线；超过 1 + threshold 记为“退化”，低于 1 - threshold 记为“提升”。
+    """
+    rows = []
+    base = baseline['results']
+    cur = current['results']
+    for name in sorted(set(base) | set(cur)):
+        if name not in cur:
+            rows.append((name, base[name]['median_us'], None, None, '缺失'))
+            continue
+        if name not in base:
+            rows.append((name, None, cur[name]['median_us'], None, '新增'))
+            continue
+        b = base[name]['median_us']
+        c = cur[name]['median_us']
+        ratio = c / b if b else float('inf')
+        if ratio > 1 + threshold:
+            verdict = '退化'
+        elif ratio < 1 - threshold:
+            verdict = '提升'
+        else:
+            verdict = '持平'
+        rows.append((name, b, c, ratio, verdict))
+    return rows
+
+
+def format_comparison(rows):
+    lines = [f"{'基准':<48} {'基线(us)':>12} {'当前(us)':>12} {'比值':>8}  结论"]
+    for name, b, c, ratio, verdict in rows:
+        lines.append(f"{name:<48} {'-' if b is None else f'{b:.2f}':>12} {'-' if c is None else f'{c:.2f}':>12} "
+                     f"{'-' if ratio is None else f'{ratio:.2f}':>8}  {verdict}")
+    return '\n'.join(lines)
+
+
+def ensure_path():
+    """仓库模块都是顶层模块，从 benchmarks 目录运行时把仓库根目录加入导入路径"""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
@@ -0,0 +1,116 @@
+"""
+启动预算
+
+每个模块在全新进程中用 python -X importtime 导入，检查三件事：
+    累计导入耗时（取多次的中位数）不超过 BUDGETS 中的预算；
+    HEAVY 中的重型依赖没有被间接导入（解析库、分词、GUI 等只应在真正用到时加载）；
+    导入不会打开知识库。工作目录里放一份旧版 knowledge.json，模拟升级后的首次启动：
+    迁移到 SQLite、建索引都应留到真正用到知识库时（桌面程序在后台任务中进行），
+    导入后目录里不应出现 knowledge.db 或索引文件。
+
+    python -m benchmarks startup                  # 有超出预算或误导入时退出码为 1
+    python -m benchmarks startup -m bazi_calculator --repeat 9
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.harness import ROOT
+
+# 模块 -> 导入预算（毫秒），留有数倍余量，只为拦住重型依赖被重新拉进导入链
+BUDGETS = {
+    'bazi_core': 30,
+    'fast_calendar': 60,
+    'chart_context': 80,
+    'bazi_calculator': 150,
+    'ziwei_calculator': 150,
+    'chart_codec': 150,
+    'app_sections': 200,
+    'knowledge_base': 120,
+    'fortune_service': 200,
+    'batch_cli': 120,
+}
+
+# 导入上述任何模块时都不应出现的顶层包
+HEAVY = ('pandas', 'pdfplumber', 'docx', 'jieba', 'PyQt5', 'kivy')
+
+# 模拟旧版知识库的条目数（未切块、无索引的 knowledge.json）
+LEGACY_ITEMS = 200
+
+
+def write_legacy_knowledge(directory, n=LEGACY_ITEMS):
+    """在 directory 下写一份旧版 knowledge.json：整段 content、分类_序号_时间戳 的 id，没有索引文件"""
+    os.makedirs(directory, exist_ok=True)
+    text = '甲木日主生于寅月，得令而旺，喜庚金修剪、丙火疏泄。正官透干，格局清纯。'
+    data = {}
+    for i in range(n):
+        category = ('八字基础', '命理分析', '紫微斗数')[i % 3]
+        data.setdefault(category, []).append({
+            'id': f"{category}_{i}_1700000000", 'title': f'旧文档{i}', 'source': None,
+            'added_at': '2023-11-14T22:13:20', 'content': text * 20
+        })
+    with open(os.path.join(directory, 'knowledge.json'), 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def import_profile(module, cwd=None):
+    """在新进程中导入 module，返回 (累计耗时毫秒, 导入过的顶层包集合)"""
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    total = None
+    packages = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|', 2)
+        if not cumulative.strip().isdigit():
+            continue  # 表头
+        packages.add(name.strip().split('.')[0])
+        # 顶层导入只缩进一格，嵌套导入逐级多缩进两格
+        if name == ' ' + module:
+            total = int(cumulative) / 1000
+    return total, packages
+
+
+def check(modules=None, repeat=5, echo=print):
+    """逐个模块检查预算，返回违规说明列表（空列表表示全部通过）"""
+    modules = modules or list(BUDGETS)
+    # 在临时目录中运行，避免在仓库里生成数据文件
+    workdir = tempfile.mkdtemp(prefix='startup_')
+    data_dir = os.path.join(workdir, 'knowledge_data')
+    write_legacy_knowledge(data_dir)
+    failures = []
+    try:
+        for module in modules:
+            budget = BUDGETS.get(module)
+            times = []
+            packages = set()
+            for _ in range(repeat):
+                total, imported = import_profile(module, cwd=workdir)
+                times.append(total)
+                packages |= imported
+            median = statistics.median(times)
+            heavy = sorted(p for p in HEAVY if p in packages)
+            status = '通过'
+            if budget is not None and median > budget:
+                status = '超出预算'
+                failures.append(f"{module}: {median:.1f} ms > {budget} ms")
+            if heavy:
+                status = '误导入'
+                failures.append(f"{module}: 导入了 {', '.join(heavy)}")
+            opened = sorted(set(os.listdir(data_dir)) - {'knowledge.json'})
+            if opened:
+                status = '打开了知识库'
+                failures.append(f"{module}: 导入时打开了知识库（生成了 {', '.join(opened)}）")
+                shutil.rmtree(data_dir)
+                write_legacy_knowledge(data_dir)
+            limit = f"{budget} ms" if budget is not None else '-'
+            echo(f"{module:<24}{median:>10.1f} ms  预算 {limit:>8}  {status}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return failures
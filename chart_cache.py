@@ -0,0 +1,152 @@
+"""
+命盘结果缓存
+
+generate_fortune_report / generate_ziwei_report 对同一出生时刻的结果是确定的。
+这里提供一个带 LRU 淘汰的内存缓存，可选挂一层 SQLite 持久化，重启桌面程序后缓存依然有效。
+
+缓存键为规范化的命盘键：公历日 + 四柱 + 性别。同一时辰内不同钟点的四柱相同，共用一个条目；
+保留公历日是因为紫微用到的农历日、大运起运岁数都取决于出生当天，而四柱相同的日子相隔数十年仍可能出现。
+"""
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import date
+
+from fast_calendar import get_calendar
+from bazi_core import pillar_codes
+
+# 报告结构或算法变化时递增，持久化缓存中的旧条目自动失效
+CACHE_VERSION = 2
+DEFAULT_MAXSIZE = 1024
+
+
+def chart_key(year, month, day, hour, gender):
+    """规范化命盘键 (公历日序号, 年柱, 月柱, 日柱, 时柱, 性别)"""
+    calendar = get_calendar()
+    if calendar.covers(year, month, day):
+        e = calendar.lookup(year, month, day, hour)
+        codes = (e.year_gz, e.month_gz, e.day_gz, e.time_gz)
+    else:
+        from lunar_python import Solar
+        ec = Solar.fromYmdHms(year, month, day, hour, 0, 0).getLunar().getEightChar()
+        codes = pillar_codes(ec.getYear(), ec.getMonth(), ec.getDay(), ec.getTime())
+    return (date(year, month, day).toordinal(),) + codes + (gender,)
+
+
+class ChartCache:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, persist_path=None):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        if persist_path:
+            self.attach_disk(persist_path)
+
+    def attach_disk(self, path):
+        """挂载 SQLite 持久层"""
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with self._lock:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS chart_cache (key TEXT PRIMARY KEY, value BLOB)')
+            self._db.commit()
+
+    def _disk_key(self, key):
+        return f"v{CACHE_VERSION}:{key!r}"
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            if self._db is not None:
+                row = self._db.execute('SELECT value FROM chart_cache WHERE key = ?', (self._disk_key(key),)).fetchone()
+                if row is not None:
+                    value = pickle.loads(row[0])
+                    self._store(key, value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO chart_cache (key, value) VALUES (?, ?)',
+                                 (self._disk_key(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+                self._db.commit()
+
+    def _store(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """命中直接返回，否则调用 compute() 并写入缓存"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._data.clear()
+            if disk and self._db is not None:
+                self._db.execute('DELETE FROM chart_cache')
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_hits': self.disk_hits
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+
+# 八字与紫微共用的进程级缓存
+report_cache = ChartCache()
+
+
+def copy_report(report):
+    """
+    缓存中的报告是共享的，交给调用方前做一份深拷贝，调用方修改结果不会污染后续命中。
+    报告只含 dict / list / str / 数字，pickle 往返比 copy.deepcopy 快数倍。
+    """
+    return pickle.loads(pickle.dumps(report, pickle.HIGHEST_PROTOCOL))
+
+
+def configure_cache(maxsize=None, persist_path=None):
+    """调整共享缓存容量，或为其挂载持久化文件"""
+    if maxsize is not None:
+        report_cache.resize(maxsize)
+    if persist_path:
+        report_cache.attach_disk(persist_path)
+    return report_cache
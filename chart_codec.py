@@ -0,0 +1,174 @@
+"""
+命盘紧凑编码
+
+一份完整报告（八字、大运、流年、紫微十二宫）全部可由几个整数推出：出生时刻、性别、四柱序号、
+农历日期、起运时长与紫微命身宫 / 五行局 / 紫微位置。这里把它们定长打包成 25 字节，
+可直接作缓存值、数据库 BLOB 列或接口载荷（to_text 转成 URL 安全的 base64）；
+需要展示时由 render_report 还原上下文并生成完整的中文报告。
+
+编码可能来自外部（见 fortune_service 的 /render），CRC 只防传输损坏、不防伪造：
+decode_chart 逐个检查字段范围，decode_context 再按出生时刻取规范上下文（1900-2100 年只查历表），
+四柱、农历日期、起运与紫微编码任何一项对不上都抛 ValueError。报告只由规范上下文生成，
+伪造的载荷进不了报告缓存与上下文缓存。
+
+布局（小端，CODEC_VERSION = 1）：
+    B   版本
+    B   标志位：bit0 男，bit1 农历年 = 公历年 - 1，bit2 在历表范围内
+    I   公历日序号 (date.toordinal)
+    B   出生钟点 0-23
+    4B  年、月、日、时柱的六十甲子序号
+    b   农历月（闰月为负）
+    B   农历日
+    B   时辰地支
+    3B  起运 (年, 月, 日)
+    4B  紫微 命宫地支、身宫地支、五行局、紫微地支
+    I   前 21 字节的 CRC32
+
+    data = encode_chart(chart_context(1990, 5, 6, 10, '男'))
+    report = render_report(data)          # {'八字': ..., '紫微': ...}
+"""
+import base64
+import struct
+import zlib
+from collections import namedtuple
+from datetime import date
+
+from chart_context import as_context, chart_context
+from ziwei_core import ziwei_codes
+
+CODEC_VERSION = 1
+
+_BODY = struct.Struct('<BBIB4BbBB3B4B')
+_CRC = struct.Struct('<I')
+CHART_SIZE = _BODY.size + _CRC.size
+
+_MALE = 1
+_PREV_LUNAR_YEAR = 2
+_IN_TABLE = 4
+
+# 起运时长的上限：三天折一年，相邻两“节”不过一月，起运不会超过 10 年有余
+MAX_YUN_YEARS = 12
+
+
+# 解码后的全部字段；ziwei 为 (命宫地支, 身宫地支, 五行局, 紫微地支)
+ChartRecord = namedtuple('ChartRecord', [
+    'version', 'year', 'month', 'day', 'hour', 'gender', 'codes',
+    'lunar_year', 'lunar_month', 'lunar_day', 'time_zhi', 'in_table', 'yun_start', 'ziwei'
+])
+
+
+def encode_chart(year, month=None, day=None, hour=None, gender=None):
+    """把一张命盘编码为 CHART_SIZE 字节；可传 ChartContext 或年月日时与性别"""
+    ctx = as_context(year, month, day, hour, gender)
+    flags = 0
+    if ctx.gender == '男':
+        flags |= _MALE
+    if ctx.lunar_year != ctx.year:
+        flags |= _PREV_LUNAR_YEAR
+    if ctx.in_table:
+        flags |= _IN_TABLE
+    ziwei = ziwei_codes(ctx.lunar_month, ctx.lunar_day, ctx.time_zhi, (ctx.lunar_year - 4) % 10)
+    body = _BODY.pack(CODEC_VERSION, flags, date(ctx.year, ctx.month, ctx.day).toordinal(), ctx.hour,
+                      *ctx.codes, ctx.lunar_month, ctx.lunar_day, ctx.time_zhi, *ctx.yun_start, *ziwei)
+    return body + _CRC.pack(zlib.crc32(body))
+
+
+def decode_chart(data):
+    """解码为 ChartRecord；长度、版本、校验不符或字段超出范围时抛 ValueError"""
+    data = bytes(data)
+    if len(data) != CHART_SIZE:
+        raise ValueError(f"命盘编码长度应为 {CHART_SIZE} 字节，实际 {len(data)}")
+    body = data[:_BODY.size]
+    if _CRC.unpack_from(data, _BODY.size)[0] != zlib.crc32(body):
+        raise ValueError("命盘编码校验失败")
+    fields = _BODY.unpack(body)
+    if fields[0] != CODEC_VERSION:
+        raise ValueError(f"不支持的命盘编码版本: {fields[0]}")
+    version, flags, ordinal, hour = fields[:4]
+    try:
+        birth = date.fromordinal(ordinal)
+    except (ValueError, OverflowError):
+        raise ValueError(f"命盘编码的出生日期无效: {ordinal}")
+    _check_fields(hour, fields[4:8], fields[8], fields[9], fields[10], fields[11:14], fields[14:18])
+    return ChartRecord(
+        version, birth.year, birth.month, birth.day, hour,
+        '男' if flags & _MALE else '女',
+        fields[4:8],
+        birth.year - 1 if flags & _PREV_LUNAR_YEAR else birth.year,
+        fields[8], fields[9], fields[10],
+        bool(flags & _IN_TABLE),
+        fields[11:14],
+        fields[14:18]
+    )
+
+
+def _check_fields(hour, codes, lunar_month, lunar_day, time_zhi, yun_start, ziwei):
+    if hour > 23:
+        raise ValueError(f"命盘编码的出生钟点无效: {hour}")
+    if any(code >= 60 for code in codes):
+        raise ValueError(f"命盘编码的干支序号无效: {codes}")
+    if not 1 <= abs(lunar_month) <= 12 or not 1 <= lunar_day <= 30:
+        raise ValueError(f"命盘编码的农历日期无效: {lunar_month}月{lunar_day}日")
+    if time_zhi >= 12:
+        raise ValueError(f"命盘编码的时辰无效: {time_zhi}")
+    years, months, days = yun_start
+    if years > MAX_YUN_YEARS or months >= 12 or days >= 30:
+        raise ValueError(f"命盘编码的起运时长无效: {yun_start}")
+    life, body, ju, ziwei_pos = ziwei
+    if life >= 12 or body >= 12 or ju >= 5 or ziwei_pos >= 12:
+        raise ValueError(f"命盘编码的紫微字段无效: {ziwei}")
+
+
+def decode_context(data):
+    """
+    解码并取出生时刻的规范 ChartContext（即 chart_context 的结果）。
+    编码中的四柱、农历日期、时辰、起运与紫微编码须与历法推算一致，否则抛 ValueError。
+    """
+    r = data if isinstance(data, ChartRecord) else decode_chart(data)
+    ctx = chart_context(r.year, r.month, r.day, r.hour, r.gender)
+    expected = (tuple(ctx.codes), (ctx.lunar_year, ctx.lunar_month, ctx.lunar_day), ctx.time_zhi, ctx.in_table,
+                tuple(ctx.yun_start),
+                ziwei_codes(ctx.lunar_month, ctx.lunar_day, ctx.time_zhi, (ctx.lunar_year - 4) % 10))
+    actual = (tuple(r.codes), (r.lunar_year, r.lunar_month, r.lunar_day), r.time_zhi, r.in_table,
+              tuple(r.yun_start), tuple(r.ziwei))
+    if actual != expected:
+        raise ValueError("命盘编码与历法推算不符")
+    return ctx
+
+
+def render_report(data, sections=('八字', '紫微')):
+    """由编码生成完整报告；sections 可选 '八字'、'紫微'"""
+    from bazi_calculator import generate_fortune_report
+    from ziwei_calculator import generate_ziwei_report
+
+    ctx = decode_context(data)
+    report = {}
+    if '八字' in sections:
+        report['八字'] = generate_fortune_report(ctx)
+    if '紫微' in sections:
+        report['紫微'] = generate_ziwei_report(ctx)
+    return report
+
+
+def encode_many(contexts):
+    """多张命盘首尾相接编码，适合整块写入文件或数据库"""
+    return b''.join(encode_chart(ctx) for ctx in contexts)
+
+
+def iter_decode(buffer):
+    """逐条解码 encode_many 的结果"""
+    view = memoryview(buffer)
+    if len(view) % CHART_SIZE:
+        raise ValueError(f"数据长度不是 {CHART_SIZE} 的整数倍")
+    for offset in range(0, len(view), CHART_SIZE):
+        yield decode_chart(view[offset:offset + CHART_SIZE])
+
+
+def to_text(data):
+    """URL 安全的 base64 文本，便于放进 JSON 接口"""
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def from_text(text):
+    padded = text + '=' * (-len(text) % 4)
+    return base64.urlsafe_b64decode(padded.encode('ascii'))
@@ -0,0 +1,192 @@
+"""
+命盘上下文
+
+同一出生时刻的历法状态只算一次：四柱、农历日期、起运方向与起运时长都收在 ChartContext 里，
+排盘、大运、紫微等计算直接接收上下文，不再各自从年月日时重新构造 Solar / Lunar / EightChar。
+
+1900-2100 年全部查 fast_calendar 的历表，起运时长按出生时刻到前后“节”的距离计算，
+规则与 lunar_python 的 Yun（流派 1）一致；范围外才构造 lunar_python 对象，并保留在上下文中复用。
+
+    ctx = chart_context(1990, 5, 6, 10, '男')
+    calculate_bazi(ctx); calculate_10_year_luck(ctx); generate_ziwei_report(ctx)
+    for dy in ctx.da_yun()[1:9]: ...
+"""
+from bisect import bisect_right
+from calendar import monthrange
+from collections import namedtuple
+from collections.abc import Sequence
+from datetime import date, timedelta
+from functools import lru_cache
+
+from bazi_core import JIA_ZI, pillar_codes
+from fast_calendar import get_calendar, time_zhi_index, _EPOCH_ORDINAL
+
+CONTEXT_CACHE_SIZE = 1024
+DA_YUN_COUNT = 10
+
+# index 0 为起运前的童限，gz 为 None；其余 gz 为六十甲子序号
+DaYun = namedtuple('DaYun', ['index', 'start_year', 'end_year', 'start_age', 'end_age', 'gz'])
+
+
+class DaYunSequence(Sequence):
+    """大运序列，按下标现算，不预先生成"""
+
+    def __init__(self, ctx, count=DA_YUN_COUNT):
+        self._ctx = ctx
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return self._ctx.da_yun_at(i)
+
+
+class ChartContext:
+    def __init__(self, year, month, day, hour, gender):
+        self.year = year
+        self.month = month
+        self.day = day
+        self.hour = hour
+        self.gender = gender
+        self._eight_char = None
+        self._yun_start = None
+
+        # 历表范围外交给 lunar_python，时辰先在这里统一校验
+        if not 0 <= hour <= 23:
+            raise ValueError(f"时间不合法: {hour}时")
+        calendar = get_calendar()
+        self.in_table = calendar.covers(year, month, day)
+        if self.in_table:
+            # 1900-2100 年直接查预计算历表
+            entry = calendar.lookup(year, month, day, hour)
+            self.codes = (entry.year_gz, entry.month_gz, entry.day_gz, entry.time_gz)
+            self.lunar_year, self.lunar_month, self.lunar_day = entry.lunar_year, entry.lunar_month, entry.lunar_day
+            self.time_zhi = entry.time_zhi
+        else:
+            ec = self.eight_char
+            self.codes = pillar_codes(ec.getYear(), ec.getMonth(), ec.getDay(), ec.getTime())
+            lunar = ec.getLunar()
+            self.lunar_year, self.lunar_month, self.lunar_day = lunar.getYear(), lunar.getMonth(), lunar.getDay()
+            self.time_zhi = lunar.getTimeZhiIndex()
+
+    @property
+    def eight_char(self):
+        """lunar_python 的 EightChar，仅在历表范围外或调用方需要时构造"""
+        if self._eight_char is None:
+            from lunar_python import Solar
+            self._eight_char = Solar.fromYmdHms(self.year, self.month, self.day, self.hour, 0, 0).getLunar().getEightChar()
+        return self._eight_char
+
+    @property
+    def pillars(self):
+        """四柱文字 (年, 月, 日, 时)"""
+        return tuple(JIA_ZI[c] for c in self.codes)
+
+    @property
+    def day_stem(self):
+        return JIA_ZI[self.codes[2]][0]
+
+    @property
+    def key(self):
+        """与 chart_cache.chart_key 相同的规范化命盘键"""
+        return (date(self.year, self.month, self.day).toordinal(),) + self.codes + (self.gender,)
+
+    def bazi_info(self):
+        """calculate_bazi 的返回结构"""
+        y, m, d, h = self.pillars
+        return {
+            'year': y,
+            'month': m,
+            'day': d,
+            'hour': h,
+            'gender': self.gender,
+            'four_pillars': f"{y} {m} {d} {h}",
+            'codes': self.codes
+        }
+
+    # ---- 大运 ----
+
+    @property
+    def forward(self):
+        """大运是否顺排：阳年男、阴年女顺排"""
+        return (self.codes[0] % 2 == 0) == (self.gender == '男')
+
+    @property
+    def yun_start(self):
+        """起运时长 (年, 月, 日)"""
+        if self._yun_start is None:
+            self._yun_start = self._table_yun_start() if self.in_table else self._lunar_yun_start()
+        return self._yun_start
+
+    def _table_yun_start(self):
+        jie = get_calendar().jie
+        birth = (date(self.year, self.month, self.day).toordinal() - _EPOCH_ORDINAL) * 86400 + self.hour * 3600
+        i = bisect_right(jie, birth)
+        # 顺排数到下一个“节”，逆排数到上一个“节”
+        start, end = (birth, jie[i]) if self.forward else (jie[i - 1], birth)
+        # 三天折一年、一天折四个月、一个时辰折十天
+        hour_diff = _yun_zhi(end) - _yun_zhi(start)
+        day_diff = end // 86400 - start // 86400
+        if hour_diff < 0:
+            hour_diff += 12
+            day_diff -= 1
+        month_diff = hour_diff * 10 // 30
+        months = day_diff * 4 + month_diff
+        days = hour_diff * 10 - month_diff * 30
+        return months // 12, months % 12, days
+
+    def _lunar_yun_start(self):
+        yun = self.eight_char.getYun(1 if self.gender == '男' else 0)
+        return yun.getStartYear(), yun.getStartMonth(), yun.getStartDay()
+
+    @property
+    def start_year(self):
+        """起运的公历年份"""
+        years, months, days = self.yun_start
+        # 依次加年、加月（日数超出当月时取月末）、加日，与 lunar_python 的 getStartSolar 一致
+        y, m, d = self.year + years, self.month, self.day
+        if m == 2 and d > 28:
+            d = min(d, monthrange(y, 2)[1])
+        m += months
+        y += (m - 1) // 12
+        m = (m - 1) % 12 + 1
+        d = min(d, monthrange(y, m)[1])
+        return (date(y, m, d) + timedelta(days=days)).year
+
+    def da_yun_at(self, index):
+        start = self.start_year
+        if index < 1:
+            return DaYun(0, self.year, start - 1, 1, start - self.year, None)
+        start += (index - 1) * 10
+        age = start - self.year + 1
+        gz = (self.codes[1] + (index if self.forward else -index)) % 60
+        return DaYun(index, start, start + 9, age, age + 9, gz)
+
+    def da_yun(self, count=DA_YUN_COUNT):
+        return DaYunSequence(self, count)
+
+
+def _yun_zhi(secs):
+    # 起运按时辰计差，23 点记为亥时
+    hour = secs % 86400 // 3600
+    return 11 if hour == 23 else time_zhi_index(hour)
+
+
+@lru_cache(maxsize=CONTEXT_CACHE_SIZE)
+def chart_context(year, month, day, hour, gender):
+    """取（或新建）某一出生时刻的上下文，同一时刻反复调用返回同一对象"""
+    return ChartContext(year, month, day, hour, gender)
+
+
+def as_context(year, month=None, day=None, hour=None, gender=None):
+    """计算函数的参数归一：既可传 ChartContext，也可传年月日时与性别"""
+    if isinstance(year, ChartContext):
+        return year
+    return chart_context(year, month, day, hour, gender)
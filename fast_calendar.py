@@ -0,0 +1,284 @@
+"""
+干支历速查表
+
+把 1900-2100 年的节气交接时刻、每日农历月日预先算好，存成紧凑的二进制表。
+年月日时四柱全部由查表 + 六十甲子算术得出，排盘时不再构造 lunar_python 对象。
+
+表文件格式 (小端)：
+    文件头  magic(6s) 起始年(H) 结束年(H) 天数(I) 节气数(I) 首个节气序号(B)
+    节气表  int64 * 节气数，自 1900-01-01 00:00:00 起算的秒数，按时间排序连续排列
+    农历表  uint16 * 天数，bit0-4 农历日，bit5-8 农历月，bit9 闰月，bit10 农历年=公历年-1
+"""
+import os
+import sys
+import struct
+import warnings
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import date, datetime
+
+TIAN_GAN = ['甲', '乙', '丙', '丁', '戊', '己', '庚', '辛', '壬', '癸']
+DI_ZHI = ['子', '丑', '寅', '卯', '辰', '巳', '午', '未', '申', '酉', '戌', '亥']
+# 与 lunar_python 的 Lunar.JIE_QI 顺序一致，奇数位为“节”，偶数位为“气”
+JIE_QI = ['冬至', '小寒', '大寒', '立春', '雨水', '惊蛰', '春分', '清明', '谷雨', '立夏', '小满', '芒种',
+          '夏至', '小暑', '大暑', '立秋', '处暑', '白露', '秋分', '寒露', '霜降', '立冬', '小雪', '大雪']
+LI_CHUN_INDEX = 3
+
+TABLE_START_YEAR = 1900
+TABLE_END_YEAR = 2100
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'calendar_1900_2100.bin')
+
+_MAGIC = b'UDCAL1'
+_HEADER = struct.Struct('<6sHHIIB')
+_EPOCH_ORDINAL = date(1900, 1, 1).toordinal()
+# date.toordinal() + _JDN_OFFSET 即为儒略日数
+_JDN_OFFSET = 1721425
+
+# 查表结果：四柱为六十甲子序号(0=甲子)，农历月为负数表示闰月(与 lunar_python 一致)
+CalendarEntry = namedtuple('CalendarEntry', [
+    'year_gz', 'month_gz', 'day_gz', 'time_gz',
+    'lunar_year', 'lunar_month', 'lunar_day', 'time_zhi'
+])
+
+
+def ganzhi_index(gan_idx, zhi_idx):
+    """由干支序号求六十甲子序号"""
+    return (6 * gan_idx - 5 * zhi_idx) % 60
+
+
+def ganzhi_name(gz_idx):
+    """六十甲子序号转干支文字"""
+    return TIAN_GAN[gz_idx % 10] + DI_ZHI[gz_idx % 12]
+
+
+def time_zhi_index(hour):
+    """小时转时辰地支序号，23点与0点同为子时"""
+    return ((hour + 1) // 2) % 12
+
+
+def _to_seconds(year, month, day, hour=0, minute=0, second=0):
+    return (date(year, month, day).toordinal() - _EPOCH_ORDINAL) * 86400 + hour * 3600 + minute * 60 + second
+
+
+class FastCalendar:
+    """基于预计算表的干支历，lookup 为 O(1) 查表 + O(log n) 节气二分"""
+
+    def __init__(self, terms, lunar_days, first_term_idx, start_year=TABLE_START_YEAR, end_year=TABLE_END_YEAR):
+        self.start_year = start_year
+        self.end_year = end_year
+        self.terms = terms
+        self.lunar_days = lunar_days
+        self.first_term_idx = first_term_idx
+        self._start_ordinal = date(start_year, 1, 1).toordinal()
+        self._end_ordinal = date(end_year, 12, 31).toordinal()
+
+        # 拆出“节”与“立春”两张子表，月柱和年柱只需二分计数
+        self.jie = array('q')
+        self.li_chun = array('q')
+        first_li_chun = None
+        for i, t in enumerate(terms):
+            name_idx = (first_term_idx + i) % 24
+            if name_idx % 2 == 1:
+                if name_idx == LI_CHUN_INDEX and first_li_chun is None:
+                    first_li_chun = len(self.jie)
+                self.jie.append(t)
+            if name_idx == LI_CHUN_INDEX:
+                self.li_chun.append(t)
+
+        # 第一个立春所在公历年，其后每过一个立春年柱进一位
+        self._li_chun_year0 = date.fromordinal(_EPOCH_ORDINAL + self.li_chun[0] // 86400).year
+        # 第一个立春起为该年寅月，月柱随每个“节”顺推一位
+        year_gan = (self._li_chun_year0 - 4) % 10
+        self._month_base = ganzhi_index((year_gan % 5 * 2 + 2) % 10, 2) - first_li_chun - 1
+
+    @classmethod
+    def load(cls, path=TABLE_FILE):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, start_year, end_year, n_days, n_terms, first_term_idx = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"无效的历表文件: {path}")
+        offset = _HEADER.size
+        terms = array('q')
+        terms.frombytes(data[offset:offset + n_terms * 8])
+        offset += n_terms * 8
+        lunar_days = array('H')
+        lunar_days.frombytes(data[offset:offset + n_days * 2])
+        if sys.byteorder != 'little':
+            terms.byteswap()
+            lunar_days.byteswap()
+        return cls(terms, lunar_days, first_term_idx, start_year, end_year)
+
+    def save(self, path=TABLE_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        terms = array('q', self.terms)
+        lunar_days = array('H', self.lunar_days)
+        if sys.byteorder != 'little':
+            terms.byteswap()
+            lunar_days.byteswap()
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, self.start_year, self.end_year, len(lunar_days), len(terms), self.first_term_idx))
+            f.write(terms.tobytes())
+            f.write(lunar_days.tobytes())
+
+    def covers(self, year, month, day):
+        return self._start_ordinal <= date(year, month, day).toordinal() <= self._end_ordinal
+
+    def lookup(self, year, month, day, hour=0, minute=0):
+        """查四柱与农历日期，超出表范围或时分不合法时抛出 ValueError"""
+        if not 0 <= hour <= 23 or not 0 <= minute <= 59:
+            raise ValueError(f"时间不合法: {hour}时{minute}分")
+        ordinal = date(year, month, day).toordinal()
+        if not self._start_ordinal <= ordinal <= self._end_ordinal:
+            raise ValueError(f"日期超出历表范围({self.start_year}-{self.end_year}): {year}-{month}-{day}")
+        secs = (ordinal - _EPOCH_ORDINAL) * 86400 + hour * 3600 + minute * 60
+
+        # 年柱：以立春交接时刻为界
+        year_gz = (self._li_chun_year0 - 1 + bisect_right(self.li_chun, secs) - 4) % 60
+        # 月柱：以“节”的交接时刻为界
+        month_gz = (self._month_base + bisect_right(self.jie, secs)) % 60
+        # 日柱：晚子时仍算当天
+        day_gz = (ordinal + _JDN_OFFSET - 11) % 60
+        # 时柱：时干按晚子时算次日起
+        zhi = time_zhi_index(hour)
+        day_gan = (day_gz + (1 if hour == 23 else 0)) % 10
+        time_gz = ganzhi_index((day_gan % 5 * 2 + zhi) % 10, zhi)
+
+        packed = self.lunar_days[ordinal - self._start_ordinal]
+        lunar_day = packed & 0x1F
+        lunar_month = (packed >> 5) & 0x0F
+        if packed & 0x200:
+            lunar_month = -lunar_month
+        lunar_year = year - 1 if packed & 0x400 else year
+        return CalendarEntry(year_gz, month_gz, day_gz, time_gz, lunar_year, lunar_month, lunar_day, zhi)
+
+    def pillars(self, year, month, day, hour=0, minute=0):
+        """返回四柱文字 (年, 月, 日, 时)"""
+        e = self.lookup(year, month, day, hour, minute)
+        return ganzhi_name(e.year_gz), ganzhi_name(e.month_gz), ganzhi_name(e.day_gz), ganzhi_name(e.time_gz)
+
+    def term_at(self, i):
+        """第 i 个节气的 (名称序号, 距 1900-01-01 的秒数)"""
+        return (self.first_term_idx + i) % 24, self.terms[i]
+
+
+def build_table(start_year=TABLE_START_YEAR, end_year=TABLE_END_YEAR):
+    """用 lunar_python 生成历表（仅构建时需要）"""
+    from lunar_python import Solar, LunarYear
+
+    alias = {'DA_XUE': '大雪', 'DONG_ZHI': '冬至', 'XIAO_HAN': '小寒', 'DA_HAN': '大寒',
+             'LI_CHUN': '立春', 'YU_SHUI': '雨水', 'JING_ZHE': '惊蛰'}
+
+    # 1. 节气：多取首尾各一年，保证表内任意时刻前后都有“节”
+    found = {}
+    for y in range(start_year - 1, end_year + 2):
+        for key, solar in Solar.fromYmd(y, 6, 1).getLunar().getJieQiTable().items():
+            secs = _to_seconds(solar.getYear(), solar.getMonth(), solar.getDay(),
+                               solar.getHour(), solar.getMinute(), solar.getSecond())
+            found[secs] = JIE_QI.index(alias.get(key, key))
+    terms = array('q', sorted(found))
+    first_term_idx = found[terms[0]]
+    for i, t in enumerate(terms):
+        if found[t] != (first_term_idx + i) % 24:
+            raise ValueError(f"节气序列不连续: 第{i}个")
+
+    # 2. 农历：按农历月的首日儒略日逐月铺开
+    start_ordinal = date(start_year, 1, 1).toordinal()
+    end_ordinal = date(end_year, 12, 31).toordinal()
+    lunar_days = array('H', [0] * (end_ordinal - start_ordinal + 1))
+    for ly in range(start_year - 1, end_year + 1):
+        for m in LunarYear.fromYear(ly).getMonthsInYear():
+            first = m.getFirstJulianDay() - _JDN_OFFSET
+            lm = m.getMonth()
+            for d in range(m.getDayCount()):
+                ordinal = first + d
+                if not start_ordinal <= ordinal <= end_ordinal:
+                    continue
+                solar_year = date.fromordinal(ordinal).year
+                packed = (d + 1) | (abs(lm) << 5)
+                if lm < 0:
+                    packed |= 0x200
+                if m.getYear() != solar_year:
+                    packed |= 0x400
+                lunar_days[ordinal - start_ordinal] = packed
+    if 0 in lunar_days:
+        raise ValueError("农历表存在未填充的日期")
+
+    return FastCalendar(terms, lunar_days, first_term_idx, start_year, end_year)
+
+
+def verify(calendar=None, start_year=TABLE_START_YEAR, end_year=TABLE_END_YEAR, hours=(0, 12, 23), verbose=True):
+    """
+    逐日与 lunar_python 对比。
+    每天检查 hours 中的时刻；当天有“节”交接时检查全部 24 个整点。
+    返回不一致记录列表 [(日期时刻, 字段, 查表值, lunar_python 值)]。
+    """
+    from lunar_python import Solar
+
+    cal = calendar or get_calendar()
+    jie_days = set(int(t // 86400) for t in cal.jie)
+    diffs = []
+    ordinal = date(start_year, 1, 1).toordinal()
+    end_ordinal = date(end_year, 12, 31).toordinal()
+    while ordinal <= end_ordinal:
+        d = date.fromordinal(ordinal)
+        check_hours = range(24) if (ordinal - _EPOCH_ORDINAL) in jie_days else hours
+        for h in check_hours:
+            lunar = Solar.fromYmdHms(d.year, d.month, d.day, h, 0, 0).getLunar()
+            ec = lunar.getEightChar()
+            e = cal.lookup(d.year, d.month, d.day, h)
+            expected = [
+                ('年柱', ganzhi_name(e.year_gz), ec.getYear()),
+                ('月柱', ganzhi_name(e.month_gz), ec.getMonth()),
+                ('日柱', ganzhi_name(e.day_gz), ec.getDay()),
+                ('时柱', ganzhi_name(e.time_gz), ec.getTime()),
+                ('农历年', e.lunar_year, lunar.getYear()),
+                ('农历月', e.lunar_month, lunar.getMonth()),
+                ('农历日', e.lunar_day, lunar.getDay()),
+                ('时辰', e.time_zhi, lunar.getTimeZhiIndex()),
+            ]
+            for field, got, want in expected:
+                if got != want:
+                    diffs.append((f"{d.isoformat()} {h:02d}:00", field, got, want))
+        if verbose and d.month == 12 and d.day == 31:
+            print(f"{d.year} 校验完成，累计差异 {len(diffs)} 处")
+        ordinal += 1
+    return diffs
+
+
+_calendar = None
+
+
+def get_calendar():
+    """进程内共享的历表实例，首次调用时加载；表文件缺失时现场生成并尝试落盘"""
+    global _calendar
+    if _calendar is None:
+        if os.path.exists(TABLE_FILE):
+            _calendar = FastCalendar.load(TABLE_FILE)
+        else:
+            _calendar = build_table()
+            try:
+                _calendar.save(TABLE_FILE)
+            except OSError as e:
+                # 仍可使用内存中的历表，只是下次启动要重新生成
+                warnings.warn(f"历表写入失败: {e}", RuntimeWarning, stacklevel=2)
+    return _calendar
+
+
+if __name__ == '__main__':
+    # python fast_calendar.py build          重新生成历表
+    # python fast_calendar.py verify [起 止]  与 lunar_python 全量比对
+    cmd = sys.argv[1] if len(sys.argv) > 1 else 'verify'
+    if cmd == 'build':
+        cal = build_table()
+        cal.save(TABLE_FILE)
+        print(f"历表已生成: {TABLE_FILE} ({len(cal.lunar_days)} 天, {len(cal.terms)} 个节气)")
+    elif cmd == 'verify':
+        start = int(sys.argv[2]) if len(sys.argv) > 2 else TABLE_START_YEAR
+        end = int(sys.argv[3]) if len(sys.argv) > 3 else TABLE_END_YEAR
+        result = verify(start_year=start, end_year=end)
+        for row in result[:50]:
+            print(*row)
+        print("校验通过" if not result else f"共 {len(result)} 处差异")
+        sys.exit(1 if result else 0)
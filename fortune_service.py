@@ -0,0 +1,364 @@
+"""
+命盘 HTTP 服务（asyncio，仅用标准库）
+
+    python -m fortune_service --port 8000 --workers 4
+
+接口（JSON，GET 用查询参数，POST 用 JSON 请求体）：
+    /fortune   year, month, day, hour, gender        -> generate_fortune_report
+    /ziwei     year, month, day, hour, gender        -> generate_ziwei_report
+    /match     male: {year, month, day, hour}, female: {...}  -> match_bazi
+    /chart     year, month, day, hour, gender        -> {"chart": 紧凑编码文本}（见 chart_codec）
+    /render    chart                                 -> 由紧凑编码生成的完整报告 {八字, 紫微}
+    /metrics   Prometheus 文本格式：各接口各阶段的耗时直方图与计数
+    /health
+
+计算放在进程池中执行。同一规范化命盘键（见 chart_cache.chart_key）的并发请求共用一次计算；
+在途计算数达到 --max-queue 时直接返回 503 并带 Retry-After，避免请求无限堆积。
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qsl
+
+from chart_cache import chart_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_QUEUE = 256
+MAX_BODY = 64 * 1024
+KEEP_ALIVE_TIMEOUT = 15
+# 直方图分桶（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ---- 工作进程 ----
+
+def _compute(kind, args):
+    """在工作进程中执行，返回 (结果, 开始时间, 结束时间)"""
+    started = time.time()
+    if kind == 'fortune':
+        from bazi_calculator import generate_fortune_report
+        result = generate_fortune_report(*args)
+    elif kind == 'ziwei':
+        from ziwei_calculator import generate_ziwei_report
+        result = generate_ziwei_report(*args)
+    elif kind == 'match':
+        from bazi_calculator import match_bazi
+        result = match_bazi(*args)
+    elif kind == 'chart':
+        from chart_codec import encode_chart, to_text
+        result = {'chart': to_text(encode_chart(*args))}
+    elif kind == 'render':
+        from chart_codec import render_report
+        result = render_report(*args)
+    else:
+        raise ValueError(kind)
+    return result, started, time.time()
+
+
+# ---- 指标 ----
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += seconds
+        self.n += 1
+
+
+class Metrics:
+    def __init__(self):
+        # (接口, 阶段) -> 直方图；阶段: queue / compute / serialize / total
+        self.latency = {}
+        # (接口, 状态码) -> 次数
+        self.requests = {}
+        self.coalesced = 0
+        self.rejected = 0
+        self.in_flight = 0
+
+    def observe(self, endpoint, stage, seconds):
+        hist = self.latency.get((endpoint, stage))
+        if hist is None:
+            hist = self.latency[(endpoint, stage)] = LatencyHistogram()
+        hist.observe(seconds)
+
+    def count(self, endpoint, status):
+        self.requests[(endpoint, status)] = self.requests.get((endpoint, status), 0) + 1
+
+    def render(self):
+        lines = ['# TYPE fortune_stage_seconds histogram']
+        for (endpoint, stage), hist in sorted(self.latency.items()):
+            labels = f'endpoint="{endpoint}",stage="{stage}"'
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                lines.append(f'fortune_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'fortune_stage_seconds_bucket{{{labels},le="+Inf"}} {hist.n}')
+            lines.append(f'fortune_stage_seconds_sum{{{labels}}} {hist.total:.6f}')
+            lines.append(f'fortune_stage_seconds_count{{{labels}}} {hist.n}')
+        lines.append('# TYPE fortune_requests_total counter')
+        for (endpoint, status), n in sorted(self.requests.items()):
+            lines.append(f'fortune_requests_total{{endpoint="{endpoint}",status="{status}"}} {n}')
+        lines.append('# TYPE fortune_coalesced_total counter')
+        lines.append(f'fortune_coalesced_total {self.coalesced}')
+        lines.append('# TYPE fortune_rejected_total counter')
+        lines.append(f'fortune_rejected_total {self.rejected}')
+        lines.append('# TYPE fortune_in_flight gauge')
+        lines.append(f'fortune_in_flight {self.in_flight}')
+        return '\n'.join(lines) + '\n'
+
+
+# ---- 参数解析 ----
+
+def _birth(params, with_gender=True):
+    try:
+        values = tuple(int(params[k]) for k in ('year', 'month', 'day', 'hour'))
+    except KeyError as e:
+        raise HttpError(400, f"缺少参数 {e.args[0]}")
+    except (TypeError, ValueError):
+        raise HttpError(400, "year/month/day/hour 须为整数")
+    if not 0 <= values[3] <= 23:
+        raise HttpError(400, "hour 须在 0-23 之间")
+    if not with_gender:
+        return values
+    gender = params.get('gender', '男')
+    if gender not in ('男', '女'):
+        raise HttpError(400, "gender 须为 男 或 女")
+    return values + (gender,)
+
+
+def _chart_key(year, month, day, hour, gender):
+    try:
+        return chart_key(year, month, day, hour, gender)
+    except (ValueError, OverflowError) as e:
+        raise HttpError(400, f"日期无效: {e}")
+
+
+def _chart_record(params):
+    """解码并按历法校验命盘编码（见 chart_codec.decode_context），伪造或损坏的载荷返回 400"""
+    from chart_codec import decode_chart, decode_context, from_text
+    text = params.get('chart')
+    if not isinstance(text, str):
+        raise HttpError(400, "缺少参数 chart")
+    try:
+        record = decode_chart(from_text(text))
+        decode_context(record)
+    except ValueError as e:
+        raise HttpError(400, f"命盘编码无效: {e}")
+    return record
+
+
+class FortuneService:
+    def __init__(self, workers=None, max_queue=DEFAULT_MAX_QUEUE):
+        self.executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self.metrics = Metrics()
+        # 规范化键 -> 在途计算的 Future
+        self._in_flight = {}
+
+    def _request(self, endpoint, params):
+        """解析参数，返回 (合并键, 计算参数)"""
+        if endpoint in ('fortune', 'ziwei'):
+            birth = _birth(params)
+            return (endpoint,) + _chart_key(*birth), birth
+        if endpoint == 'chart':
+            # 编码保留出生钟点，按原始出生信息合并
+            birth = _birth(params)
+            _chart_key(*birth)
+            return ('chart',) + birth, birth
+        if endpoint == 'match':
+            male, female = params.get('male'), params.get('female')
+            if not isinstance(male, dict) or not isinstance(female, dict):
+                raise HttpError(400, "需要 male 与 female 两组出生信息")
+            m, f = _birth(male, False), _birth(female, False)
+            key = ('match',) + _chart_key(*m, '男') + _chart_key(*f, '女')
+            male_info = dict(zip(('year', 'month', 'day', 'hour'), m))
+            female_info = dict(zip(('year', 'month', 'day', 'hour'), f))
+            return key, (male_info, female_info)
+        if endpoint == 'render':
+            record = _chart_record(params)
+            return ('render',) + record, (record,)
+        raise HttpError(404, f"未知接口 /{endpoint}")
+
+    async def compute(self, endpoint, params):
+        key, args = self._request(endpoint, params)
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.metrics.coalesced += 1
+        else:
+            if len(self._in_flight) >= self.max_queue:
+                self.metrics.rejected += 1
+                raise HttpError(503, "服务繁忙，请稍后重试")
+            loop = asyncio.get_running_loop()
+            submitted = time.time()
+            future = asyncio.ensure_future(self._run(loop, endpoint, args, submitted))
+            self._in_flight[key] = future
+            self.metrics.in_flight = len(self._in_flight)
+            future.add_done_callback(lambda _: self._done(key))
+        # shield：某个客户端断开时不取消其他请求共用的计算
+        result = await asyncio.shield(future)
+        if endpoint == 'fortune':
+            # 同一时辰的请求共用一份报告，“出生日期”按本次请求的钟点改写，改在副本上
+            year, month, day, hour = args[:4]
+            result = dict(result, 基本信息=dict(result['基本信息'], 出生日期=f"{year}年{month}月{day}日 {hour}时"))
+        return result
+
+    async def _run(self, loop, endpoint, args, submitted):
+        result, started, finished = await loop.run_in_executor(self.executor, _compute, endpoint, args)
+        self.metrics.observe(endpoint, 'queue', max(0.0, started - submitted))
+        self.metrics.observe(endpoint, 'compute', finished - started)
+        return result
+
+    def _done(self, key):
+        self._in_flight.pop(key, None)
+        self.metrics.in_flight = len(self._in_flight)
+
+    async def handle(self, method, target, body):
+        """返回 (状态码, 内容类型, 响应体 bytes, 额外响应头)"""
+        url = urlsplit(target)
+        endpoint = url.path.strip('/')
+        if endpoint == 'metrics':
+            return 200, 'text/plain; version=0.0.4', self.metrics.render().encode('utf-8'), {}
+        if endpoint == 'health':
+            return 200, 'application/json', b'{"status": "ok"}', {}
+
+        start = time.perf_counter()
+        headers = {}
+        try:
+            if method == 'GET':
+                params = dict(parse_qsl(url.query))
+                if endpoint == 'match':
+                    params = {side: {k[len(side) + 1:]: v for k, v in params.items() if k.startswith(side + '.')}
+                              for side in ('male', 'female')}
+            elif method == 'POST':
+                try:
+                    params = json.loads(body.decode('utf-8') or '{}')
+                except ValueError:
+                    raise HttpError(400, "请求体不是合法的 JSON")
+                if not isinstance(params, dict):
+                    raise HttpError(400, "请求体须为 JSON 对象")
+            else:
+                raise HttpError(405, "仅支持 GET / POST")
+            result = await self.compute(endpoint, params)
+            status = 200
+        except HttpError as e:
+            status, result = e.status, {'error': str(e)}
+            if status == 503:
+                headers['Retry-After'] = '1'
+        except Exception:
+            # 内部异常只写日志，不把异常信息返回给客户端
+            logger.exception("处理 %s %s 时出错", method, target)
+            status, result = 500, {'error': "服务器内部错误"}
+
+        serialize_start = time.perf_counter()
+        payload = json.dumps(result, ensure_ascii=False, default=str).encode('utf-8')
+        done = time.perf_counter()
+        self.metrics.count(endpoint, status)
+        if status == 200:
+            self.metrics.observe(endpoint, 'serialize', done - serialize_start)
+            self.metrics.observe(endpoint, 'total', done - start)
+        return status, 'application/json; charset=utf-8', payload, headers
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    break
+                request_headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        request_headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(request_headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, 'application/json', b'{"error": "bad content-length"}', {},
+                                        False)
+                    break
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, 'application/json', b'{"error": "too large"}', {}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = (request_headers.get('connection', '').lower() != 'close'
+                              and version.upper() == 'HTTP/1.1')
+                status, content_type, payload, headers = await self.handle(method.upper(), target, body)
+                await self._respond(writer, status, content_type, payload, headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, content_type, payload, headers, keep_alive):
+        head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                f"Content-Type: {content_type}",
+                f"Content-Length: {len(payload)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head += [f"{k}: {v}" for k, v in headers.items()]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+        await writer.drain()
+
+    async def serve(self, host='127.0.0.1', port=8000):
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        print(f"命盘服务已启动: http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m fortune_service', description='命盘 HTTP 服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None, help='计算进程数，默认 CPU 核数')
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE, help='最多在途计算数，超出返回 503')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    service = FortuneService(workers=args.workers, max_queue=args.max_queue)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,88 +1,264 @@
+"""
+命理知识库
+
+PDF / DOCX 解析库与 jieba 分词都较重，只在实际导入文件或分词时才加载，
+导入本模块本身只涉及标准库与索引、存储、分词服务几个轻量模块。
+
+界面的后台导入、古籍引证与界面线程的删除会同时用到同一个实例，
+凡是改动或遍历目录、索引、存储连接的方法都持有 KnowledgeBase.lock（可重入），
+一次入库或删除的事务不会与其他线程的读写交错。get_item 只是一次字典查找，不加锁。
+"""
 import os
 import json
-import pandas as pd
-import pdfplumber
-import docx
+import threading
 from datetime import datetime
+from knowledge_catalog import KnowledgeCatalog
+from knowledge_index import KnowledgeIndex, JsonIndexStore, SqliteIndexStore
+from knowledge_tokenizer import get_tokenizer, extract_keywords_many, rank_keywords
+from knowledge_store import JsonKnowledgeStore, SqliteKnowledgeStore, migrate_json_to_sqlite
+
+# 默认的知识库目录（也存放命盘缓存文件）
+DEFAULT_STORAGE_DIR = 'knowledge_data'
+# 每个段落块的目标长度（字符）
+CHUNK_SIZE = 500
+# 检索时每个查询词追加的共现扩展词数
+EXPAND_TERMS = 3
+
+def chunk_text(text, page=None, start_offset=0):
+    """按段落把文本切成约 CHUNK_SIZE 的块，记录页码与在全文中的偏移"""
+    chunks = []
+    buf = []
+    buf_len = 0
+    buf_offset = start_offset
+    offset = start_offset
+    for line in text.split('\n'):
+        # 超长段落硬切
+        while len(line) > CHUNK_SIZE:
+            if buf:
+                chunks.append({'page': page, 'offset': buf_offset, 'content': '\n'.join(buf)})
+                buf, buf_len = [], 0
+            chunks.append({'page': page, 'offset': offset, 'content': line[:CHUNK_SIZE]})
+            line = line[CHUNK_SIZE:]
+            offset += CHUNK_SIZE
+        if not buf:
+            buf_offset = offset
+        buf.append(line)
+        buf_len += len(line) + 1
+        offset += len(line) + 1
+        if buf_len >= CHUNK_SIZE:
+            chunks.append({'page': page, 'offset': buf_offset, 'content': '\n'.join(buf)})
+            buf, buf_len = [], 0
+    if buf and any(buf):
+        chunks.append({'page': page, 'offset': buf_offset, 'content': '\n'.join(buf)})
+    return chunks
+
+def iter_pdf_chunks(file_path):
+    """逐页读取 PDF 并切块，不拼接整本书"""
+    import pdfplumber
+    offset = 0
+    with pdfplumber.open(file_path) as pdf:
+        for page_no, page in enumerate(pdf.pages, 1):
+            page_text = page.extract_text()
+            if page_text:
+                for chunk in chunk_text(page_text, page_no, offset):
+                    yield chunk
+                offset += len(page_text) + 1
+            # 释放已解析页面的缓存
+            page.flush_cache()
+
+def iter_docx_chunks(file_path):
+    import docx
+    doc = docx.Document(file_path)
+    return chunk_text('\n'.join(para.text for para in doc.paragraphs))
 
 class KnowledgeBase:
-    def __init__(self, storage_dir='knowledge_data'):
+    def __init__(self, storage_dir=DEFAULT_STORAGE_DIR, backend='sqlite'):
+        """backend: 'sqlite'（默认，首次启动自动迁移旧 knowledge.json）或 'json'"""
         self.storage_dir = storage_dir
         self.knowledge_file = os.path.join(storage_dir, 'knowledge.json')
+        self.db_file = os.path.join(storage_dir, 'knowledge.db')
+        self.backend = backend
+        self.lock = threading.RLock()
+        self.index_file = os.path.join(storage_dir, 'knowledge_index.json')
+        self.index = KnowledgeIndex()
         self.ensure_directories()
         self.load_knowledge()
+        self.load_index()
     
     def ensure_directories(self):
         if not os.path.exists(self.storage_dir):
             os.makedirs(self.storage_dir)
     
+    def open_store(self):
+        if self.backend == 'json':
+            return JsonKnowledgeStore(self.knowledge_file, chunker=chunk_text)
+        if not os.path.exists(self.db_file) and os.path.exists(self.knowledge_file):
+            count = migrate_json_to_sqlite(self.knowledge_file, self.db_file, chunk_text)
+            print(f"已将 {count} 条知识从 knowledge.json 迁移到 SQLite")
+        return SqliteKnowledgeStore(self.db_file)
+    
     def load_knowledge(self):
-        if os.path.exists(self.knowledge_file):
-            with open(self.knowledge_file, 'r', encoding='utf-8') as f:
-                self.knowledge = json.load(f)
+        # 内存中只保留条目元数据（按 id、分类、添加时间索引），段落块正文按需从存储读取
+        if getattr(self, 'store', None) is not None:
+            self.store.close()
+        self.store = self.open_store()
+        # JSON 后端的索引仍整文件存放；SQLite 后端的索引与统计按行存进同一个数据库
+        if self.backend == 'json':
+            self.index.storage = JsonIndexStore(self.index_file)
         else:
-            self.knowledge = {}
+            self.index.storage = SqliteIndexStore(self.store.conn)
+        self.catalog = KnowledgeCatalog()
+        for category, item in self.store.load_items():
+            self.catalog.add(category, item)
+    
+    @property
+    def knowledge(self):
+        """{分类: [条目]} 快照；按 id 或时间查找请用 get_item / recent_knowledge"""
+        with self.lock:
+            return self.catalog.as_dict()
+    
+    def _iter_index_docs(self):
+        for chunk_id, item_id, content in self.store.iter_chunks():
+            item = self.catalog.get(item_id)
+            yield chunk_id, item['title'] if item else '', content
+    
+    def get_item_content(self, item):
+        """拼回条目全文（仅展示详情时使用）"""
+        with self.lock:
+            return '\n'.join(chunk['content'] for chunk in self.store.get_chunks(item['id']))
+    
+    def load_index(self):
+        # 索引以段落块为单位；缺失或与知识库不一致时整体重建。一致性只比对块 id，不读正文
+        if self.index.load() and self.index.doc_ids() == self.store.chunk_ids():
+            return
+        self.index.rebuild(self._iter_index_docs())
+        self.index.save()
+        # SQLite 后端不再使用旧版的索引 / 统计 JSON 文件
+        if self.backend != 'json':
+            for name in ('knowledge_index.json', 'knowledge_stats.json'):
+                path = os.path.join(self.storage_dir, name)
+                if os.path.exists(path):
+                    os.remove(path)
     
     def save_knowledge(self):
-        with open(self.knowledge_file, 'w', encoding='utf-8') as f:
-            json.dump(self.knowledge, f, ensure_ascii=False, indent=2)
+        self.store.flush()
     
-    def add_knowledge(self, category, title, content, source=None):
-        if category not in self.knowledge:
-            self.knowledge[category] = []
-        
-        knowledge_item = {
-            'id': f"{category}_{len(self.knowledge[category])}_{int(datetime.now().timestamp())}",
+    def _new_item(self, category, title, source, content_hash=None):
+        return {
+            'id': self.catalog.new_id(category),
             'title': title,
-            'content': content,
             'source': source,
-            'added_at': datetime.now().isoformat()
+            'added_at': datetime.now().isoformat(),
+            'content_hash': content_hash
         }
-        
-        self.knowledge[category].append(knowledge_item)
-        self.save_knowledge()
-        return knowledge_item['id']
+    
+    def _indexed_chunks(self, item, chunks, counts=None):
+        # 边写入存储边建索引，段落块只经过一次；counts 为各块事先算好的词频（见 knowledge_ingest）
+        for seq, chunk in enumerate(chunks):
+            chunk['id'] = f"{item['id']}#{seq}"
+            self.index.add(chunk['id'], item['title'], chunk['content'], counts[seq] if counts else None)
+            yield chunk
+    
+    def add_knowledge(self, category, title, content=None, source=None, chunks=None, content_hash=None):
+        """content 为整段文本；也可直接传入 chunks（可迭代的段落块，见 chunk_text）"""
+        return self.add_knowledge_many([{
+            'category': category, 'title': title, 'content': content, 'source': source, 'chunks': chunks,
+            'content_hash': content_hash
+        }])[0]
+    
+    def add_knowledge_many(self, entries):
+        """
+        批量入库，整批一个事务、索引只落盘一次。
+        entries: [{'category', 'title', 'content' 或 'chunks', 'source', 'content_hash'}]，返回新条目 id 列表；
+        传入 chunks 列表时可附带 'counts'：与之对应的各块词频（knowledge_index.analyze，None 表示现算），
+        分词便可在持锁之前完成
+        """
+        with self.lock:
+            batch = []
+            for entry in entries:
+                category = entry['category']
+                item = self._new_item(category, entry['title'], entry.get('source'), entry.get('content_hash'))
+                chunks = entry.get('chunks')
+                if chunks is None:
+                    chunks = chunk_text(entry.get('content') or '')
+                batch.append((category, item, self._indexed_chunks(item, chunks, entry.get('counts'))))
+                self.catalog.add(category, item)
+            try:
+                self.store.add_items(batch)
+            except Exception:
+                # 写入失败时撤回内存与索引中的改动
+                self.load_knowledge()
+                self.load_index()
+                raise
+            self.index.save()
+            return [item['id'] for _, item, _ in batch]
     
     def delete_knowledge(self, category, item_id):
-        if category in self.knowledge:
-            self.knowledge[category] = [item for item in self.knowledge[category] if item['id'] != item_id]
-            self.save_knowledge()
+        """category 为 None 时按条目自身的分类删除"""
+        with self.lock:
+            actual = self.catalog.category(item_id)
+            if actual is None or category not in (None, actual):
+                return False
+            for chunk_id in self._item_chunk_ids(item_id):
+                self.index.remove(chunk_id)
+            self.store.delete_item(actual, item_id)
+            self.catalog.remove(item_id)
+            self.index.save()
             return True
-        return False
+    
+    def _item_chunk_ids(self, item_id):
+        """条目的段落块 id（item_id#0、#1……连续编号），取自索引，不读存储"""
+        seq = 0
+        while True:
+            chunk_id = f"{item_id}#{seq}"
+            if chunk_id not in self.index.doc_len and chunk_id not in self.index.skipped:
+                return
+            yield chunk_id
+            seq += 1
+    
+    def get_item(self, item_id):
+        return self.catalog.get(item_id)
+    
+    def get_item_category(self, item_id):
+        return self.catalog.category(item_id)
+    
+    def recent_knowledge(self, n=None):
+        """最近添加的 n 条，新的在前"""
+        with self.lock:
+            return self.catalog.recent(n)
+    
+    def list_item_ids(self, category=None, order_by='added_at', descending=True):
+        """按分类过滤、按时间或标题排序的条目 id，见 KnowledgeCatalog.ids"""
+        with self.lock:
+            return self.catalog.ids(category, order_by, descending)
     
     def get_knowledge_by_category(self, category):
-        return self.knowledge.get(category, [])
+        with self.lock:
+            return self.catalog.by_category(category)
     
     def get_all_categories(self):
-        return list(self.knowledge.keys())
+        with self.lock:
+            return self.catalog.category_names()
     
     def parse_docx(self, file_path, category, title):
         try:
-            doc = docx.Document(file_path)
-            full_text = []
-            for para in doc.paragraphs:
-                full_text.append(para.text)
-            content = '\n'.join(full_text)
-            
-            return self.add_knowledge(category, title, content, source=file_path)
+            return self.add_knowledge(category, title, source=file_path, chunks=iter_docx_chunks(file_path))
         except Exception as e:
             print(f"解析DOCX文件错误: {e}")
             return None
     
     def parse_pdf(self, file_path, category, title):
         try:
-            content = ''
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        content += page_text + '\n'
-            
-            return self.add_knowledge(category, title, content, source=file_path)
+            return self.add_knowledge(category, title, source=file_path, chunks=iter_pdf_chunks(file_path))
         except Exception as e:
             print(f"解析PDF文件错误: {e}")
             return None
     
+    def ingest_files(self, paths, category=None, workers=None, progress=None, cancel=None):
+        """并行导入 PDF/DOCX 文件，详见 knowledge_ingest.ingest_files"""
+        from knowledge_ingest import ingest_files
+        return ingest_files(self, paths, category=category, workers=workers, progress=progress, cancel=cancel)
+    
     def initialize_with_basic_content(self):
         # 添加一些基础的八字命理知识
         self.add_knowledge(
@@ -113,47 +289,46 @@ class KnowledgeBase:
             '命理分析'
         )
 
-    def extract_keywords(self, text):
-        """从文本中提取关键词"""
-        # 这里可以实现更复杂的关键词提取算法
-        # 目前使用简单的基于词频的方法
-        import jieba
-        import jieba.analyse
-        
-        # 设置停用词
-        stop_words = {'的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个', '上', '也', '很', '到', '说', '要', '去', '你', '会', '着', '没有', '看', '好', '自己', '这'}
-        
-        # 使用jieba分词
-        words = jieba.lcut(text)
-        
-        # 过滤停用词和单个字符
-        filtered_words = [word for word in words if word not in stop_words and len(word) > 1]
-        
-        # 提取关键词（TF-IDF方法）
-        keywords = jieba.analyse.extract_tags(text, topK=20)
-        
-        return keywords
+    def extract_keywords(self, text, top_k=20):
+        """从文本中提取关键词：命理词典分词，按本库语料的 TF-IDF 排序"""
+        return get_tokenizer().keywords(text, top_k, idf=self.index.idf)
+
+    def extract_keywords_many(self, texts, top_k=20, workers=None):
+        """批量提取关键词，分词在多个进程中并行"""
+        return extract_keywords_many(texts, top_k, idf=self.index.idf, workers=workers)
     
     def learn_from_text(self, text, category, title):
-        """从文本中学习知识"""
+        """
+        从文本中提取按本库 TF-IDF 排序的关键词。
+        已入库条目的词频、文档频率与共现计数在入库时就已增量更新（见 knowledge_stats），这里不再重复计数。
+        """
         try:
-            # 提取关键词
-            keywords = self.extract_keywords(text)
-            print(f"从 {title} 中提取的关键词: {keywords}")
-            
-            # 这里可以实现更复杂的学习逻辑，比如：
-            # 1. 建立知识图谱
-            # 2. 学习命理规则
-            # 3. 提取概念之间的关系
-            
-            # 保存学习结果
-            self.save_learning_result(category, title, keywords)
-            
-            return keywords
+            return self.extract_keywords(text)
         except Exception as e:
             print(f"学习过程中出错: {e}")
             return []
     
+    def learn_items(self, item_ids, top_k=20):
+        """
+        已入库条目的学习结果 {条目id: {'keywords', 'related'}}。
+        词频直接取自倒排索引中各段落块的计数，不再读取正文或重新分词。
+        """
+        with self.lock:
+            learned = {}
+            for item_id in item_ids:
+                counts = {}
+                for chunk_id in self._item_chunk_ids(item_id):
+                    for term, tf in self.index.term_counts(chunk_id).items():
+                        counts[term] = counts.get(term, 0) + tf
+                keywords = rank_keywords(counts, top_k, idf=self.index.idf)
+                learned[item_id] = {'keywords': keywords, 'related': self.related_terms(keywords[:5])}
+            return learned
+    
+    def related_terms(self, terms, n=EXPAND_TERMS):
+        """{词: [关联最强的共现词]}，来自全库共现统计"""
+        with self.lock:
+            return {term: [other for other, _ in self.index.stats.related(term, n)] for term in terms}
+    
     def get_relevant_judgment(self, parameters):
         """
         命理语义搜索：根据算命参数获取最相关的天纪断语
@@ -171,48 +346,29 @@ class KnowledgeBase:
         if 'day_stem' in parameters:
             search_terms.append(f"{parameters['day_stem']}日")
             
-        # 遍历所有分类寻找匹配
-        for category in self.get_all_categories():
-            items = self.get_knowledge_by_category(category)
-            for item in items:
-                content = item['content']
-                title = item['title']
-
-                # 增加深度过滤逻辑：跳过目录类非实质内容
-                # 如果内容中含有大量的虚线和页码（如 ............. 23），判定为目录
-                if content.count('...') > 10 or content.count('···') > 10:
+        # 倒排索引 + BM25 检索段落块（目录页、过短内容入库时已过滤），并用共现词扩展查询
+        with self.lock:
+            ranked = self.index.search(search_terms, top_k=3, expand=EXPAND_TERMS)
+            if not ranked:
+                return results
+            for chunk_id, score in ranked:
+                chunk = self.store.get_chunk(chunk_id)
+                item = self.catalog.get(chunk_id.rsplit('#', 1)[0])
+                if chunk is None or item is None:
                     continue
-                if len(content) < 50: # 太短的内容往往也缺乏参考价值
-                    continue
-                
-                score = 0
-                # 语义加权评分
-                for term in search_terms:
-                    if term in title: score += 20 # 标题匹配权重极高
-                    if term in content: score += content.count(term)
-                
-                if score > 0:
-                    results.append({
-                        'content': content,
-                        'score': score,
-                        'source': item.get('source', '天纪资料库')
-                    })
+                results.append({
+                    'content': chunk['content'],
+                    'score': score,
+                    'source': item.get('source') or '天纪资料库',
+                    'title': item['title'],
+                    'page': chunk.get('page'),
+                    'chunk_id': chunk_id,
+                    'offset': chunk['offset']
+                })
         
         # 按相关度排序
         results.sort(key=lambda x: x['score'], reverse=True)
-        return results[:3] # 返回前3条最相关的内容
-
-# 自动安装jieba库（如果需要）
-try:
-    import jieba
-    import jieba.analyse
-except ImportError:
-    print("正在安装jieba库用于中文分词...")
-    import subprocess
-    import sys
-    subprocess.run([sys.executable, '-m', 'pip', 'install', 'jieba'])
-    import jieba
-    import jieba.analyse
+        return results # 返回前3条最相关的内容
 
 if __name__ == '__main__':
     kb = KnowledgeBase()
@@ -0,0 +1,138 @@
+"""
+知识条目目录（内存）
+
+条目元数据常驻内存，按以下方式索引：
+    id -> 条目              取单条、删除 O(1)
+    分类 -> {id: 条目}      按添加顺序列出一个分类，删除不必重建列表
+    (添加时间, 序号, id)    有序列表（全部条目一份，每个分类各一份），插入时二分定位 O(log n)，
+                            新条目时间最晚，直接追加在末尾（只有补录更早的条目才需移动其后的元素）；
+                            删除只把键记为墓碑 O(1)，墓碑超过一半时整体压缩一次，均摊仍为 O(1)；
+                            “最近 N 条”从尾部取、跳过墓碑，按时间列出一个分类不必再排序
+
+条目 id 由 new_id 生成：分类 + 秒级时间戳 + 随机后缀，并与目录中已有 id 比对，
+同一秒内删了再加也不会重复（旧的 分类_条数_时间戳 方案在这种情况下会撞号）。
+"""
+import uuid
+from bisect import insort
+from datetime import datetime
+
+
+class KnowledgeCatalog:
+    def __init__(self):
+        self.items = {}
+        self.categories = {}
+        self.category_of = {}
+        self._by_time = []
+        self._category_by_time = {}
+        self._time_key = {}
+        # 已删除条目时间键中的序号（墓碑，序号唯一），压缩时清掉
+        self._dead = set()
+        self._seq = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item_id):
+        return item_id in self.items
+
+    def new_id(self, category):
+        stamp = int(datetime.now().timestamp())
+        while True:
+            item_id = f"{category}_{stamp}_{uuid.uuid4().hex[:8]}"
+            if item_id not in self.items:
+                return item_id
+
+    def add(self, category, item):
+        item_id = item['id']
+        if item_id in self.items:
+            self.remove(item_id)
+        self.items[item_id] = item
+        self.categories.setdefault(category, {})[item_id] = item
+        self.category_of[item_id] = category
+        # 序号保证同一时间的条目按加入顺序排列
+        key = (item.get('added_at') or '', self._seq, item_id)
+        self._seq += 1
+        self._time_key[item_id] = key
+        insort(self._by_time, key)
+        insort(self._category_by_time.setdefault(category, []), key)
+
+    def remove(self, item_id):
+        """删除并返回条目，不存在时返回 None"""
+        item = self.items.pop(item_id, None)
+        if item is None:
+            return None
+        category = self.category_of.pop(item_id)
+        members = self.categories[category]
+        del members[item_id]
+        key = self._time_key.pop(item_id)
+        self._dead.add(key[1])
+        if not members:
+            del self.categories[category]
+            del self._category_by_time[category]
+        if len(self._dead) * 2 > len(self._by_time):
+            self._compact()
+        return item
+
+    def _compact(self):
+        """去掉时间列表中的墓碑"""
+        dead = self._dead
+        self._by_time = [key for key in self._by_time if key[1] not in dead]
+        for category, keys in self._category_by_time.items():
+            self._category_by_time[category] = [key for key in keys if key[1] not in dead]
+        self._dead = set()
+
+    def get(self, item_id):
+        return self.items.get(item_id)
+
+    def category(self, item_id):
+        return self.category_of.get(item_id)
+
+    def by_category(self, category):
+        """分类下的条目，按添加顺序"""
+        return list(self.categories.get(category, {}).values())
+
+    def category_names(self):
+        return list(self.categories)
+
+    def recent(self, n=None):
+        """最近添加的 n 条（省略时为全部），新的在前"""
+        if n is not None and n <= 0:
+            return []
+        if not self._dead:
+            keys = self._by_time if n is None else self._by_time[-n:]
+            return [self.items[item_id] for _, _, item_id in reversed(keys)]
+        result = []
+        for key in reversed(self._by_time):
+            if key[1] in self._dead:
+                continue
+            result.append(self.items[key[2]])
+            if len(result) == n:
+                break
+        return result
+
+    def ids(self, category=None, order_by='added_at', descending=True):
+        """
+        条目 id 列表，可按分类过滤；order_by 为 'added_at'（按时间索引）或 'title'。
+        只返回 id，条目本身由调用方按需 get，适合分页显示。
+        """
+        if order_by == 'title':
+            members = self.categories.get(category, {}) if category is not None else self.items
+            return sorted(members, key=lambda item_id: (self.items[item_id].get('title') or '', item_id),
+                          reverse=descending)
+        keys = self._by_time if category is None else self._category_by_time.get(category, [])
+        if descending:
+            keys = reversed(keys)
+        dead = self._dead
+        if not dead:
+            return [item_id for _, _, item_id in keys]
+        return [item_id for _, seq, item_id in keys if seq not in dead]
+
+    def iter_items(self):
+        """逐个产出 (分类, 条目)，按分类分组"""
+        for category, members in self.categories.items():
+            for item in members.values():
+                yield category, item
+
+    def as_dict(self):
+        """{分类: [条目]}"""
+        return {category: list(members.values()) for category, members in self.categories.items()}
@@ -0,0 +1,360 @@
+"""
+知识库倒排索引
+
+入库时对每条知识分词（带命理词典的 jieba 词，见 knowledge_tokenizer，+ 命理术语精确短语计数），建立 词 -> {条目id: 词频} 的倒排表，
+检索时按 BM25 打分并保留“标题命中 +20”的加权规则。目录页、过短内容等过滤结果在入库时算好。
+语料统计（词频、文档频率、共现，见 knowledge_stats）随索引同步，检索时可用共现词做查询扩展。
+
+倒排表常驻内存，落盘按段落块存放（块 id、标题、长度、词频表），由存储对象负责：
+    SqliteIndexStore  与知识库同一个 SQLite 文件，只写入自上次保存以来增删过的块与统计行
+    JsonIndexStore    旧版 JSON 后端使用，整文件重写
+加载时由各块的词频表还原倒排表。
+"""
+import os
+import json
+import math
+import heapq
+from operator import itemgetter
+
+from knowledge_tokenizer import get_tokenizer
+from knowledge_stats import CorpusStats
+
+# 3: 改用带命理词典的分词器并去停用词
+# 4: 按段落块落盘，统计与索引存放在一起
+INDEX_VERSION = 4
+
+# BM25 参数
+BM25_K1 = 1.5
+BM25_B = 0.75
+TITLE_BOOST = 20
+# 扩展词相对查询词的权重上限
+EXPANSION_WEIGHT = 0.3
+
+# 需要按原文精确计数的命理短语（jieba 未必能切出来）
+_STEMS = ['甲', '乙', '丙', '丁', '戊', '己', '庚', '辛', '壬', '癸']
+DOMAIN_TERMS = (
+    [s + '日' for s in _STEMS] +
+    ['比肩', '劫财', '食神', '伤官', '偏财', '正财', '七杀', '正官', '枭神', '偏印', '正印'] +
+    ['紫微', '天机', '太阳', '武曲', '天同', '廉贞', '天府', '太阴', '贪狼', '巨门', '天相', '天梁', '破军']
+)
+
+
+def is_substantive(content):
+    """过滤目录页（大量虚线页码）和过短的内容"""
+    if content.count('...') > 10 or content.count('···') > 10:
+        return False
+    return len(content) >= 50
+
+
+def analyze(text):
+    """文本 -> 词频 Counter"""
+    counts = get_tokenizer().terms(text)
+    for phrase in DOMAIN_TERMS:
+        n = text.count(phrase)
+        if n:
+            counts[phrase] = n
+    return counts
+
+
+class JsonIndexStore:
+    """索引与统计写在一个 JSON 文件里，每次保存整文件重写（仅旧版 JSON 后端使用）"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """返回 (块列表 [(id, 标题, 词频表)], 跳过的块 id, 统计行或 None)，文件缺失或版本不符时返回 None"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != INDEX_VERSION:
+            return None
+        stats = data['stats']
+        docs = [(item_id, title, counts) for item_id, (title, counts) in data['docs'].items()]
+        return docs, data['skipped'], (stats['n_docs'], stats['terms'], stats['pairs'])
+
+    def save(self, index):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': INDEX_VERSION,
+                'docs': {item_id: [index.titles[item_id], index.term_counts(item_id)] for item_id in index.doc_len},
+                'skipped': sorted(index.skipped),
+                'stats': {'n_docs': index.stats.n_docs, 'terms': index.stats.term_rows(),
+                          'pairs': index.stats.pair_rows()}
+            }, f, ensure_ascii=False)
+
+
+class SqliteIndexStore:
+    """索引与统计存放在知识库的 SQLite 文件中，每个块、每个词、每个词对一行，保存时只写改动过的行"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value TEXT)')
+            # terms 为块的 {词: 词频} JSON；为 NULL 表示入库时判定为目录页/过短而跳过的块
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS index_docs (
+                id TEXT PRIMARY KEY,
+                title TEXT,
+                length INTEGER,
+                terms TEXT
+            )''')
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS stats_terms (
+                term TEXT PRIMARY KEY, tf INTEGER, df INTEGER
+            ) WITHOUT ROWID''')
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS stats_pairs (
+                a TEXT, b TEXT, count INTEGER, PRIMARY KEY (a, b)
+            ) WITHOUT ROWID''')
+
+    def load(self):
+        """返回值同 JsonIndexStore.load"""
+        meta = dict(self.conn.execute('SELECT key, value FROM index_meta').fetchall())
+        if meta.get('version') != str(INDEX_VERSION):
+            return None
+        docs = []
+        skipped = []
+        for item_id, title, terms in self.conn.execute('SELECT id, title, terms FROM index_docs'):
+            if terms is None:
+                skipped.append(item_id)
+            else:
+                docs.append((item_id, title, json.loads(terms)))
+        stats = None
+        if 'stats_docs' in meta:
+            stats = (int(meta['stats_docs']),
+                     self.conn.execute('SELECT term, tf, df FROM stats_terms').fetchall(),
+                     self.conn.execute('SELECT a, b, count FROM stats_pairs').fetchall())
+        return docs, skipped, stats
+
+    def save(self, index):
+        """index.dirty 为 None 时整体重写，否则只写其中的块；统计同理（见 CorpusStats.changes）"""
+        changes = index.stats.changes()
+        with self.conn:
+            if index.dirty is None:
+                self.conn.execute('DELETE FROM index_docs')
+                ids = index.doc_ids()
+            else:
+                ids = index.dirty
+            rows = []
+            gone = []
+            for item_id in ids:
+                if item_id in index.doc_len:
+                    rows.append((item_id, index.titles[item_id], index.doc_len[item_id],
+                                 json.dumps(index.term_counts(item_id), ensure_ascii=False)))
+                elif item_id in index.skipped:
+                    rows.append((item_id, None, 0, None))
+                else:
+                    gone.append((item_id,))
+            self.conn.executemany('INSERT OR REPLACE INTO index_docs (id, title, length, terms) VALUES (?, ?, ?, ?)',
+                                  rows)
+            self.conn.executemany('DELETE FROM index_docs WHERE id = ?', gone)
+
+            if changes is None:
+                self.conn.execute('DELETE FROM stats_terms')
+                self.conn.execute('DELETE FROM stats_pairs')
+                terms, dead_terms = index.stats.term_rows(), []
+                pairs, dead_pairs = index.stats.pair_rows(), []
+            else:
+                terms, dead_terms, pairs, dead_pairs = changes
+            self.conn.executemany('INSERT OR REPLACE INTO stats_terms (term, tf, df) VALUES (?, ?, ?)', terms)
+            self.conn.executemany('DELETE FROM stats_terms WHERE term = ?', [(t,) for t in dead_terms])
+            self.conn.executemany('INSERT OR REPLACE INTO stats_pairs (a, b, count) VALUES (?, ?, ?)', pairs)
+            self.conn.executemany('DELETE FROM stats_pairs WHERE a = ? AND b = ?', dead_pairs)
+            self.conn.executemany('INSERT OR REPLACE INTO index_meta (key, value) VALUES (?, ?)',
+                                  [('version', str(INDEX_VERSION)), ('stats_docs', str(index.stats.n_docs))])
+
+
+class KnowledgeIndex:
+    def __init__(self, storage=None):
+        """storage: JsonIndexStore / SqliteIndexStore，省略时只在内存中"""
+        self.storage = storage
+        self.stats = CorpusStats()
+        self._reset()
+
+    def _reset(self):
+        self.postings = {}
+        self.doc_len = {}
+        self.titles = {}
+        self.doc_terms = {}
+        # 标题 -> 段落块 id、字 -> 标题：标题加权只看包含查询词全部字的标题，不扫全部条目
+        self.title_docs = {}
+        self.title_chars = {}
+        # 入库时判定为目录页/过短而不进索引的条目
+        self.skipped = set()
+        self.total_len = 0
+        self._norms = None
+        # 自上次保存以来增删过的块；None 表示下次保存整体重写
+        self.dirty = None
+
+    def load(self):
+        """从存储读取索引，成功返回 True；统计缺失或与索引对不上时由各块词频重算"""
+        data = self.storage.load() if self.storage is not None else None
+        if data is None:
+            return False
+        docs, skipped, stats = data
+        self._reset()
+        for item_id, title, counts in docs:
+            self._insert(item_id, title, counts)
+        self.skipped = set(skipped)
+        if stats is not None:
+            self.stats.load_rows(*stats)
+        if stats is None or self.stats.n_docs != len(self.doc_len) or self.stats.total_tf != self.total_len:
+            self.stats.rebuild(self.term_counts(item_id) for item_id in self.doc_len)
+        self.dirty = set()
+        return True
+
+    def save(self):
+        """写入自上次保存以来的改动"""
+        if self.storage is not None:
+            self.storage.save(self)
+        self.dirty = set()
+        self.stats.mark_saved()
+
+    def doc_ids(self):
+        return set(self.doc_len) | self.skipped
+
+    def _touch(self, item_id):
+        if self.dirty is not None:
+            self.dirty.add(item_id)
+
+    def add(self, item_id, title, content, counts=None):
+        """加入一条知识；不具参考价值的内容不进索引。counts 为事先算好的 analyze(content)，省略时在这里分词"""
+        self.remove(item_id)
+        self._touch(item_id)
+        if not is_substantive(content):
+            self.skipped.add(item_id)
+            return
+        if counts is None:
+            counts = analyze(content)
+        self._insert(item_id, title, counts)
+        self.stats.add(counts)
+
+    def _insert(self, item_id, title, counts):
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[item_id] = tf
+        length = sum(counts.values())
+        self.doc_terms[item_id] = list(counts)
+        self.doc_len[item_id] = length
+        self.titles[item_id] = title
+        self._add_title(item_id, title)
+        self.total_len += length
+        self._norms = None
+
+    def remove(self, item_id):
+        if item_id in self.skipped:
+            self.skipped.discard(item_id)
+            self._touch(item_id)
+        if item_id not in self.doc_len:
+            return
+        self._touch(item_id)
+        self.stats.remove(self.term_counts(item_id))
+        for term in self.doc_terms.pop(item_id, []):
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(item_id, None)
+                if not docs:
+                    del self.postings[term]
+        self.total_len -= self.doc_len.pop(item_id)
+        self._norms = None
+        title = self.titles.pop(item_id, None)
+        if title is not None:
+            self._remove_title(item_id, title)
+
+    def _add_title(self, item_id, title):
+        docs = self.title_docs.get(title)
+        if docs is None:
+            docs = self.title_docs[title] = set()
+            for ch in set(title):
+                self.title_chars.setdefault(ch, set()).add(title)
+        docs.add(item_id)
+
+    def _remove_title(self, item_id, title):
+        docs = self.title_docs.get(title)
+        if docs is None:
+            return
+        docs.discard(item_id)
+        if not docs:
+            del self.title_docs[title]
+            for ch in set(title):
+                titles = self.title_chars[ch]
+                titles.discard(title)
+                if not titles:
+                    del self.title_chars[ch]
+
+    def _titles_containing(self, term):
+        """包含 term 的标题：先取 term 中最少见的字对应的标题，再逐个确认"""
+        candidates = []
+        for ch in set(term):
+            titles = self.title_chars.get(ch)
+            if not titles:
+                return []
+            candidates.append(titles)
+        return [title for title in min(candidates, key=len) if term in title]
+
+    def rebuild(self, items):
+        """items: 可迭代的 (id, title, content)；下次保存时整体重写"""
+        self._reset()
+        self.stats.clear()
+        for item_id, title, content in items:
+            self.add(item_id, title, content)
+
+    def term_counts(self, item_id):
+        """已入索引的条目的 词 -> 词频，由倒排表取出，不重新分词"""
+        return {term: self.postings[term][item_id] for term in self.doc_terms.get(item_id, ())}
+
+    def idf(self, term):
+        """语料 IDF：log((N + 1) / (df + 1)) + 1，库中未出现的词取最大值；供关键词提取使用"""
+        return self.stats.idf(term)
+
+    def _query_terms(self, term):
+        """查询词在词表中则直接使用，否则拆成索引中的词"""
+        if term in self.postings:
+            return [term]
+        return [t for t in analyze(term) if t in self.postings]
+
+    def _doc_norms(self):
+        """BM25 的文档长度归一项，索引变动后第一次检索时重算"""
+        if self._norms is None:
+            avgdl = self.total_len / len(self.doc_len) if self.total_len else 1.0
+            self._norms = {item_id: BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl)
+                           for item_id, length in self.doc_len.items()}
+        return self._norms
+
+    def search(self, terms, top_k=3, expand=0):
+        """
+        返回 [(条目id, 得分)]，按得分降序。
+        expand > 0 时每个查询词再取 expand 个共现最多的词参与打分，权重为 EXPANSION_WEIGHT × 共现比例。
+        """
+        n_docs = len(self.doc_len)
+        if not n_docs:
+            return []
+        # 索引词 -> 权重；重复的查询词按次数累加
+        weights = {}
+        for term in terms:
+            if term:
+                for t in self._query_terms(term):
+                    weights[t] = weights.get(t, 0.0) + 1.0
+        if expand:
+            for t in list(weights):
+                for other, share in self.stats.related(t, expand):
+                    if other in self.postings and weights.get(other, 0.0) < 1.0:
+                        weights[other] = max(weights.get(other, 0.0), EXPANSION_WEIGHT * share)
+        norms = self._doc_norms()
+        scores = {}
+        get = scores.get
+        for t, weight in weights.items():
+            docs = self.postings[t]
+            idf = weight * math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for item_id, tf in docs.items():
+                scores[item_id] = get(item_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norms[item_id])
+        # 标题匹配权重极高
+        for term in terms:
+            if not term:
+                continue
+            for title in self._titles_containing(term):
+                for item_id in self.title_docs[title]:
+                    scores[item_id] = scores.get(item_id, 0.0) + TITLE_BOOST
+        # 只取前 top_k，同分保持先后顺序（与完整排序后截取一致）
+        return heapq.nlargest(top_k, (r for r in scores.items() if r[1] > 0), key=itemgetter(1))
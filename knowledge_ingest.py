@@ -0,0 +1,246 @@
+"""
+知识库文件批量导入
+
+PDF/DOCX 的文字提取放到进程池里并行执行：PDF 按页段拆成小任务，多个文件的任务依次排队，
+主进程按页序取回结果、切块并分词，整个文件的段落块就绪后一次写入存储。每个文件在一个事务内写入，
+取消或出错时整个文件回滚（提取阶段取消则什么都不写），已完成的文件不受影响。
+文件内容的 SHA-256 记在条目上，重复上传未改动的文件直接跳过；同一路径的文件内容变了则导入新版本并删除旧条目。
+只在写入一个文件（及删除它的旧版本）时持有知识库的锁（KnowledgeBase.lock），
+提取期间其他线程的检索与删除照常进行。
+
+工作进程只运行本模块中的提取函数，不会加载知识库、jieba 等较重的模块。
+"""
+import os
+import hashlib
+from collections import deque, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+
+SUPPORTED_EXTS = ('.pdf', '.docx')
+# 每个 PDF 任务提取的页数
+PAGES_PER_TASK = 8
+# 每个工作进程最多预排的任务数，限制已提交、尚未取回的提取结果占用的内存
+TASKS_PER_WORKER = 4
+# 等待任务时检查取消标志的间隔（秒）
+POLL_INTERVAL = 0.1
+
+# status: 'parsing'（逐页进度）/ 'added' / 'skipped' / 'unsupported' / 'failed' / 'cancelled'
+IngestProgress = namedtuple('IngestProgress', 'file_index file_count path pages_done pages_total status')
+
+
+class IngestCancelled(Exception):
+    pass
+
+
+def file_hash(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def pdf_page_count(path):
+    import pdfplumber
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_pdf_pages(path, start, stop):
+    """提取第 start 到 stop-1 页（从 0 起）的文字，在工作进程中执行"""
+    import pdfplumber
+    texts = []
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages[start:stop]:
+            texts.append(page.extract_text() or '')
+            # 释放已解析页面的缓存
+            page.flush_cache()
+    return texts
+
+
+def extract_docx_text(path):
+    import docx
+    return ['\n'.join(para.text for para in docx.Document(path).paragraphs)]
+
+
+class _InlineExecutor:
+    """workers <= 1 时在当前进程内顺序执行，接口与进程池一致"""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class _Job:
+    def __init__(self, index, path, category, title):
+        self.index = index
+        self.path = path
+        self.category = category
+        self.title = title
+        self.digest = None
+        self.replaces = None
+        # [(提取函数, 参数, 起始页)]，DOCX 没有页码，起始页为 None
+        self.tasks = []
+        self.futures = deque()
+        self.pages_total = 0
+        self.pages_done = 0
+        self.result = {'path': path, 'status': None, 'item_id': None, 'error': None}
+
+
+def _plan(kb, paths, category):
+    """逐个文件判定是否需要导入，并拆分提取任务"""
+    by_hash = {}
+    by_source = {}
+    with kb.lock:
+        for cat, item in kb.catalog.iter_items():
+            if item.get('content_hash'):
+                by_hash[item['content_hash']] = item
+            if item.get('source'):
+                by_source[item['source']] = (cat, item)
+
+    jobs = []
+    for index, path in enumerate(paths):
+        title = os.path.splitext(os.path.basename(path))[0]
+        cat = category(title) if callable(category) else (category or '未分类')
+        job = _Job(index, path, cat, title)
+        jobs.append(job)
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in SUPPORTED_EXTS:
+            job.result['status'] = 'unsupported'
+            continue
+        try:
+            job.digest = file_hash(path)
+            if job.digest in by_hash:
+                job.result['status'] = 'skipped'
+                job.result['item_id'] = by_hash[job.digest]['id']
+                continue
+            # 同一批里内容相同的文件只导入一次
+            by_hash[job.digest] = {'id': None}
+            job.replaces = by_source.get(path)
+            if ext == '.pdf':
+                job.pages_total = pdf_page_count(path)
+                job.tasks = [(extract_pdf_pages, (path, start, min(start + PAGES_PER_TASK, job.pages_total)), start)
+                             for start in range(0, job.pages_total, PAGES_PER_TASK)]
+            else:
+                job.pages_total = 1
+                job.tasks = [(extract_docx_text, (path,), None)]
+        except Exception as e:
+            job.result['status'] = 'failed'
+            job.result['error'] = str(e)
+    return jobs
+
+
+def ingest_files(kb, paths, category=None, workers=None, progress=None, cancel=None):
+    """
+    并行导入一批 PDF/DOCX 文件到知识库 kb。
+    category: 分类名，或 根据文件标题返回分类名的函数；标题取文件名
+    workers: 工作进程数，默认 CPU 核数；<= 1 时在当前进程内顺序执行
+    progress: 回调，接收 IngestProgress，每完成一页和每个文件结束时各调用一次
+    cancel: threading.Event 之类带 is_set() 的对象，置位后尽快停止，当前文件回滚
+    返回每个文件的结果 [{'path', 'status', 'item_id', 'error'}]，顺序与 paths 一致
+    """
+    from knowledge_base import chunk_text
+    from knowledge_index import analyze, is_substantive
+
+    paths = list(paths)
+    jobs = _plan(kb, paths, category)
+    n_tasks = sum(len(job.tasks) for job in jobs)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, n_tasks)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else _InlineExecutor()
+    limit = max(workers, 1) * TASKS_PER_WORKER
+    queue = deque((job, task) for job in jobs for task in job.tasks)
+    in_flight = 0
+
+    def report(job, status):
+        if progress is not None:
+            progress(IngestProgress(job.index, len(jobs), job.path, job.pages_done, job.pages_total, status))
+
+    def top_up():
+        nonlocal in_flight
+        while queue and in_flight < limit:
+            job, (fn, args, start) = queue.popleft()
+            job.futures.append((executor.submit(fn, *args), start))
+            in_flight += 1
+
+    def discard(job):
+        """丢弃文件剩余的任务（出错或取消时）"""
+        nonlocal in_flight
+        while job.futures:
+            future, _ = job.futures.popleft()
+            future.cancel()
+            in_flight -= 1
+        for entry in [entry for entry in queue if entry[0] is job]:
+            queue.remove(entry)
+
+    def job_chunks(job):
+        nonlocal in_flight
+        offset = 0
+        for _ in job.tasks:
+            if not job.futures:
+                top_up()
+            future, start = job.futures.popleft()
+            in_flight -= 1
+            while not wait([future], timeout=POLL_INTERVAL).done:
+                if cancel is not None and cancel.is_set():
+                    future.cancel()
+                    raise IngestCancelled()
+            texts = future.result()
+            top_up()
+            for i, text in enumerate(texts):
+                page = None if start is None else start + i + 1
+                if text:
+                    for chunk in chunk_text(text, page, offset):
+                        yield chunk
+                    offset += len(text) + 1
+                job.pages_done += 1
+                report(job, 'parsing')
+        if cancel is not None and cancel.is_set():
+            raise IngestCancelled()
+
+    cancelled = False
+    try:
+        top_up()
+        for job in jobs:
+            if job.result['status'] is None and (cancelled or (cancel is not None and cancel.is_set())):
+                cancelled = True
+                job.result['status'] = 'cancelled'
+            if job.result['status'] is not None:
+                discard(job)
+                report(job, job.result['status'])
+                continue
+            try:
+                # 提取、切块与分词都不持锁，文件的段落块先缓存在内存里
+                chunks = list(job_chunks(job))
+                counts = [analyze(chunk['content']) if is_substantive(chunk['content']) else None
+                          for chunk in chunks]
+                # 只在写入时持锁：新版本入库与删除旧版本之间不让其他线程看到两份
+                with kb.lock:
+                    item_id = kb.add_knowledge_many([{
+                        'category': job.category, 'title': job.title, 'source': job.path,
+                        'chunks': chunks, 'counts': counts, 'content_hash': job.digest
+                    }])[0]
+                    job.result['status'] = 'added'
+                    job.result['item_id'] = item_id
+                    if job.replaces is not None:
+                        kb.delete_knowledge(job.replaces[0], job.replaces[1]['id'])
+            except IngestCancelled:
+                cancelled = True
+                job.result['status'] = 'cancelled'
+            except Exception as e:
+                job.result['status'] = 'failed'
+                job.result['error'] = str(e)
+            discard(job)
+            report(job, job.result['status'])
+    finally:
+        for job in jobs:
+            discard(job)
+        executor.shutdown(wait=True)
+    return [job.result for job in jobs]
@@ -0,0 +1,196 @@
+"""
+知识库语料统计
+
+随倒排索引增量维护全库的词频（TF）、文档频率（DF）与词共现计数，文档即索引中的段落块：
+    入库一个块只更新该块出现的词与它的高频词对，删除时按同样的计数撤回，都与块的大小成正比；
+    词以整数编号存放，TF / DF 是按编号的定长数组，共现是 编号 -> {编号: 块数} 的稀疏邻接表。
+
+共现只统计每个块中词频最高的 COOC_TERMS 个词（同频按词排序，保证撤回时选出同一组），
+用于检索时的查询扩展：与查询词经常出现在同一块里的词以较低权重参与打分（见 KnowledgeIndex.search）。
+统计随索引一起落盘（见 knowledge_index 的索引存储）：记录自上次保存以来改动过的词与词对，
+保存时只写这些行；缺失或与索引对不上时由倒排表重算，不必重新分词。
+"""
+import heapq
+import math
+from array import array
+
+# 每个块参与共现统计的词数
+COOC_TERMS = 8
+# 共现块数或相似度低于此值的词对不用于扩展（到处出现的词彼此都共现，但没有关联）
+MIN_COOCCURRENCE = 2
+MIN_SIMILARITY = 0.1
+
+
+def top_terms(counts, n=COOC_TERMS):
+    """块内词频最高的 n 个词"""
+    return heapq.nsmallest(n, counts, key=lambda term: (-counts[term], term))
+
+
+class CorpusStats:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.n_docs = 0
+        self.vocab = {}
+        self.terms = []
+        self.tf = array('q')
+        self.df = array('q')
+        self.cooc = {}
+        self._related = {}
+        # 自上次保存以来改动过的词编号与词对 (a, b)，a < b；_rewrite 为真时下次保存全部重写
+        self._dirty_terms = set()
+        self._dirty_pairs = set()
+        self._rewrite = True
+
+    def _term_id(self, term):
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            term_id = self.vocab[term] = len(self.terms)
+            self.terms.append(term)
+            self.tf.append(0)
+            self.df.append(0)
+        return term_id
+
+    def add(self, counts):
+        """计入一个块：counts 为 词 -> 块内词频"""
+        self.n_docs += 1
+        for term, tf in counts.items():
+            term_id = self._term_id(term)
+            self.tf[term_id] += tf
+            self.df[term_id] += 1
+        ids = [self.vocab[term] for term in top_terms(counts)]
+        self._touch(counts, ids)
+        if len(ids) < 2:
+            return
+        for a in ids:
+            row = self.cooc.setdefault(a, {})
+            for b in ids:
+                if a != b:
+                    row[b] = row.get(b, 0) + 1
+
+    def remove(self, counts):
+        """撤回 add(counts) 的计数"""
+        self.n_docs -= 1
+        for term, tf in counts.items():
+            term_id = self.vocab[term]
+            self.tf[term_id] -= tf
+            self.df[term_id] -= 1
+        ids = [self.vocab[term] for term in top_terms(counts)]
+        self._touch(counts, ids)
+        if len(ids) < 2:
+            return
+        for a in ids:
+            row = self.cooc[a]
+            for b in ids:
+                if a != b:
+                    if row[b] == 1:
+                        del row[b]
+                    else:
+                        row[b] -= 1
+            if not row:
+                del self.cooc[a]
+
+    def _touch(self, counts, ids):
+        self._related.clear()
+        if self._rewrite:
+            return
+        vocab = self.vocab
+        self._dirty_terms.update(vocab[term] for term in counts)
+        self._dirty_pairs.update((a, b) for a in ids for b in ids if a < b)
+
+    def rebuild(self, docs):
+        """docs: 可迭代的块词频"""
+        self.clear()
+        for counts in docs:
+            self.add(counts)
+
+    @property
+    def total_tf(self):
+        return sum(self.tf)
+
+    def term_frequency(self, term):
+        term_id = self.vocab.get(term)
+        return 0 if term_id is None else self.tf[term_id]
+
+    def doc_frequency(self, term):
+        term_id = self.vocab.get(term)
+        return 0 if term_id is None else self.df[term_id]
+
+    def idf(self, term):
+        """log((N + 1) / (df + 1)) + 1，库中未出现的词取最大值"""
+        return math.log((self.n_docs + 1) / (self.doc_frequency(term) + 1)) + 1
+
+    def related(self, term, n=3):
+        """
+        与 term 关联最强的 n 个共现词，返回 [(词, 权重)]；
+        按余弦相似度 共现块数 / √(两词块数之积) 排序并作为权重，常见的泛用词不会压过专门相关的词。
+        """
+        key = (term, n)
+        cached = self._related.get(key)
+        if cached is not None:
+            return cached
+        term_id = self.vocab.get(term)
+        row = self.cooc.get(term_id) if term_id is not None else None
+        result = []
+        if row:
+            df = self.df[term_id]
+            scored = ((count / math.sqrt(df * self.df[b]), self.terms[b])
+                      for b, count in row.items() if count >= MIN_COOCCURRENCE)
+            best = heapq.nsmallest(n, ((-sim, other) for sim, other in scored if sim >= MIN_SIMILARITY))
+            result = [(other, -neg) for neg, other in best]
+        self._related[key] = result
+        return result
+
+    def term_rows(self, term_ids=None):
+        """[(词, 词频, 文档频率)]，省略 term_ids 时为全部仍出现的词"""
+        if term_ids is None:
+            term_ids = range(len(self.terms))
+        return [(self.terms[i], self.tf[i], self.df[i]) for i in term_ids if self.df[i] > 0]
+
+    def pair_rows(self, pairs=None):
+        """[(词, 词, 共现块数)]，两词按字符串升序；省略 pairs 时为全部"""
+        if pairs is None:
+            pairs = ((a, b) for a, row in self.cooc.items() for b in row if a < b)
+        rows = []
+        for a, b in pairs:
+            count = self.cooc.get(a, {}).get(b)
+            if count:
+                x, y = sorted((self.terms[a], self.terms[b]))
+                rows.append((x, y, count))
+        return rows
+
+    def changes(self):
+        """
+        自上次 mark_saved 以来的改动，None 表示需要整体重写；
+        否则返回 (要写入的词行, 要删除的词, 要写入的词对行, 要删除的词对)。
+        """
+        if self._rewrite:
+            return None
+        terms = self.term_rows(self._dirty_terms)
+        dead_terms = [self.terms[i] for i in self._dirty_terms if self.df[i] <= 0]
+        pairs = self.pair_rows(self._dirty_pairs)
+        dead_pairs = [tuple(sorted((self.terms[a], self.terms[b]))) for a, b in self._dirty_pairs
+                      if not self.cooc.get(a, {}).get(b)]
+        return terms, dead_terms, pairs, dead_pairs
+
+    def mark_saved(self):
+        self._dirty_terms = set()
+        self._dirty_pairs = set()
+        self._rewrite = False
+
+    def load_rows(self, n_docs, term_rows, pair_rows):
+        """由 term_rows / pair_rows 的结果还原"""
+        self.clear()
+        self.n_docs = n_docs
+        for term, tf, df in term_rows:
+            term_id = self._term_id(term)
+            self.tf[term_id] = tf
+            self.df[term_id] = df
+        for x, y, count in pair_rows:
+            a, b = self.vocab.get(x), self.vocab.get(y)
+            if a is None or b is None:
+                continue
+            self.cooc.setdefault(a, {})[b] = count
+            self.cooc.setdefault(b, {})[a] = count
+        self.mark_saved()
@@ -0,0 +1,264 @@
+"""
+知识库存储后端
+
+KnowledgeBase 通过统一接口读写条目与段落块，具体存放方式可替换：
+    JsonKnowledgeStore    旧版 knowledge.json，整文件读写
+    SqliteKnowledgeStore  SQLite (WAL)，条目表 + 段落块表 + FTS5 全文表，按条增删、批量写入走单个事务
+
+条目元数据常驻内存（很小），段落块正文只在需要时从存储中读取。
+"""
+import os
+import json
+import sqlite3
+
+from knowledge_catalog import KnowledgeCatalog
+
+
+class JsonKnowledgeStore:
+    """把全部知识存放在一个 JSON 文件中（旧格式，段落块内嵌在条目里）"""
+
+    def __init__(self, path, chunker=None):
+        self.path = path
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        else:
+            self.data = {}
+        if chunker is not None:
+            self._upgrade(chunker)
+
+    def _upgrade(self, chunker):
+        """旧版整段 content 的条目就地切块"""
+        changed = False
+        for items in self.data.values():
+            for item in items:
+                if 'chunks' not in item:
+                    item['chunks'] = _numbered(item['id'], chunker(item.pop('content', '')))
+                    changed = True
+        if changed:
+            self._save()
+
+    def _save(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+
+    def load_items(self):
+        """返回 [(分类, 条目元数据)]，按添加顺序"""
+        result = []
+        for category, items in self.data.items():
+            for item in items:
+                meta = {k: v for k, v in item.items() if k not in ('chunks', 'content')}
+                result.append((category, meta))
+        return result
+
+    def raw_items(self):
+        """[(分类, 完整条目)]，供迁移使用；旧版未切块的条目仍带 content"""
+        return [(category, item) for category, items in self.data.items() for item in items]
+
+    def add_items(self, entries):
+        """entries: [(分类, 条目元数据, 段落块列表)]"""
+        for category, item, chunks in entries:
+            self.data.setdefault(category, []).append(dict(item, chunks=list(chunks)))
+        self._save()
+
+    def delete_item(self, category, item_id):
+        if category not in self.data:
+            return False
+        self.data[category] = [item for item in self.data[category] if item['id'] != item_id]
+        self._save()
+        return True
+
+    def get_chunks(self, item_id):
+        for items in self.data.values():
+            for item in items:
+                if item['id'] == item_id:
+                    return item.get('chunks', [])
+        return []
+
+    def get_chunk(self, chunk_id):
+        item_id = chunk_id.rsplit('#', 1)[0]
+        for chunk in self.get_chunks(item_id):
+            if chunk['id'] == chunk_id:
+                return chunk
+        return None
+
+    def iter_chunks(self):
+        """逐个产出 (段落块id, 条目id, 正文)"""
+        for items in self.data.values():
+            for item in items:
+                for chunk in item.get('chunks', []):
+                    yield chunk['id'], item['id'], chunk['content']
+
+    def chunk_ids(self):
+        return {chunk['id'] for items in self.data.values() for item in items for chunk in item.get('chunks', [])}
+
+    def flush(self):
+        self._save()
+
+    def close(self):
+        pass
+
+
+class SqliteKnowledgeStore:
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self._create_schema()
+
+    def _create_schema(self):
+        with self.conn:
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS items (
+                id TEXT PRIMARY KEY,
+                category TEXT NOT NULL,
+                title TEXT,
+                source TEXT,
+                added_at TEXT,
+                content_hash TEXT
+            )''')
+            # 早期数据库没有 content_hash 列
+            columns = {row['name'] for row in self.conn.execute('PRAGMA table_info(items)')}
+            if 'content_hash' not in columns:
+                self.conn.execute('ALTER TABLE items ADD COLUMN content_hash TEXT')
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS chunks (
+                rowid INTEGER PRIMARY KEY,
+                id TEXT UNIQUE NOT NULL,
+                item_id TEXT NOT NULL REFERENCES items(id) ON DELETE CASCADE,
+                seq INTEGER,
+                page INTEGER,
+                offset INTEGER,
+                content TEXT
+            )''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_chunks_item ON chunks(item_id, seq)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_items_category ON items(category)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_items_hash ON items(content_hash)')
+            # 全文表引用 chunks 的正文，不重复存储；中文优先用 trigram 分词
+            try:
+                self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5("
+                                  "content, content='chunks', content_rowid='rowid', tokenize='trigram')")
+            except sqlite3.OperationalError:
+                self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5("
+                                  "content, content='chunks', content_rowid='rowid')")
+            self.conn.execute('''CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+                INSERT INTO chunks_fts(rowid, content) VALUES (new.rowid, new.content);
+            END''')
+            self.conn.execute('''CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+                INSERT INTO chunks_fts(chunks_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+            END''')
+
+    def load_items(self):
+        rows = self.conn.execute('SELECT id, category, title, source, added_at, content_hash '
+                                 'FROM items ORDER BY rowid').fetchall()
+        return [(row['category'], {'id': row['id'], 'title': row['title'], 'source': row['source'],
+                                   'added_at': row['added_at'], 'content_hash': row['content_hash']})
+                for row in rows]
+
+    def add_items(self, entries):
+        """批量写入，整批在一个事务里完成；chunks 可以是生成器，边读边写"""
+        with self.conn:
+            for category, item, chunks in entries:
+                self.conn.execute('INSERT INTO items (id, category, title, source, added_at, content_hash) '
+                                  'VALUES (?, ?, ?, ?, ?, ?)',
+                                  (item['id'], category, item['title'], item.get('source'), item.get('added_at'),
+                                   item.get('content_hash')))
+                self.conn.executemany(
+                    'INSERT INTO chunks (id, item_id, seq, page, offset, content) VALUES (?, ?, ?, ?, ?, ?)',
+                    ((c['id'], item['id'], seq, c.get('page'), c.get('offset'), c['content'])
+                     for seq, c in enumerate(chunks)))
+
+    def delete_item(self, category, item_id):
+        with self.conn:
+            self.conn.execute('DELETE FROM chunks WHERE item_id = ?', (item_id,))
+            cur = self.conn.execute('DELETE FROM items WHERE id = ? AND category = ?', (item_id, category))
+        return cur.rowcount > 0
+
+    def _chunk(self, row):
+        return {'id': row['id'], 'page': row['page'], 'offset': row['offset'], 'content': row['content']}
+
+    def get_chunks(self, item_id):
+        rows = self.conn.execute('SELECT id, page, offset, content FROM chunks WHERE item_id = ? ORDER BY seq',
+                                 (item_id,)).fetchall()
+        return [self._chunk(row) for row in rows]
+
+    def get_chunk(self, chunk_id):
+        row = self.conn.execute('SELECT id, page, offset, content FROM chunks WHERE id = ?', (chunk_id,)).fetchone()
+        return self._chunk(row) if row else None
+
+    def iter_chunks(self):
+        for row in self.conn.execute('SELECT id, item_id, content FROM chunks ORDER BY rowid'):
+            yield row['id'], row['item_id'], row['content']
+
+    def chunk_ids(self):
+        """只取段落块 id，不读正文"""
+        return {row[0] for row in self.conn.execute('SELECT id FROM chunks')}
+
+    def search_text(self, phrase, limit=20):
+        """全文短语检索，返回段落块 id；trigram 不支持的短词退回 LIKE"""
+        if len(phrase) >= 3:
+            quoted = '"' + phrase.replace('"', '""') + '"'
+            sql = ('SELECT c.id FROM chunks_fts f JOIN chunks c ON c.rowid = f.rowid '
+                   'WHERE chunks_fts MATCH ? ORDER BY rank LIMIT ?')
+            try:
+                return [row['id'] for row in self.conn.execute(sql, (quoted, limit))]
+            except sqlite3.OperationalError:
+                pass
+        sql = 'SELECT id FROM chunks WHERE content LIKE ? LIMIT ?'
+        return [row['id'] for row in self.conn.execute(sql, (f"%{phrase}%", limit))]
+
+    def flush(self):
+        # 每次写入都已在事务中提交，这里只做一次 WAL 检查点
+        self.conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+
+    def close(self):
+        self.conn.close()
+
+
+def _numbered(item_id, chunks):
+    for seq, chunk in enumerate(chunks):
+        chunk['id'] = f"{item_id}#{seq}"
+    return chunks
+
+
+def migrate_json_to_sqlite(json_path, db_path, chunker):
+    """
+    一次性把旧版 knowledge.json 迁移到 SQLite。
+    先写入临时文件再改名，中途失败不会留下半成品数据库；返回迁移的条目数。
+    旧版 id（分类_序号_秒级时间戳）可能重复，重复的条目改用新 id，段落块随之重新编号。
+    """
+    source = JsonKnowledgeStore(json_path)
+    tmp_path = db_path + '.migrating'
+    _remove_db_files(tmp_path)
+    catalog = KnowledgeCatalog()
+    entries = []
+    for category, item in source.raw_items():
+        meta = {k: v for k, v in item.items() if k not in ('chunks', 'content')}
+        chunks = item.get('chunks')
+        if meta.get('id') in catalog:
+            meta['id'] = catalog.new_id(category)
+            if chunks is not None:
+                chunks = _numbered(meta['id'], [dict(chunk) for chunk in chunks])
+        if chunks is None:
+            # 旧版未切块的条目
+            chunks = _numbered(meta['id'], chunker(item.get('content', '')))
+        catalog.add(category, meta)
+        entries.append((category, meta, chunks))
+    target = SqliteKnowledgeStore(tmp_path)
+    try:
+        target.add_items(entries)
+        target.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    except Exception:
+        target.close()
+        _remove_db_files(tmp_path)
+        raise
+    target.close()
+    os.replace(tmp_path, db_path)
+    return len(entries)
+
+
+def _remove_db_files(path):
+    for name in (path, path + '-wal', path + '-shm'):
+        if os.path.exists(name):
+            os.remove(name)
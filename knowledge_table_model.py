@@ -0,0 +1,87 @@
+"""
+知识列表的表格模型
+
+QTableView 通过 KnowledgeTableModel 读取知识库目录（KnowledgeCatalog），不再逐行往 QTableWidget 里插入：
+    分类过滤与排序在知识库一侧完成（list_item_ids），模型只保存一份条目 id 列表；
+    行按批次懒加载，视图滚动到底部时由 canFetchMore / fetchMore 再追加 FETCH_BATCH 行；
+    单元格在绘制时才按 id 取条目元数据，段落块正文只在打开详情时读取。
+"""
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+# 每批追加的行数
+FETCH_BATCH = 200
+
+# 列 -> 条目字段（也是排序依据）
+COLUMNS = (('文件名', 'title'), ('上传时间', 'added_at'))
+
+
+class KnowledgeTableModel(QAbstractTableModel):
+    def __init__(self, knowledge_base, parent=None, batch_size=FETCH_BATCH):
+        super().__init__(parent)
+        self.knowledge_base = knowledge_base
+        self.batch_size = batch_size
+        self.category = None
+        self.order_by = 'added_at'
+        self.descending = True
+        self._ids = []
+        self._loaded = 0
+
+    def set_category(self, category):
+        """category 为 None 时显示所有分类"""
+        self.category = category
+        self.reload()
+
+    def reload(self):
+        """按当前的分类与排序重新取 id 列表，只先显示第一批"""
+        self.beginResetModel()
+        self._ids = self.knowledge_base.list_item_ids(self.category, self.order_by, self.descending)
+        self._loaded = min(self.batch_size, len(self._ids))
+        self.endResetModel()
+
+    def item_id(self, row):
+        return self._ids[row] if 0 <= row < self._loaded else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item_id = self.item_id(index.row())
+        if role == Qt.UserRole:
+            return item_id
+        item = self.knowledge_base.get_item(item_id)
+        if item is None:
+            return None
+        if role == Qt.DisplayRole:
+            return item.get(COLUMNS[index.column()][1]) or ''
+        if role == Qt.ToolTipRole:
+            return item.get('source')
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._ids)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.batch_size, len(self._ids) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """表头点击排序：交给知识库的索引，不在视图里排"""
+        self.order_by = COLUMNS[column][1]
+        self.descending = order == Qt.DescendingOrder
+        self.reload()
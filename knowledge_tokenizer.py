@@ -0,0 +1,207 @@
+"""
+命理分词服务
+
+每个进程只加载一次 jieba 词典：首次使用时由 jieba 自带词典加上命理领域词（干支、十神、星曜、
+神煞、格局、宫位等）建好前缀词典，用 marshal 写入缓存文件；之后的进程直接读缓存（约 0.3 秒，
+jieba 从词典文本初始化约需 1 秒）。缓存文件名含 jieba 版本与领域词表的摘要，任一变化自动重建。
+
+关键词按 TF-IDF 排序，IDF 取自已入库的知识（见 KnowledgeIndex.idf），不用 jieba 通用语料的 IDF；
+知识库为空时退化为按词频排序。大批文本可用 extract_keywords_many 在多个进程中并行分词。
+
+    python -m knowledge_tokenizer       # 预先生成缓存文件
+"""
+import hashlib
+import marshal
+import os
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from bazi_core import TIAN_GAN, DI_ZHI, WU_XING, JIA_ZI, TEN_GODS
+from ziwei_core import ALL_STARS, PALACE_NAMES, HUA_NAMES
+
+DEFAULT_TOP_K = 20
+# 少于这么多篇时不值得启动工作进程
+PARALLEL_MIN_DOCS = 64
+
+STOP_WORDS = frozenset({
+    '的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个', '上', '也', '很', '到', '说',
+    '要', '去', '你', '会', '着', '没有', '看', '好', '自己', '这'
+})
+
+SHEN_SHA = (
+    '天乙贵人', '太极贵人', '文昌贵人', '天德贵人', '月德贵人', '天德合', '月德合', '福星贵人', '国印贵人',
+    '将星', '华盖', '驿马', '桃花', '咸池', '红鸾', '天喜', '孤辰', '寡宿', '羊刃', '飞刃', '劫煞', '亡神',
+    '灾煞', '空亡', '天罗地网', '魁罡', '金舆', '禄神', '学堂', '词馆', '红艳', '勾绞', '丧门', '吊客',
+    '白虎', '元辰', '十恶大败', '阴差阳错', '孤鸾煞', '童子煞'
+)
+
+GE_JU = (
+    '正官格', '七杀格', '正财格', '偏财格', '正印格', '偏印格', '食神格', '伤官格', '建禄格', '月刃格',
+    '从财格', '从杀格', '从儿格', '从旺格', '从强格', '化气格', '曲直格', '炎上格', '稼穑格', '从革格',
+    '润下格', '杀印相生', '伤官配印', '食神制杀', '财官双美', '伤官见官', '枭神夺食',
+    '紫府同宫', '机月同梁', '杀破狼', '日月并明', '府相朝垣', '石中隐玉', '明珠出海', '七杀朝斗',
+    '日照雷门', '月朗天门', '阳梁昌禄', '禄马交驰', '火贪格', '铃贪格', '君臣庆会'
+)
+
+TERMS = (
+    '日主', '日元', '用神', '喜神', '忌神', '仇神', '闲神', '月令', '大运', '流年', '流月', '纳音', '十神',
+    '天干', '地支', '藏干', '四柱', '八字', '身强', '身弱', '得令', '失令', '通根', '透干', '合化',
+    '三合', '六合', '三会', '六冲', '相刑', '相害', '命宫', '身宫', '五行局', '四化', '大限', '小限'
+)
+
+# 命理领域词，加入词典以保证整词切出
+DOMAIN_WORDS = tuple(dict.fromkeys(
+    list(JIA_ZI)
+    + [s + '日' for s in TIAN_GAN]
+    + [s + WU_XING[i // 2] for i, s in enumerate(TIAN_GAN)]
+    + [b + '月' for b in DI_ZHI]
+    + list(TEN_GODS) + ['偏印']
+    + list(ALL_STARS)
+    + [star + hua for star in ALL_STARS[:14] for hua in HUA_NAMES]
+    + list(PALACE_NAMES)
+    + list(SHEN_SHA) + list(GE_JU) + list(TERMS)
+))
+
+
+def load_jieba():
+    """
+    首次分词时才导入 jieba，未安装时自动安装；
+    不分词的进程（排盘、移动端）因此不必加载它。
+    """
+    try:
+        import jieba
+    except ImportError:
+        print("正在安装jieba库用于中文分词...")
+        import subprocess
+        import sys
+        subprocess.run([sys.executable, '-m', 'pip', 'install', 'jieba'])
+        import jieba
+    return jieba
+
+
+def _signature(jieba):
+    digest = hashlib.md5('\n'.join(DOMAIN_WORDS).encode('utf-8')).hexdigest()[:12]
+    return f"{jieba.__version__}-{digest}"
+
+
+def default_cache_file(jieba):
+    return os.path.join(tempfile.gettempdir(), f"bazi_jieba_{_signature(jieba)}.cache")
+
+
+class Tokenizer:
+    """带命理词典的 jieba 分词器；词典在第一次分词时加载"""
+
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file
+        self._tk = None
+        self._lock = threading.Lock()
+
+    @property
+    def jieba(self):
+        """已初始化的 jieba.Tokenizer 实例"""
+        if self._tk is None:
+            with self._lock:
+                if self._tk is None:
+                    self._tk = self._load()
+        return self._tk
+
+    def _load(self):
+        jieba = load_jieba()
+        jieba.setLogLevel(60)
+        tk = jieba.Tokenizer()
+        path = self.cache_file or default_cache_file(jieba)
+        signature = _signature(jieba)
+        try:
+            with open(path, 'rb') as f:
+                cached_signature, freq, total = marshal.loads(f.read())
+            if cached_signature == signature:
+                tk.FREQ, tk.total = freq, total
+                tk.initialized = True
+                return tk
+        except (OSError, ValueError, EOFError, TypeError):
+            pass
+        tk.initialize()
+        for word in DOMAIN_WORDS:
+            tk.add_word(word)
+        # 先写临时文件再替换，并发进程不会读到半截缓存
+        try:
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                marshal.dump((signature, tk.FREQ, tk.total), f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+        return tk
+
+    def lcut(self, text):
+        return self.jieba.lcut(text)
+
+    def terms(self, text):
+        """文本 -> 词频 Counter（去掉单字、空白与停用词）"""
+        return Counter(w for w in self.jieba.lcut(text) if len(w) > 1 and not w.isspace() and w not in STOP_WORDS)
+
+    def keywords(self, text, top_k=DEFAULT_TOP_K, idf=None):
+        return rank_keywords(self.terms(text), top_k, idf)
+
+
+def rank_keywords(counts, top_k=DEFAULT_TOP_K, idf=None):
+    """
+    按 TF-IDF 取前 top_k 个词；idf 为 词 -> 权重 的函数（如 KnowledgeIndex.idf），省略时按词频。
+    同分时保留词在文中首次出现的顺序。
+    """
+    if not counts:
+        return []
+    if idf is None:
+        scored = counts.items()
+    else:
+        scored = ((term, tf * idf(term)) for term, tf in counts.items())
+    ranked = sorted(scored, key=lambda x: x[1], reverse=True)
+    return [term for term, _ in ranked[:top_k]]
+
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def get_tokenizer():
+    """进程内共享的分词器"""
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                _tokenizer = Tokenizer()
+    return _tokenizer
+
+
+def _worker_terms(texts):
+    """在工作进程中执行：每个进程的分词器只加载一次（读缓存文件）"""
+    tokenizer = get_tokenizer()
+    return [tokenizer.terms(text) for text in texts]
+
+
+def extract_keywords_many(texts, top_k=DEFAULT_TOP_K, idf=None, workers=None, chunk_size=32):
+    """
+    批量提取关键词，返回与 texts 等长的关键词列表。
+    分词在 workers 个进程中并行（默认 CPU 核数，篇数少时直接在本进程完成），打分在本进程。
+    """
+    texts = list(texts)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(texts) < PARALLEL_MIN_DOCS:
+        all_terms = _worker_terms(texts)
+    else:
+        # 先在本进程建好缓存文件，工作进程只需读取
+        get_tokenizer().jieba
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            all_terms = [terms for batch in pool.map(_worker_terms, chunks) for terms in batch]
+    return [rank_keywords(terms, top_k, idf) for terms in all_terms]
+
+
+if __name__ == '__main__':
+    import time
+    started = time.perf_counter()
+    tokenizer = get_tokenizer()
+    tokenizer.jieba
+    print(f"分词器已就绪（{time.perf_counter() - started:.2f} 秒），缓存: {default_cache_file(load_jieba())}")
@@ -1,25 +1,46 @@
 import sys
 import os
 import json
+import threading
 from datetime import datetime
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout, QHBoxLayout,
     QGridLayout, QLabel, QLineEdit, QPushButton, QTextEdit, QComboBox, QDateEdit, QTimeEdit,
-    QGroupBox, QScrollArea, QTableWidget, QTableWidgetItem, QHeaderView,
-    QMessageBox, QFileDialog, QSplitter
+    QGroupBox, QScrollArea, QTableView, QHeaderView,
+    QMessageBox, QFileDialog, QSplitter, QProgressDialog
 )
 from PyQt5.QtCore import Qt, QDate, QTime
-from PyQt5.QtGui import QFont, QIcon, QColor
+from PyQt5.QtGui import QFont, QIcon, QColor, QTextCursor
 
-from knowledge_base import KnowledgeBase
-from bazi_calculator import calculate_bazi, analyze_bazi, generate_fortune_report, match_bazi, calculate_10_year_luck
-from ziwei_calculator import generate_ziwei_report
+from bazi_calculator import get_knowledge_base
+from app_sections import (
+    fortune_sections, person_sections, person_solution_sections, couple_sections, couple_solution_sections
+)
+from chart_cache import configure_cache
+from knowledge_base import DEFAULT_STORAGE_DIR
+from knowledge_table_model import KnowledgeTableModel
+from task_runner import TaskRunner
+
+# 时辰 -> 起始小时
+SHICHEN_HOURS = {
+    '子时': 0, '丑时': 2, '寅时': 4, '卯时': 6,
+    '辰时': 8, '巳时': 10, '午时': 12, '未时': 14,
+    '申时': 16, '酉时': 18, '戌时': 20, '亥时': 22
+}
 
 class SuanMingApp(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.knowledge_base = KnowledgeBase()
+        # 与古籍引证共用同一个知识库实例；首次启动可能要迁移旧数据、重建索引，放到后台打开（见 load_knowledge_base）
+        self.knowledge_base = None
+        self.knowledge_model = None
+        # 命盘缓存落盘，重启后仍可命中
+        configure_cache(persist_path=os.path.join(DEFAULT_STORAGE_DIR, 'chart_cache.sqlite'))
+        # 所有计算都在后台线程执行，界面线程只负责显示
+        self.task_runner = TaskRunner(self)
         self.init_ui()
+        self._connect_stale_cancel()
+        self.load_knowledge_base()
     
     def init_ui(self):
         # 设置窗口基本属性
@@ -266,16 +287,13 @@ class SuanMingApp(QMainWindow):
         cat_layout.addWidget(QLabel('选择分类:'))
         self.category_combo = QComboBox()
         self.category_combo.addItem('所有分类')
-        self.category_combo.addItems(self.knowledge_base.get_all_categories())
         self.category_combo.currentIndexChanged.connect(self.refresh_knowledge_table)
         cat_layout.addWidget(self.category_combo)
         
-        # 创建知识列表表格
-        self.knowledge_table = QTableWidget()
-        self.knowledge_table.setColumnCount(2)
-        self.knowledge_table.setHorizontalHeaderLabels(['文件名', '上传时间'])
+        # 知识列表表格：模型在知识库加载完成后设置（见 _on_knowledge_base_loaded）
+        self.knowledge_table = QTableView()
         self.knowledge_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.knowledge_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.knowledge_table.setSelectionBehavior(QTableView.SelectRows)
         
         # 创建知识详情显示
         self.knowledge_detail = QTextEdit()
@@ -283,7 +301,7 @@ class SuanMingApp(QMainWindow):
         self.knowledge_detail.setStyleSheet("background-color: #f0f0f0;")
         
         # 连接表格选择事件
-        self.knowledge_table.cellClicked.connect(self.show_knowledge_detail)
+        self.knowledge_table.clicked.connect(self.show_knowledge_detail)
         
         # 添加到主布局
         layout.addLayout(btn_layout)
@@ -292,11 +310,84 @@ class SuanMingApp(QMainWindow):
         layout.addWidget(QLabel('知识详情:'))
         layout.addWidget(self.knowledge_detail)
         
-        # 刷新知识表格
-        self.refresh_knowledge_table()
-        
         return tab
     
+    def load_knowledge_base(self):
+        """在后台打开知识库，完成前知识库页不可用"""
+        self.tabs.setTabEnabled(self.tabs.indexOf(self.knowledge_tab), False)
+        self.tabs.setTabToolTip(self.tabs.indexOf(self.knowledge_tab), '知识库加载中...')
+        
+        def load(task):
+            get_knowledge_base()
+        
+        self.task_runner.submit('knowledge_load', load, on_done=self._on_knowledge_base_loaded,
+                                on_error=self._on_knowledge_base_failed)
+    
+    def _on_knowledge_base_loaded(self):
+        self.knowledge_base = get_knowledge_base()
+        self.category_combo.addItems(self.knowledge_base.get_all_categories())
+        # 模型按需分批取行，排序与分类过滤由知识库完成
+        self.knowledge_model = KnowledgeTableModel(self.knowledge_base, self)
+        self.knowledge_table.setModel(self.knowledge_model)
+        # 先设好默认排序（上传时间，新的在前），开启排序时按它取数据
+        self.knowledge_table.horizontalHeader().setSortIndicator(1, Qt.DescendingOrder)
+        self.knowledge_table.setSortingEnabled(True)
+        self.refresh_knowledge_table()
+        index = self.tabs.indexOf(self.knowledge_tab)
+        self.tabs.setTabEnabled(index, True)
+        self.tabs.setTabToolTip(index, '')
+    
+    def _on_knowledge_base_failed(self, message):
+        self.tabs.setTabToolTip(self.tabs.indexOf(self.knowledge_tab), f'知识库加载失败: {message}')
+        QMessageBox.critical(self, '错误', f'知识库加载失败: {message}')
+    
+    def closeEvent(self, event):
+        # 关闭窗口时作废所有后台任务，避免结果回写到已销毁的控件
+        self.task_runner.cancel_all()
+        super().closeEvent(event)
+    
+    def _stream_to(self, channel, pane, sections, error_title='错误', error_prefix='计算过程中出现错误'):
+        """在后台逐段计算，每得到一段就追加到结果面板；同一面板的旧请求自动作废"""
+        pane.setPlainText('正在计算...')
+        first = [True]
+        
+        def on_section(text):
+            if first[0]:
+                pane.clear()
+                first[0] = False
+            pane.moveCursor(QTextCursor.End)
+            pane.insertPlainText(text)
+        
+        def on_error(message):
+            if first[0]:
+                pane.clear()
+            QMessageBox.critical(self, error_title, f'{error_prefix}: {message}')
+        
+        self.task_runner.submit(channel, lambda task: sections(), on_section, on_error=on_error)
+    
+    def _connect_stale_cancel(self):
+        # 输入一变，正在进行的计算即作废
+        for signal in (self.birth_date.dateChanged, self.birth_time.timeChanged, self.gender_combo.currentIndexChanged):
+            signal.connect(lambda *_: self.task_runner.cancel('fortune'))
+        for side in ('male', 'female'):
+            for combo in (getattr(self, f'{side}_year'), getattr(self, f'{side}_month'),
+                          getattr(self, f'{side}_day'), getattr(self, f'{side}_time')):
+                combo.currentIndexChanged.connect(lambda *_, side=side: (self.task_runner.cancel(side),
+                                                                         self.task_runner.cancel('couple')))
+    
+    def _read_person(self, side):
+        """读取配对页一方的出生信息"""
+        time_text = getattr(self, f'{side}_time').currentText()
+        # 从时辰文本中提取对应的小时
+        hour = next(h for key, h in SHICHEN_HOURS.items() if key in time_text)
+        return {
+            'year': int(getattr(self, f'{side}_year').currentText()),
+            'month': int(getattr(self, f'{side}_month').currentText()),
+            'day': int(getattr(self, f'{side}_day').currentText()),
+            'hour': hour,
+            'time_text': time_text
+        }
+    
     def calculate_fortune(self):
         # 获取输入数据
         birth_date = self.birth_date.date()
@@ -309,719 +400,77 @@ class SuanMingApp(QMainWindow):
         day = birth_date.day()
         hour = birth_time.hour()
         
-        try:
-            # 生成命理报告
-            report = generate_fortune_report(year, month, day, hour, gender)
-            
-            # 获取八字信息进行五行分析
-            bazi_info = calculate_bazi(year, month, day, hour, gender)
-            bazi_analysis = analyze_bazi(bazi_info)
-            
-            # 生成紫微斗数分析报告
-            ziwei_report = generate_ziwei_report(year, month, day, hour, gender)
-            
-            # 格式化结果显示
-            result_text = "个人命理分析报告\n"
-            result_text += "=" * 50 + "\n"
-            
-            # 基本信息
-            result_text += "【基本信息】\n"
-            for key, value in report['基本信息'].items():
-                result_text += f"{key}: {value}\n"
-            result_text += "\n"
-            
-            # 八字五行分析
-            result_text += "【八字五行分析】\n"
-            result_text += f"日元: {bazi_analysis['日元']}\n"
-            result_text += f"日元五行: {bazi_analysis['日元五行']}\n"
-            result_text += "五行分布: "
-            for elem, count in bazi_analysis['五行分布'].items():
-                result_text += f"{elem}: {count}个, "
-            result_text = result_text.rstrip(', ') + "\n"
-            result_text += f"强弱势分析: {bazi_analysis['强弱势分析']}\n"
-            result_text += f"性格分析: {bazi_analysis['性格分析']}\n"
-            result_text += f"事业分析: {bazi_analysis['事业分析']}\n"
-            result_text += f"运势概要: {bazi_analysis['运势概要']}\n"
-            result_text += "\n"
-            
-            # 紫微斗数分析
-            result_text += ziwei_report + "\n"
-            
-            # 命理建议
-            result_text += "【综合建议】\n"
-            result_text += f"{report['建议']}\n"
-            
-            # 显示结果
-            self.result_text.setPlainText(result_text)
-            
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'计算过程中出现错误: {str(e)}')
+        self._stream_to('fortune', self.result_text,
+                        lambda: fortune_sections(year, month, day, hour, gender))
     
     def analyze_compatibility(self):
         # 这个方法保持兼容原有功能，实际使用的是新的analyze_couple_compatibility方法
         pass
     
     def calculate_male_fortune(self):
-        # 获取男性信息
-        try:
-            year = int(self.male_year.currentText())
-            month = int(self.male_month.currentText())
-            day = int(self.male_day.currentText())
-            time_text = self.male_time.currentText()
-            
-            # 从时辰文本中提取对应的小时
-            hour_map = {
-                '子时': 0, '丑时': 2, '寅时': 4, '卯时': 6, 
-                '辰时': 8, '巳时': 10, '午时': 12, '未时': 14, 
-                '申时': 16, '酉时': 18, '戌时': 20, '亥时': 22
-            }
-            for key in hour_map:
-                if key in time_text:
-                    hour = hour_map[key]
-                    break
-            
-            # 生成八字命理报告
-            bazi_info = calculate_bazi(year, month, day, hour, '男')
-            bazi_analysis = analyze_bazi(bazi_info)
-            
-            # 计算10年大运
-            luck_periods = calculate_10_year_luck(bazi_info)
-            
-            # 生成紫微斗数报告
-            ziwei_report = generate_ziwei_report(year, month, day, hour, '男')
-            
-            # 格式化结果显示
-            result_text = "男性命理分析报告\n"
-            result_text += "=" * 50 + "\n"
-            
-            # 基本信息
-            result_text += "【基本信息】\n"
-            result_text += f"出生日期: {year}年{month}月{day}日{hour}时\n"
-            result_text += f"性别: 男\n"
-            result_text += f"八字: {bazi_info['four_pillars']}\n\n"
-            
-            # 八字五行分析
-            result_text += "【八字五行分析】\n"
-            result_text += f"日元: {bazi_analysis['日元']}\n"
-            result_text += f"日元五行: {bazi_analysis['日元五行']}\n"
-            result_text += "五行分布: "
-            for element, count in bazi_analysis['五行分布'].items():
-                result_text += f"{element}{count} "
-            result_text += "\n"
-            result_text += f"强弱势分析: {bazi_analysis['强弱势分析']}\n"
-            result_text += f"性格分析: {bazi_analysis['性格分析']}\n"
-            result_text += f"运势概要: {bazi_analysis['运势概要']}\n"
-            result_text += f"事业分析: {bazi_analysis['事业分析']}\n\n"
-            
-            # 紫微斗数分析
-            result_text += "【紫微斗数分析】\n"
-            result_text += f"命宫位置: {ziwei_report['命宫位置']}\n"
-            result_text += f"命宫主星: {'、'.join(ziwei_report['命宫主星']) if ziwei_report['命宫主星'] else '无主星'}\n"
-            result_text += f"身宫位置: {ziwei_report['身宫位置']}\n"
-            result_text += f"总体评断: {ziwei_report['总体评断']}\n"
-            result_text += "\n"
-            
-            # 添加10年大运分析
-            result_text += "【10年大运分析】\n"
-            for i, period in enumerate(luck_periods):
-                result_text += f"第{i+1}步大运: {period['大运']}\n"
-                result_text += f"年龄范围: {period['年龄']}\n"
-                result_text += f"运势简析: {period['简析']}\n"
-                result_text += "-" * 40 + "\n"
-            
-            # 显示结果
-            self.male_analysis_text.setPlainText(result_text)
-            
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'计算过程中出现错误: {str(e)}')
+        p = self._read_person('male')
+        self._stream_to('male', self.male_analysis_text,
+                        lambda: person_sections(p['year'], p['month'], p['day'], p['hour'], '男', p['time_text']))
     
     def calculate_female_fortune(self):
-        # 获取女性信息
-        try:
-            year = int(self.female_year.currentText())
-            month = int(self.female_month.currentText())
-            day = int(self.female_day.currentText())
-            time_text = self.female_time.currentText()
-            
-            # 从时辰文本中提取对应的小时
-            hour_map = {
-                '子时': 0, '丑时': 2, '寅时': 4, '卯时': 6, 
-                '辰时': 8, '巳时': 10, '午时': 12, '未时': 14, 
-                '申时': 16, '酉时': 18, '戌时': 20, '亥时': 22
-            }
-            for key in hour_map:
-                if key in time_text:
-                    hour = hour_map[key]
-                    break
-            
-            # 生成八字命理报告
-            bazi_info = calculate_bazi(year, month, day, hour, '女')
-            bazi_analysis = analyze_bazi(bazi_info)
-            
-            # 计算10年大运
-            luck_periods = calculate_10_year_luck(bazi_info)
-            
-            # 生成紫微斗数报告
-            ziwei_report = generate_ziwei_report(year, month, day, hour, '女')
-            
-            # 格式化结果显示
-            result_text = "女性命理分析报告\n"
-            result_text += "=" * 50 + "\n"
-            
-            # 基本信息
-            result_text += "【基本信息】\n"
-            result_text += f"出生日期: {year}年{month}月{day}日{hour}时\n"
-            result_text += f"性别: 女\n"
-            result_text += f"八字: {bazi_info['four_pillars']}\n\n"
-            
-            # 八字五行分析
-            result_text += "【八字五行分析】\n"
-            result_text += f"日元: {bazi_analysis['日元']}\n"
-            result_text += f"日元五行: {bazi_analysis['日元五行']}\n"
-            result_text += "五行分布: "
-            for element, count in bazi_analysis['五行分布'].items():
-                result_text += f"{element}{count} "
-            result_text += "\n"
-            result_text += f"强弱势分析: {bazi_analysis['强弱势分析']}\n"
-            result_text += f"性格分析: {bazi_analysis['性格分析']}\n"
-            result_text += f"运势概要: {bazi_analysis['运势概要']}\n"
-            result_text += f"事业分析: {bazi_analysis['事业分析']}\n\n"
-            
-            # 紫微斗数分析
-            result_text += "【紫微斗数分析】\n"
-            result_text += f"命宫位置: {ziwei_report['命宫位置']}\n"
-            result_text += f"命宫主星: {'、'.join(ziwei_report['命宫主星']) if ziwei_report['命宫主星'] else '无主星'}\n"
-            result_text += f"身宫位置: {ziwei_report['身宫位置']}\n"
-            result_text += f"总体评断: {ziwei_report['总体评断']}\n"
-            result_text += "\n"
-            
-            # 添加10年大运分析
-            result_text += "【10年大运分析】\n"
-            for i, period in enumerate(luck_periods):
-                result_text += f"第{i+1}步大运: {period['大运']}\n"
-                result_text += f"年龄范围: {period['年龄']}\n"
-                result_text += f"运势简析: {period['简析']}\n"
-                result_text += "-" * 40 + "\n"
-            
-            # 显示结果
-            self.female_analysis_text.setPlainText(result_text)
-            
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'计算过程中出现错误: {str(e)}')
+        p = self._read_person('female')
+        self._stream_to('female', self.female_analysis_text,
+                        lambda: person_sections(p['year'], p['month'], p['day'], p['hour'], '女', p['time_text']))
     
     def analyze_couple_compatibility(self):
-        # 获取男性信息
-        try:
-            male_year = int(self.male_year.currentText())
-            male_month = int(self.male_month.currentText())
-            male_day = int(self.male_day.currentText())
-            male_time_text = self.male_time.currentText()
-            
-            # 获取女性信息
-            female_year = int(self.female_year.currentText())
-            female_month = int(self.female_month.currentText())
-            female_day = int(self.female_day.currentText())
-            female_time_text = self.female_time.currentText()
-            
-            # 从时辰文本中提取对应的小时
-            hour_map = {
-                '子时': 0, '丑时': 2, '寅时': 4, '卯时': 6, 
-                '辰时': 8, '巳时': 10, '午时': 12, '未时': 14, 
-                '申时': 16, '酉时': 18, '戌时': 20, '亥时': 22
-            }
-            
-            for key in hour_map:
-                if key in male_time_text:
-                    male_hour = hour_map[key]
-                    break
-            
-            for key in hour_map:
-                if key in female_time_text:
-                    female_hour = hour_map[key]
-                    break
-            
-            # 计算两人八字
-            male_bazi = calculate_bazi(male_year, male_month, male_day, male_hour, '男')
-            female_bazi = calculate_bazi(female_year, female_month, female_day, female_hour, '女')
-            
-            # 计算双方10年大运
-            male_luck_periods = calculate_10_year_luck(male_bazi)
-            female_luck_periods = calculate_10_year_luck(female_bazi)
-            
-            # 计算配对结果
-            compatibility = calculate_compatibility(male_bazi, female_bazi)
-            
-            # 计算双方八字五行分析
-            male_bazi_analysis = analyze_bazi(male_bazi)
-            female_bazi_analysis = analyze_bazi(female_bazi)
-            
-            # 生成紫微斗数报告
-            male_ziwei = generate_ziwei_report(male_year, male_month, male_day, male_hour, '男')
-            female_ziwei = generate_ziwei_report(female_year, female_month, female_day, female_hour, '女')
-            
-            # 格式化结果显示
-            result_text = "男女配对分析报告\n"
-            result_text += "=" * 50 + "\n"
-            
-            # 双方信息
-            result_text += "【双方信息】\n"
-            result_text += f"男性: {male_year}年{male_month}月{male_day}日{male_time_text}\n"
-            result_text += f"八字: {male_bazi['four_pillars']}\n"
-            result_text += f"日元: {male_bazi_analysis['日元']}({male_bazi_analysis['日元五行']})\n\n"
-            result_text += f"女性: {female_year}年{female_month}月{female_day}日{female_time_text}\n"
-            result_text += f"八字: {female_bazi['four_pillars']}\n"
-            result_text += f"日元: {female_bazi_analysis['日元']}({female_bazi_analysis['日元五行']})\n\n"
-            
-            # 八字配对分析
-            result_text += "【八字配对分析】\n"
-            for key, value in compatibility.items():
-                result_text += f"{key}: {value}\n"            
-            result_text += "\n"
-            
-            # 紫微斗数配对分析
-            result_text += "【紫微斗数配对分析】\n"
-            result_text += f"男方命宫主星: {'、'.join(male_ziwei['命宫主星']) if male_ziwei['命宫主星'] else '无主星'}\n"
-            result_text += f"女方命宫主星: {'、'.join(female_ziwei['命宫主星']) if female_ziwei['命宫主星'] else '无主星'}\n"
-            
-            # 根据主星关系给出分析
-            male_main_star = male_ziwei.get('命宫主星', '')
-            female_main_star = female_ziwei.get('命宫主星', '')
-            
-            if '紫微' in male_main_star and '天府' in female_main_star:
-                result_text += "主星配对评价: 紫微天府，帝王搭配，相辅相成，贵气十足。\n"
-            elif '贪狼' in male_main_star and '七杀' in female_main_star:
-                result_text += "主星配对评价: 贪狼七杀，个性强烈，需要相互包容理解。\n"
-            elif '天机' in male_main_star and '太阴' in female_main_star:
-                result_text += "主星配对评价: 天机太阴，聪明睿智，情感细腻，心灵相通。\n"
-            else:
-                result_text += "主星配对评价: 两人主星各具特色，需要相互欣赏对方的优点。\n"
-            
-            # 添加双方大运分析
-            result_text += "【双方大运分析】\n"
-            result_text += "男方大运:\n"
-            for i, period in enumerate(male_luck_periods):
-                result_text += f"第{i+1}步大运: {period['大运']}\n"
-                result_text += f"年龄范围: {period['年龄']}\n"
-                result_text += f"运势简析: {period['简析'][:20]}...\n"
-                result_text += "-" * 20 + "\n"
-            
-            result_text += "\n女方大运:\n"
-            for i, period in enumerate(female_luck_periods):
-                result_text += f"第{i+1}步大运: {period['大运']}\n"
-                result_text += f"年龄范围: {period['年龄']}\n"
-                result_text += f"运势简析: {period['简析'][:20]}...\n"
-                result_text += "-" * 20 + "\n"
-            
-            # 大运配对建议
-            result_text += "\n【大运配对建议】\n"
-            # 这里是简化的大运配对建议逻辑
-            # 在实际应用中，可以根据双方大运的五行生克关系给出更详细的建议
-            result_text += "根据双方大运走势，建议关注以下几点：\n"
-            result_text += "1. 在对方大运波动较大的时期，给予更多理解和支持\n"
-            result_text += "2. 利用双方大运互补的阶段，共同规划重要人生决策\n"
-            result_text += "3. 注意双方大运可能产生冲突的时期，保持沟通和包容\n"
-            
-            # 显示结果
-            self.compatibility_text.setPlainText(result_text)
-            
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'分析过程中出现错误: {str(e)}')
+        male, female = self._read_person('male'), self._read_person('female')
+        self._stream_to('couple', self.compatibility_text, lambda: couple_sections(male, female),
+                        error_prefix='分析过程中出现错误')
     
     def generate_male_solution(self):
-        # 获取男性信息
-        try:
-            year = int(self.male_year.currentText())
-            month = int(self.male_month.currentText())
-            day = int(self.male_day.currentText())
-            time_text = self.male_time.currentText()
-            
-            # 从时辰文本中提取对应的小时
-            hour_map = {
-                '子时': 0, '丑时': 2, '寅时': 4, '卯时': 6, 
-                '辰时': 8, '巳时': 10, '午时': 12, '未时': 14, 
-                '申时': 16, '酉时': 18, '戌时': 20, '亥时': 22
-            }
-            for key in hour_map:
-                if key in time_text:
-                    hour = hour_map[key]
-                    break
-            
-            # 计算八字
-            bazi = calculate_bazi(year, month, day, hour, '男')
-            
-            # 计算八字命理分析
-            bazi_analysis = analyze_bazi(bazi)
-            
-            # 生成紫微斗数报告
-            ziwei_report = generate_ziwei_report(year, month, day, hour, '男')
-            
-            # 生成化解建议
-            solution_text = "男性命理化解建议\n"
-            solution_text += "=" * 50 + "\n\n"
-            
-            # 八字五行要点
-            solution_text += "【八字五行要点】\n"
-            solution_text += f"日元: {bazi_analysis['日元']}({bazi_analysis['日元五行']})\n"
-            solution_text += "五行分布: "
-            for element, count in bazi_analysis['五行分布'].items():
-                solution_text += f"{element}{count} "
-            solution_text += "\n"
-            solution_text += f"强弱势分析: {bazi_analysis['强弱势分析']}\n\n"
-            
-            # 紫微斗数要点
-            solution_text += "【紫微斗数要点】\n"
-            solution_text += f"命宫位置: {ziwei_report['命宫位置']}\n"
-            solution_text += f"命宫主星: {'、'.join(ziwei_report['命宫主星']) if ziwei_report['命宫主星'] else '无主星'}\n"
-            solution_text += f"身宫位置: {ziwei_report['身宫位置']}\n\n"
-            
-            # 针对性化解建议
-            solution_text += "【五行化解建议】\n"
-            
-            # 根据五行强弱给出具体建议
-            strong_element = max(bazi_analysis['五行分布'].items(), key=lambda x: x[1])[0]
-            weak_element = min(bazi_analysis['五行分布'].items(), key=lambda x: x[1])[0]
-            
-            solution_text += f"1. 您的八字中{strong_element}元素较强，建议适当平衡，可通过以下方式：\n"
-            if strong_element == '木':
-                solution_text += "   - 穿着上可多选择白色、金色系衣物（金克木）\n"
-                solution_text += "   - 居住环境中可增加金属类装饰物品\n"
-            elif strong_element == '火':
-                solution_text += "   - 穿着上可多选择黑色、蓝色系衣物（水克火）\n"
-                solution_text += "   - 居住环境中可增加水元素装饰\n"
-            elif strong_element == '土':
-                solution_text += "   - 穿着上可多选择绿色、青色系衣物（木克土）\n"
-                solution_text += "   - 居住环境中可增加植物\n"
-            elif strong_element == '金':
-                solution_text += "   - 穿着上可多选择红色、紫色系衣物（火克金）\n"
-                solution_text += "   - 居住环境中可增加暖色调装饰\n"
-            elif strong_element == '水':
-                solution_text += "   - 穿着上可多选择黄色、棕色系衣物（土克水）\n"
-                solution_text += "   - 居住环境中可增加陶瓷、石材装饰\n"
-            
-            solution_text += f"2. 您的八字中{weak_element}元素较弱，建议适当补充：\n"
-            if weak_element == '木':
-                solution_text += "   - 穿着上可多选择绿色、青色系衣物\n"
-                solution_text += "   - 多接触大自然，种植绿色植物\n"
-            elif weak_element == '火':
-                solution_text += "   - 穿着上可多选择红色、紫色系衣物\n"
-                solution_text += "   - 适当增加室内光线，使用暖色灯光\n"
-            elif weak_element == '土':
-                solution_text += "   - 穿着上可多选择黄色、棕色系衣物\n"
-                solution_text += "   - 可佩戴玉石、玛瑙等土属性饰品\n"
-            elif weak_element == '金':
-                solution_text += "   - 穿着上可多选择白色、金色系衣物\n"
-                solution_text += "   - 可佩戴金银饰品增强金气\n"
-            elif weak_element == '水':
-                solution_text += "   - 穿着上可多选择黑色、蓝色系衣物\n"
-                solution_text += "   - 可在家中放置鱼缸或水培植物\n"
-            
-            solution_text += "\n【紫微斗数化解建议】\n"
-            # 根据紫微斗数给出建议
-            life_palace_stars = ziwei_report.get('命宫主星', '')
-            if '紫微' in life_palace_stars:
-                solution_text += "1. 紫微坐命者，宜保持谦逊，避免过于自我，多倾听他人意见。\n"
-            elif '贪狼' in life_palace_stars:
-                solution_text += "1. 贪狼坐命者，宜控制欲望，专注于目标，避免三心二意。\n"
-            elif '七杀' in life_palace_stars:
-                solution_text += "1. 七杀坐命者，宜培养耐心，避免冲动行事，学会冷静思考。\n"
-            elif '破军' in life_palace_stars:
-                solution_text += "1. 破军坐命者，宜稳定情绪，避免变化过大，培养持之以恒的精神。\n"
-            elif '廉贞' in life_palace_stars:
-                solution_text += "1. 廉贞坐命者，宜保持正直，避免虚荣，培养务实作风。\n"
-            elif '天府' in life_palace_stars:
-                solution_text += "1. 天府坐命者，宜发挥领导才能，同时保持节俭，避免铺张浪费。\n"
-            else:
-                solution_text += "1. 根据您的命宫主星特点，建议保持积极心态，发挥自身优势。\n"
-            
-            solution_text += "2. 定期关注自己的运势变化，在不利年份采取保守策略。\n"
-            solution_text += "3. 保持良好的心态和健康的生活习惯，是最根本的化解方法。\n"
-            
-            # 显示结果
-            self.male_analysis_text.setPlainText(solution_text)
-            
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'生成建议过程中出现错误: {str(e)}')
+        p = self._read_person('male')
+        self._stream_to('male', self.male_analysis_text,
+                        lambda: person_solution_sections(p['year'], p['month'], p['day'], p['hour'], '男'),
+                        error_prefix='生成建议过程中出现错误')
     
     def generate_female_solution(self):
-        # 获取女性信息
-        try:
-            year = int(self.female_year.currentText())
-            month = int(self.female_month.currentText())
-            day = int(self.female_day.currentText())
-            time_text = self.female_time.currentText()
-            
-            # 从时辰文本中提取对应的小时
-            hour_map = {
-                '子时': 0, '丑时': 2, '寅时': 4, '卯时': 6, 
-                '辰时': 8, '巳时': 10, '午时': 12, '未时': 14, 
-                '申时': 16, '酉时': 18, '戌时': 20, '亥时': 22
-            }
-            for key in hour_map:
-                if key in time_text:
-                    hour = hour_map[key]
-                    break
-            
-            # 计算八字
-            bazi = calculate_bazi(year, month, day, hour, '女')
-            
-            # 计算八字命理分析
-            bazi_analysis = analyze_bazi(bazi)
-            
-            # 生成紫微斗数报告
-            ziwei_report = generate_ziwei_report(year, month, day, hour, '女')
-            
-            # 生成化解建议
-            solution_text = "女性命理化解建议\n"
-            solution_text += "=" * 50 + "\n\n"
-            
-            # 八字五行要点
-            solution_text += "【八字五行要点】\n"
-            solution_text += f"日元: {bazi_analysis['日元']}({bazi_analysis['日元五行']})\n"
-            solution_text += "五行分布: "
-            for element, count in bazi_analysis['五行分布'].items():
-                solution_text += f"{element}{count} "
-            solution_text += "\n"
-            solution_text += f"强弱势分析: {bazi_analysis['强弱势分析']}\n\n"
-            
-            # 紫微斗数要点
-            solution_text += "【紫微斗数要点】\n"
-            solution_text += f"命宫位置: {ziwei_report['命宫位置']}\n"
-            solution_text += f"命宫主星: {'、'.join(ziwei_report['命宫主星']) if ziwei_report['命宫主星'] else '无主星'}\n"
-            solution_text += f"身宫位置: {ziwei_report['身宫位置']}\n\n"
-            
-            # 针对性化解建议
-            solution_text += "【五行化解建议】\n"
-            
-            # 根据五行强弱给出具体建议
-            strong_element = max(bazi_analysis['五行分布'].items(), key=lambda x: x[1])[0]
-            weak_element = min(bazi_analysis['五行分布'].items(), key=lambda x: x[1])[0]
-            
-            solution_text += f"1. 您的八字中{strong_element}元素较强，建议适当平衡，可通过以下方式：\n"
-            if strong_element == '木':
-                solution_text += "   - 穿着上可多选择白色、金色系衣物（金克木）\n"
-                solution_text += "   - 居住环境中可增加金属类装饰物品\n"
-            elif strong_element == '火':
-                solution_text += "   - 穿着上可多选择黑色、蓝色系衣物（水克火）\n"
-                solution_text += "   - 居住环境中可增加水元素装饰\n"
-            elif strong_element == '土':
-                solution_text += "   - 穿着上可多选择绿色、青色系衣物（木克土）\n"
-                solution_text += "   - 居住环境中可增加植物\n"
-            elif strong_element == '金':
-                solution_text += "   - 穿着上可多选择红色、紫色系衣物（火克金）\n"
-                solution_text += "   - 居住环境中可增加暖色调装饰\n"
-            elif strong_element == '水':
-                solution_text += "   - 穿着上可多选择黄色、棕色系衣物（土克水）\n"
-                solution_text += "   - 居住环境中可增加陶瓷、石材装饰\n"
-            
-            solution_text += f"2. 您的八字中{weak_element}元素较弱，建议适当补充：\n"
-            if weak_element == '木':
-                solution_text += "   - 穿着上可多选择绿色、青色系衣物\n"
-                solution_text += "   - 多接触大自然，种植绿色植物\n"
-            elif weak_element == '火':
-                solution_text += "   - 穿着上可多选择红色、紫色系衣物\n"
-                solution_text += "   - 适当增加室内光线，使用暖色灯光\n"
-            elif weak_element == '土':
-                solution_text += "   - 穿着上可多选择黄色、棕色系衣物\n"
-                solution_text += "   - 可佩戴玉石、玛瑙等土属性饰品\n"
-            elif weak_element == '金':
-                solution_text += "   - 穿着上可多选择白色、金色系衣物\n"
-                solution_text += "   - 可佩戴金银饰品增强金气\n"
-            elif weak_element == '水':
-                solution_text += "   - 穿着上可多选择黑色、蓝色系衣物\n"
-                solution_text += "   - 可在家中放置鱼缸或水培植物\n"
-            
-            solution_text += "\n【紫微斗数化解建议】\n"
-            # 根据紫微斗数给出建议
-            life_palace_stars = ziwei_report.get('命宫主星', '')
-            if '紫微' in life_palace_stars:
-                solution_text += "1. 紫微坐命者，宜保持谦逊，避免过于自我，多倾听他人意见。\n"
-            elif '贪狼' in life_palace_stars:
-                solution_text += "1. 贪狼坐命者，宜控制欲望，专注于目标，避免三心二意。\n"
-            elif '七杀' in life_palace_stars:
-                solution_text += "1. 七杀坐命者，宜培养耐心，避免冲动行事，学会冷静思考。\n"
-            elif '破军' in life_palace_stars:
-                solution_text += "1. 破军坐命者，宜稳定情绪，避免变化过大，培养持之以恒的精神。\n"
-            elif '廉贞' in life_palace_stars:
-                solution_text += "1. 廉贞坐命者，宜保持正直，避免虚荣，培养务实作风。\n"
-            elif '天府' in life_palace_stars:
-                solution_text += "1. 天府坐命者，宜发挥领导才能，同时保持节俭，避免铺张浪费。\n"
-            elif '太阴' in life_palace_stars:
-                solution_text += "1. 太阴坐命者，宜保持乐观，避免多愁善感，培养积极心态。\n"
-            elif '天同' in life_palace_stars:
-                solution_text += "1. 天同坐命者，宜积极进取，避免懒散，培养上进心。\n"
-            else:
-                solution_text += "1. 根据您的命宫主星特点，建议保持积极心态，发挥自身优势。\n"
-            
-            solution_text += "2. 定期关注自己的运势变化，在不利年份采取保守策略。\n"
-            solution_text += "3. 保持良好的心态和健康的生活习惯，是最根本的化解方法。\n"
-            
-            # 显示结果
-            self.female_analysis_text.setPlainText(solution_text)
-            
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'生成建议过程中出现错误: {str(e)}')
+        p = self._read_person('female')
+        self._stream_to('female', self.female_analysis_text,
+                        lambda: person_solution_sections(p['year'], p['month'], p['day'], p['hour'], '女'),
+                        error_prefix='生成建议过程中出现错误')
     
     def generate_couple_solution(self):
-        # 获取男性信息
-        try:
-            male_year = int(self.male_year.currentText())
-            male_month = int(self.male_month.currentText())
-            male_day = int(self.male_day.currentText())
-            male_time_text = self.male_time.currentText()
-            
-            # 获取女性信息
-            female_year = int(self.female_year.currentText())
-            female_month = int(self.female_month.currentText())
-            female_day = int(self.female_day.currentText())
-            female_time_text = self.female_time.currentText()
-            
-            # 从时辰文本中提取对应的小时
-            hour_map = {
-                '子时': 0, '丑时': 2, '寅时': 4, '卯时': 6, 
-                '辰时': 8, '巳时': 10, '午时': 12, '未时': 14, 
-                '申时': 16, '酉时': 18, '戌时': 20, '亥时': 22
-            }
-            
-            for key in hour_map:
-                if key in male_time_text:
-                    male_hour = hour_map[key]
-                    break
-            
-            for key in hour_map:
-                if key in female_time_text:
-                    female_hour = hour_map[key]
-                    break
-            
-            # 计算两人八字
-            male_bazi = calculate_bazi(male_year, male_month, male_day, male_hour, '男')
-            female_bazi = calculate_bazi(female_year, female_month, female_day, female_hour, '女')
-            
-            # 计算配对结果
-            compatibility = calculate_compatibility(male_bazi, female_bazi)
-            
-            # 计算双方八字五行分析
-            male_bazi_analysis = analyze_bazi(male_bazi)
-            female_bazi_analysis = analyze_bazi(female_bazi)
-            
-            # 生成紫微斗数报告
-            male_ziwei = generate_ziwei_report(male_year, male_month, male_day, male_hour, '男')
-            female_ziwei = generate_ziwei_report(female_year, female_month, female_day, female_hour, '女')
-            
-            # 生成配对化解建议
-            solution_text = "配对关系化解建议\n"
-            solution_text += "=" * 50 + "\n\n"
-            
-            # 配对要点
-            solution_text += "【配对要点】\n"
-            solution_text += f"配对指数: {compatibility.get('配对指数', '未知')}\n"
-            solution_text += f"八字合婚关系: {compatibility.get('合婚关系', '未知')}\n"
-            solution_text += f"男方日元: {male_bazi_analysis['日元']}({male_bazi_analysis['日元五行']})\n"
-            solution_text += f"女方日元: {female_bazi_analysis['日元']}({female_bazi_analysis['日元五行']})\n"
-            solution_text += f"男方命宫主星: {'、'.join(male_ziwei['命宫主星']) if male_ziwei['命宫主星'] else '无主星'}\n"
-            solution_text += f"女方命宫主星: {'、'.join(female_ziwei['命宫主星']) if female_ziwei['命宫主星'] else '无主星'}\n"
-
-            # 八字五行化解建议
-            solution_text += "【八字五行化解建议】\n"
-            
-            # 根据五行关系给出建议
-            element_relation = compatibility.get('合婚关系', '')
-            if element_relation in ['相生', '被相生']:
-                solution_text += "1. 两人五行相生，关系融洽，建议：\n"
-                solution_text += "   - 保持现有的相处模式，相互支持鼓励\n"
-                solution_text += "   - 在重要决策时，多听取对方意见\n"
-            elif element_relation in ['相克', '被相克']:
-                solution_text += "1. 两人五行相克，需要注意：\n"
-                solution_text += "   - 在沟通中保持耐心，避免正面冲突\n"
-                solution_text += "   - 可通过中间五行来调和关系（如木克土，可用火来调和）\n"
-                solution_text += "   - 在居住环境中，可放置两人都适合的风水物品\n"
-            else:
-                solution_text += "1. 两人五行无特殊关系，建议：\n"
-                solution_text += "   - 培养共同兴趣爱好，增进彼此了解\n"
-                solution_text += "   - 尊重对方的生活习惯和个人空间\n"
-            
-            # 紫微斗数化解建议
-            solution_text += "\n【紫微斗数化解建议】\n"
-            male_main_star = male_ziwei.get('命宫主星', '')
-            female_main_star = female_ziwei.get('命宫主星', '')
-            
-            # 根据主星组合给出建议
-            if ('紫微' in male_main_star and '天府' in female_main_star) or ('天府' in male_main_star and '紫微' in female_main_star):
-                solution_text += "1. 紫微天府组合，贵气十足，但需注意：\n"
-                solution_text += "   - 避免过于强势，学会相互包容\n"
-                solution_text += "   - 合理分工，发挥各自优势\n"
-            elif ('贪狼' in male_main_star and '七杀' in female_main_star) or ('七杀' in male_main_star and '贪狼' in female_main_star):
-                solution_text += "1. 贪狼七杀组合，个性强烈，建议：\n"
-                solution_text += "   - 培养沟通技巧，避免冲动争吵\n"
-                solution_text += "   - 寻找共同目标，增强协作精神\n"
-            elif ('天机' in male_main_star and '太阴' in female_main_star) or ('太阴' in male_main_star and '天机' in female_main_star):
-                solution_text += "1. 天机太阴组合，聪明睿智，建议：\n"
-                solution_text += "   - 多交流思想，分享心得\n"
-                solution_text += "   - 共同学习成长，提升自我\n"
-            else:
-                solution_text += "1. 根据两人主星特点，建议：\n"
-                solution_text += "   - 相互欣赏对方的优点，包容缺点\n"
-                solution_text += "   - 建立良好的沟通机制，及时解决问题\n"
-            
-            # 通用建议
-            solution_text += "\n【关系改善建议】\n"
-            solution_text += "1. 定期进行情感交流，分享生活点滴\n"
-            solution_text += "2. 共同参与一些有益身心健康的活动，增进感情\n"
-            solution_text += "3. 尊重彼此的家族文化和生活习惯\n"
-            solution_text += "4. 在重要节日或纪念日，用心准备小礼物或惊喜\n"
-            solution_text += "5. 如有需要，可咨询专业命理师进行更详细的合婚调理\n"
-            
-            # 显示结果
-            self.compatibility_text.setPlainText(solution_text)
-            
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'生成建议过程中出现错误: {str(e)}')
+        male, female = self._read_person('male'), self._read_person('female')
+        self._stream_to('couple', self.compatibility_text, lambda: couple_solution_sections(male, female),
+                        error_prefix='生成建议过程中出现错误')
+    
+    def set_knowledge_actions_enabled(self, enabled):
+        """后台导入期间禁用知识库的增删、刷新与查看，界面线程不去等待导入持有的知识库锁"""
+        for widget in (self.add_knowledge_btn, self.delete_knowledge_btn, self.refresh_knowledge_btn,
+                       self.category_combo, self.knowledge_table):
+            widget.setEnabled(enabled)
     
     def refresh_knowledge_table(self):
-        # 清空表格
-        self.knowledge_table.setRowCount(0)
-        
+        if self.knowledge_model is None:
+            return
         # 获取选择的分类
         selected_category = self.category_combo.currentText()
         
-        # 获取知识数据
-        if selected_category == '所有分类':
-            all_knowledge = []
-            for category in self.knowledge_base.get_all_categories():
-                for item in self.knowledge_base.get_knowledge_by_category(category):
-                    item['category'] = category
-                    all_knowledge.append(item)
-        else:
-            all_knowledge = self.knowledge_base.get_knowledge_by_category(selected_category)
-            for item in all_knowledge:
-                item['category'] = selected_category
-        
-        # 填充表格 - 只显示文件名和上传时间
-        for i, item in enumerate(all_knowledge):
-            self.knowledge_table.insertRow(i)
-            # 文件名（从标题获取）
-            self.knowledge_table.setItem(i, 0, QTableWidgetItem(item['title']))
-            # 上传时间
-            self.knowledge_table.setItem(i, 1, QTableWidgetItem(item['added_at']))
+        # 重新取条目 id 列表，表格只先加载第一批行
+        self.knowledge_model.set_category(None if selected_category == '所有分类' else selected_category)
     
-    def show_knowledge_detail(self, row, column):
+    def show_knowledge_detail(self, index):
         # 获取选中的知识项
-        item_id = self.knowledge_table.item(row, 0).text()
-        category = self.knowledge_table.item(row, 1).text()
-        
-        # 查找知识详情
-        for item in self.knowledge_base.get_knowledge_by_category(category):
-            if item['id'] == item_id:
-                # 显示详情
-                detail_text = f"标题: {item['title']}\n"
-                detail_text += f"分类: {category}\n"
-                detail_text += f"添加时间: {item['added_at']}\n"
-                if item.get('source'):
-                    detail_text += f"来源: {item['source']}\n"
-                detail_text += "\n" + "=" * 50 + "\n\n"
-                detail_text += item['content']
-                
-                self.knowledge_detail.setPlainText(detail_text)
-                break
+        item_id = self.knowledge_model.item_id(index.row())
+        item = self.knowledge_base.get_item(item_id)
+        if item is None:
+            return
+        
+        # 显示详情（正文在此时才从存储读取）
+        detail_text = f"标题: {item['title']}\n"
+        detail_text += f"分类: {self.knowledge_base.get_item_category(item_id)}\n"
+        detail_text += f"添加时间: {item['added_at']}\n"
+        if item.get('source'):
+            detail_text += f"来源: {item['source']}\n"
+        detail_text += "\n" + "=" * 50 + "\n\n"
+        detail_text += self.knowledge_base.get_item_content(item)
+        
+        self.knowledge_detail.setPlainText(detail_text)
     
     def add_knowledge_dialog(self):
         # 创建添加知识的对话框，使用QMainWindow以支持最大最小化功能
@@ -1093,78 +542,85 @@ class SuanMingApp(QMainWindow):
             # 如果没有匹配的关键词，返回默认分类
             return "未分类"
         
-        def auto_learn_from_files():
-            """自动从上传的文件中学习并形成逻辑算法"""
+        def auto_learn_from_files(item_ids):
+            """汇总刚入库文件的学习结果；词频、文档频率与共现统计已在入库时增量更新"""
             try:
                 print("开始自动学习文件内容...")
-                
-                # 获取最近上传的文件
-                recent_knowledge = []
-                for category, items in self.knowledge_base.knowledge.items():
-                    # 按添加时间排序，获取最近的文件
-                    recent_items = sorted(items, key=lambda x: x['added_at'], reverse=True)[:len(selected_files)]
-                    recent_knowledge.extend(recent_items)
-                
-                # 从最近上传的文件中学习
-                for item in recent_knowledge:
-                    category = next((cat for cat, items in self.knowledge_base.knowledge.items() 
-                                    for i in items if i['id'] == item['id']), "")
-                    
-                    if category and 'content' in item:
-                        # 调用knowledge_base的学习方法
-                        print(f"正在学习: {item['title']} (分类: {category})")
-                        keywords = self.knowledge_base.learn_from_text(item['content'], category, item['title'])
-                        print(f"提取的关键词: {keywords}")
-                
-                # 更新学习算法
-                self.knowledge_base.update_learning_algorithm()
-                
-                # 增强知识学习能力
-                self.knowledge_base.enhance_knowledge_learning()
-                
+                for item_id, learned in self.knowledge_base.learn_items(item_ids).items():
+                    item = self.knowledge_base.get_item(item_id)
+                    print(f"已学习: {item['title'] if item else item_id}")
+                    print(f"提取的关键词: {learned['keywords']}")
+                    print(f"相关概念: {learned['related']}")
                 print("自动学习完成，系统已从上传的文件中获取新的知识和逻辑。")
             except Exception as e:
                 print(f"自动学习过程中出错: {str(e)}")
         
         def add_knowledge():
-            try:
-                added_count = 0
-                # 如果选择了多个文件
-                if selected_files:
-                    for file_path in selected_files:
-                        file_ext = os.path.splitext(file_path)[1].lower()
-                        # 从文件名提取标题
-                        file_title = os.path.splitext(os.path.basename(file_path))[0]
-                        # 自动检测分类
-                        category = auto_detect_category(file_title)
-                        
-                        if file_ext == '.pdf':
-                            # 解析PDF文件
-                            self.knowledge_base.parse_pdf(file_path, category, file_title)
-                            added_count += 1
-                        elif file_ext == '.docx':
-                            # 解析DOCX文件
-                            self.knowledge_base.parse_docx(file_path, category, file_title)
-                            added_count += 1
-                        else:
-                            print(f"跳过不支持的文件格式: {file_path}")
-                else:
-                    QMessageBox.warning(dialog, '警告', '请选择文件!')
-                    return
-                
-                if added_count > 0:
+            if not selected_files:
+                QMessageBox.warning(dialog, '警告', '请选择文件!')
+                return
+            
+            # 解析、入库与自动学习都在后台执行，进度框可随时取消（当前文件回滚）
+            files = list(selected_files)
+            cancel_event = threading.Event()
+            progress_dialog = QProgressDialog('正在解析文件...', '取消', 0, 0, dialog)
+            progress_dialog.setWindowModality(Qt.WindowModal)
+            progress_dialog.setMinimumDuration(0)
+            progress_dialog.setAutoReset(False)
+            progress_dialog.setAutoClose(False)
+            progress_dialog.canceled.connect(cancel_event.set)
+            add_btn.setEnabled(False)
+            self.set_knowledge_actions_enabled(False)
+            results = []
+            
+            def ingest(task):
+                done = self.knowledge_base.ingest_files(
+                    files, category=auto_detect_category, progress=task.emit, cancel=cancel_event)
+                added = [result['item_id'] for result in done if result['status'] == 'added']
+                if not cancel_event.is_set() and added:
+                    task.emit('正在自动学习...')
                     # 触发自动学习功能
-                    auto_learn_from_files()
-                    
-                    # 刷新知识表格（只显示文件名和上传时间）
-                    self.refresh_knowledge_table()
-                    
+                    auto_learn_from_files(added)
+                results.extend(done)
+            
+            def on_progress(p):
+                if isinstance(p, str):
+                    progress_dialog.setLabelText(p)
+                    return
+                progress_dialog.setLabelText(
+                    f"({p.file_index + 1}/{p.file_count}) {os.path.basename(p.path)}  第 {p.pages_done}/{p.pages_total} 页")
+                progress_dialog.setMaximum(max(p.pages_total, 1))
+                progress_dialog.setValue(min(p.pages_done, max(p.pages_total, 1)))
+            
+            def on_done():
+                progress_dialog.close()
+                add_btn.setEnabled(True)
+                self.set_knowledge_actions_enabled(True)
+                for result in results:
+                    if result['status'] in ('unsupported', 'failed'):
+                        print(f"跳过文件 {result['path']}: {result['error'] or '不支持的文件格式'}")
+                added_count = sum(1 for result in results if result['status'] == 'added')
+                # 刷新知识表格（只显示文件名和上传时间）
+                self.refresh_knowledge_table()
+                if cancel_event.is_set():
+                    QMessageBox.information(dialog, '已取消', f'已取消上传，此前完成的 {added_count} 个文件已保存。')
+                elif added_count > 0:
                     QMessageBox.information(dialog, '成功', f'成功上传 {added_count} 个文件并自动学习!')
                     dialog.close()
+                elif any(result['status'] == 'skipped' for result in results):
+                    QMessageBox.information(dialog, '提示', '所选文件均已在知识库中，内容未变化，已跳过。')
+                    dialog.close()
                 else:
                     QMessageBox.warning(dialog, '警告', '没有成功上传任何文件!')
-            except Exception as e:
-                QMessageBox.critical(dialog, '错误', f'上传文件时出错: {str(e)}')
+            
+            def on_error(message):
+                progress_dialog.close()
+                add_btn.setEnabled(True)
+                self.set_knowledge_actions_enabled(True)
+                self.refresh_knowledge_table()
+                QMessageBox.critical(dialog, '错误', f'上传文件时出错: {message}')
+            
+            self.task_runner.submit('ingest', ingest, on_progress, on_done, on_error)
         
         file_btn.clicked.connect(select_files)
         add_btn.clicked.connect(add_knowledge)
@@ -1198,11 +654,10 @@ class SuanMingApp(QMainWindow):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         
         if reply == QMessageBox.Yes:
-            # 删除选中的知识项
-            for row in selected_rows:
-                item_id = self.knowledge_table.item(row.row(), 0).text()
-                category = self.knowledge_table.item(row.row(), 1).text()
-                self.knowledge_base.delete_knowledge(category, item_id)
+            # 删除选中的知识项（先取出 id，删除后行号会变）
+            item_ids = [self.knowledge_model.item_id(row.row()) for row in selected_rows]
+            for item_id in item_ids:
+                self.knowledge_base.delete_knowledge(None, item_id)
             
             # 刷新知识表格
             self.refresh_knowledge_table()
@@ -0,0 +1,129 @@
+"""
+合婚候选预筛索引
+
+合婚得分只取决于双方的日干、日支、年支和一个五行（候选为女方时看她的最强五行，
+为男方时看他的最弱五行），所以把候选池按 (日干, 日支, 年支, 五行) 分到 10*12*12*5 个桶里，
+同一桶内所有候选对同一位客户得分相同。查询时先用查表一次算出各桶得分（即桶内得分上界，
+这里恰好是精确值），按得分从高到低访问非空桶，凑够 k 人且下一档得分更低时即停止，
+不必逐个候选打分。
+
+候选可随时加入、移除；同分时按候选编号升序，与全量扫描的排序一致。
+"""
+import numpy as np
+
+from bazi_match import FEATURE_DTYPE, _scores
+
+N_BUCKETS = 10 * 12 * 12 * 5
+
+
+def _bucket_of(day_stem, day_branch, year_branch, element):
+    return ((int(day_stem) * 12 + int(day_branch)) * 12 + int(year_branch)) * 5 + int(element)
+
+
+def _bucket_features(element_field):
+    """每个桶的代表特征，下标即桶号"""
+    codes = np.arange(N_BUCKETS)
+    reps = np.zeros(N_BUCKETS, dtype=FEATURE_DTYPE)
+    reps['day_stem'] = codes // (12 * 12 * 5)
+    reps['day_branch'] = codes // (12 * 5) % 12
+    reps['year_branch'] = codes // 5 % 12
+    reps[element_field] = codes % 5
+    return reps
+
+
+class MatchIndex:
+    def __init__(self, candidate_gender='女'):
+        """candidate_gender 为候选池的性别，客户为另一方"""
+        self.candidate_gender = candidate_gender
+        # 女方候选看最强五行，男方候选看最弱五行
+        self._element_field = 'strong' if candidate_gender == '女' else 'weak'
+        self._reps = _bucket_features(self._element_field)
+        self._buckets = {}   # 桶号 -> {候选编号}
+        self._bucket_by_id = {}
+        self._features = {}
+        self._counts = np.zeros(N_BUCKETS, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._features)
+
+    def __contains__(self, cid):
+        return cid in self._features
+
+    def _bucket(self, feature):
+        return _bucket_of(feature['day_stem'], feature['day_branch'], feature['year_branch'],
+                          feature[self._element_field])
+
+    def add(self, cid, feature):
+        """加入一位候选；编号已存在时按新特征更新"""
+        if cid in self._features:
+            self.remove(cid)
+        feature = np.asarray(feature, dtype=FEATURE_DTYPE).reshape(())[()]
+        bucket = self._bucket(feature)
+        self._buckets.setdefault(bucket, set()).add(cid)
+        self._bucket_by_id[cid] = bucket
+        self._features[cid] = feature
+        self._counts[bucket] += 1
+
+    def add_many(self, ids, features):
+        for cid, feature in zip(ids, features):
+            self.add(cid, feature)
+
+    def remove(self, cid):
+        """移除一位候选，不存在时返回 False"""
+        bucket = self._bucket_by_id.pop(cid, None)
+        if bucket is None:
+            return False
+        del self._features[cid]
+        members = self._buckets[bucket]
+        members.discard(cid)
+        if not members:
+            del self._buckets[bucket]
+        self._counts[bucket] -= 1
+        return True
+
+    def bucket_scores(self, client):
+        """客户与各桶的得分 (N_BUCKETS,)"""
+        client = np.asarray(client, dtype=FEATURE_DTYPE).reshape(())
+        if self.candidate_gender == '女':
+            return _scores(client, self._reps)
+        return _scores(self._reps, client)
+
+    def query(self, client, k=10, min_score=0):
+        """
+        返回得分最高的 k 位候选 [(编号, 得分)]，只含得分不低于 min_score 者；
+        k 为 None 时返回达到 min_score 的全部候选
+        """
+        scores = self.bucket_scores(client)
+        live = np.flatnonzero((self._counts > 0) & (scores >= min_score))
+        if len(live) == 0:
+            return []
+        live = live[np.argsort(-scores[live], kind='stable')]
+        live_scores = scores[live]
+        # 按得分分档访问，一档内合并后按编号排序
+        bounds = np.flatnonzero(np.diff(live_scores)) + 1
+        result = []
+        for level in np.split(np.arange(len(live)), bounds):
+            score = int(live_scores[level[0]])
+            ids = sorted(cid for bucket in live[level] for cid in self._buckets[int(bucket)])
+            result.extend((cid, score) for cid in ids)
+            if k is not None and len(result) >= k:
+                return result[:k]
+        return result
+
+    def scan(self, client, k=10, min_score=0):
+        """全量逐个打分，结果应与 query 完全一致（用于校验）"""
+        if not self._features:
+            return []
+        ids = sorted(self._features)
+        feats = np.array([self._features[cid] for cid in ids], dtype=FEATURE_DTYPE)
+        client = np.asarray(client, dtype=FEATURE_DTYPE).reshape(())
+        scores = _scores(client, feats) if self.candidate_gender == '女' else _scores(feats, client)
+        order = np.argsort(-scores, kind='stable')
+        result = [(ids[i], int(scores[i])) for i in order if scores[i] >= min_score]
+        return result if k is None else result[:k]
+
+
+def verify_index(index, clients, k=10, min_score=0):
+    """逐个客户比较 query 与 scan，返回不一致的客户下标"""
+    return [i for i, client in enumerate(clients)
+            if index.query(client, k, min_score) != index.scan(client, k, min_score)]
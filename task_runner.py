@@ -0,0 +1,117 @@
+"""
+界面后台任务
+
+排盘、知识库检索、文件解析等计算放到 QThreadPool 中执行，结果经 Qt 信号回到界面线程。
+任务按“通道”管理（通常一个结果面板一个通道）：同一通道提交新任务或调用 cancel 时，
+旧任务被标记取消，它之后产出的结果一律丢弃，不会覆盖新结果。
+
+任务函数接收一个 Task 参数，可以：
+    - 返回可迭代对象，每产出一项就推送给界面（用于分段显示）；
+    - 或在执行过程中调用 task.emit(...) 主动推送（用于进度回调）。
+长时间运行的任务应定期检查 task.cancelled.is_set() 尽早退出。
+"""
+import threading
+import traceback
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _TaskSignals(QObject):
+    # 通道, 任务代号, 数据
+    section = pyqtSignal(str, int, object)
+    finished = pyqtSignal(str, int)
+    failed = pyqtSignal(str, int, str)
+
+
+class Task(QRunnable):
+    def __init__(self, signals, channel, generation, fn):
+        super().__init__()
+        self._signals = signals
+        self.channel = channel
+        self.generation = generation
+        self.fn = fn
+        self.cancelled = threading.Event()
+
+    def emit(self, payload):
+        """在工作线程中调用，把一段结果推送到界面线程"""
+        if not self.cancelled.is_set():
+            self._signals.section.emit(self.channel, self.generation, payload)
+
+    def run(self):
+        try:
+            result = self.fn(self)
+            if result is not None:
+                for payload in result:
+                    if self.cancelled.is_set():
+                        return
+                    self.emit(payload)
+            if not self.cancelled.is_set():
+                self._signals.finished.emit(self.channel, self.generation)
+        except Exception as e:
+            traceback.print_exc()
+            if not self.cancelled.is_set():
+                self._signals.failed.emit(self.channel, self.generation, str(e))
+
+
+class TaskRunner(QObject):
+    def __init__(self, parent=None, max_threads=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        if max_threads:
+            self.pool.setMaxThreadCount(max_threads)
+        self._signals = _TaskSignals()
+        self._signals.section.connect(self._on_section)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+        self._generation = 0
+        # 通道 -> (任务, on_section, on_done, on_error)
+        self._active = {}
+
+    def submit(self, channel, fn, on_section=None, on_done=None, on_error=None):
+        """
+        在后台执行 fn(task)，同一通道上仍在运行的旧任务会被取消。
+        回调均在界面线程中调用：on_section(数据)、on_done()、on_error(错误信息)
+        """
+        self.cancel(channel)
+        self._generation += 1
+        task = Task(self._signals, channel, self._generation, fn)
+        self._active[channel] = (task, on_section, on_done, on_error)
+        self.pool.start(task)
+        return task
+
+    def cancel(self, channel):
+        entry = self._active.pop(channel, None)
+        if entry is not None:
+            entry[0].cancelled.set()
+
+    def cancel_all(self):
+        for channel in list(self._active):
+            self.cancel(channel)
+
+    def is_running(self, channel):
+        return channel in self._active
+
+    def _current(self, channel, generation):
+        entry = self._active.get(channel)
+        if entry is None or entry[0].generation != generation:
+            return None
+        return entry
+
+    def _on_section(self, channel, generation, payload):
+        entry = self._current(channel, generation)
+        if entry is not None and entry[1] is not None:
+            entry[1](payload)
+
+    def _on_finished(self, channel, generation):
+        entry = self._current(channel, generation)
+        if entry is not None:
+            del self._active[channel]
+            if entry[2] is not None:
+                entry[2]()
+
+    def _on_failed(self, channel, generation, message):
+        entry = self._current(channel, generation)
+        if entry is not None:
+            del self._active[channel]
+            if entry[3] is not None:
+                entry[3](message)
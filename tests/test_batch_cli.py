@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+import batch_cli
+
+
+def _write_jsonl(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def test_output_columns_cover_all_rows(tmp_path):
+    src = tmp_path / 'births.jsonl'
+    _write_jsonl(src, [
+        {'year': 1990, 'month': 5, 'day': 6, 'hour': 10, 'gender': '男'},
+        {'year': 1991, 'month': 2, 'day': 3, 'hour': 4, 'gender': '女', 'name': '乙'},
+        {'year': 1991, 'month': 13, 'day': 3, 'hour': 4, 'gender': '女'},
+    ])
+    sections = ['pillars', 'analysis']
+    columns = batch_cli.output_columns(str(src), sections)
+    assert columns[:6] == ['year', 'month', 'day', 'hour', 'gender', 'name']
+    assert columns[-1] == 'error'
+    for record in batch_cli.read_records(str(src)):
+        assert set(batch_cli.compute_record(record, sections)) <= set(columns)
+
+
+def test_parquet_parts_share_schema(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    src = tmp_path / 'births.jsonl'
+    # 第一块全部出错（四柱列整列为空），第二块全部正常（error 列整列为空）
+    _write_jsonl(src, [
+        {'year': 1991, 'month': 13, 'day': 3, 'hour': 4, 'gender': '女'},
+        {'year': 1990, 'month': 5, 'day': 6, 'hour': 10, 'gender': '男'},
+    ])
+    out = tmp_path / 'charts.parquet'
+    assert batch_cli.run(str(src), str(out), ['pillars'], workers=1, chunk_size=1) == 2
+
+    schemas = [pq.read_schema(str(part)) for part in sorted(out.glob('part-*.parquet'))]
+    assert len(schemas) == 2 and schemas[0] == schemas[1]
+    assert all(field.type == pa.string() for field in schemas[0])
+    table = pq.read_table(str(out))
+    assert table.column('error').to_pylist()[1] is None
+    assert table.column('four_pillars').to_pylist()[0] is None
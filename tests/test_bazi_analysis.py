@@ -0,0 +1,28 @@
+import json
+import pickle
+
+from bazi_calculator import analyze_bazi, analyze_bazi_lazy, calculate_bazi, generate_fortune_report
+from bazi_text import ANALYSIS_FIELDS
+
+
+def test_analyze_bazi_returns_plain_dict():
+    info = calculate_bazi(1990, 5, 6, 10, '男')
+    analysis = analyze_bazi(info)
+    assert type(analysis) is dict
+    assert tuple(analysis) == ANALYSIS_FIELDS
+    assert json.loads(json.dumps(analysis, ensure_ascii=False)) == analysis
+
+
+def test_lazy_analysis_matches_dict():
+    for birth in [(1990, 5, 6, 10, '男'), (1985, 12, 31, 23, '女'), (2024, 2, 4, 0, '女')]:
+        info = calculate_bazi(*birth)
+        lazy = analyze_bazi_lazy(info)
+        assert lazy['五行分布'] == analyze_bazi(info)['五行分布']
+        assert lazy.to_dict() == analyze_bazi(info)
+        assert pickle.loads(pickle.dumps(lazy)).to_dict() == lazy.to_dict()
+
+
+def test_fortune_report_is_json_serializable():
+    report = generate_fortune_report(1990, 5, 6, 10, '男')
+    assert type(report['命理分析']) is dict
+    json.dumps(report, ensure_ascii=False)
@@ -0,0 +1,58 @@
+import chart_cache
+from bazi_calculator import generate_fortune_report
+from chart_cache import ChartCache, copy_report
+from ziwei_calculator import generate_ziwei_report
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ChartCache(maxsize=3)
+    for key in 'abc':
+        cache.put(key, key.upper())
+    assert cache.get('a') == 'A'          # a 变为最近使用，b 成为最旧
+    cache.put('d', 'D')
+    assert list(cache._data) == ['c', 'a', 'd']
+    assert cache.get('b') is None
+    cache.put('e', 'E')
+    assert list(cache._data) == ['a', 'd', 'e']
+    cache.resize(1)
+    assert list(cache._data) == ['e']
+    assert cache.stats()['evictions'] == 4
+
+
+def test_disk_tier_survives_restart_and_honours_version(tmp_path, monkeypatch):
+    path = str(tmp_path / 'cache' / 'chart_cache.sqlite')
+    key = (726000, 1, 2, 3, 4, '男')
+    ChartCache(persist_path=path).put(key, {'value': 1})
+
+    reopened = ChartCache(persist_path=path)
+    assert reopened.get(key) == {'value': 1}
+    assert reopened.stats()['disk_hits'] == 1
+
+    # 版本号递增后，旧条目不再命中，重新计算的结果按新版本写入
+    monkeypatch.setattr(chart_cache, 'CACHE_VERSION', chart_cache.CACHE_VERSION + 1)
+    upgraded = ChartCache(persist_path=path)
+    assert upgraded.get(key) is None
+    assert upgraded.get_or_compute(key, lambda: {'value': 2}) == {'value': 2}
+    assert ChartCache(persist_path=path).get(key) == {'value': 2}
+
+
+def test_copy_report_isolates_nested_values():
+    report = {'a': {'b': [1, {'c': 'x'}]}}
+    copied = copy_report(report)
+    copied['a']['b'][1]['c'] = 'y'
+    copied['a']['b'].append(2)
+    assert report == {'a': {'b': [1, {'c': 'x'}]}}
+
+
+def test_returned_reports_do_not_share_cached_state():
+    first = generate_fortune_report(1990, 5, 6, 10, '男')
+    expected = copy_report(first)
+    first['命理分析']['日元'] = '改'
+    first['大运'].clear()
+    first['基本信息']['八字'] = None
+    assert generate_fortune_report(1990, 5, 6, 10, '男') == expected
+
+    ziwei = generate_ziwei_report(1990, 5, 6, 10, '男')
+    expected = copy_report(ziwei)
+    ziwei.clear()
+    assert generate_ziwei_report(1990, 5, 6, 10, '男') == expected
@@ -0,0 +1,76 @@
+"""命盘紧凑编码：往返一致；篡改后重算 CRC 的载荷被拒绝，不会写入报告缓存"""
+import random
+import zlib
+
+import pytest
+
+import chart_codec
+from bazi_calculator import generate_fortune_report
+from chart_cache import report_cache
+from chart_codec import CHART_SIZE, decode_chart, decode_context, encode_chart, from_text, render_report, to_text
+from chart_context import chart_context
+from ziwei_calculator import generate_ziwei_report
+
+
+def forge(data, **changes):
+    """改写编码中的字段并重算 CRC"""
+    fields = list(chart_codec._BODY.unpack(data[:chart_codec._BODY.size]))
+    positions = {'hour': 3, 'year_gz': 4, 'month_gz': 5, 'lunar_month': 8, 'lunar_day': 9, 'time_zhi': 10,
+                 'yun_years': 11, 'ju': 16}
+    for name, value in changes.items():
+        fields[positions[name]] = value
+    body = chart_codec._BODY.pack(*fields)
+    return body + chart_codec._CRC.pack(zlib.crc32(body))
+
+
+def test_round_trip():
+    rng = random.Random(3)
+    births = [(1990, 5, 6, 10, '男'), (2000, 2, 29, 23, '女'), (1900, 1, 31, 0, '男'), (2100, 12, 31, 12, '女')]
+    births += [(rng.randint(1901, 2099), rng.randint(1, 12), rng.randint(1, 28), rng.randint(0, 23),
+                rng.choice('男女')) for _ in range(200)]
+    for birth in births:
+        ctx = chart_context(*birth)
+        data = encode_chart(ctx)
+        assert len(data) == CHART_SIZE
+        assert from_text(to_text(data)) == data
+        record = decode_chart(data)
+        assert (record.year, record.month, record.day, record.hour, record.gender) == birth
+        assert record.codes == ctx.codes and record.yun_start == tuple(ctx.yun_start)
+        assert decode_context(data) is ctx
+    report = render_report(encode_chart(1990, 5, 6, 10, '男'))
+    assert report['八字'] == generate_fortune_report(1990, 5, 6, 10, '男')
+    assert report['紫微'] == generate_ziwei_report(1990, 5, 6, 10, '男')
+
+
+@pytest.mark.parametrize('changes', [
+    {'yun_years': 4},          # 范围内但与历法不符
+    {'yun_years': 40},
+    {'year_gz': 200},
+    {'month_gz': 3},
+    {'hour': 24},
+    {'hour': 11},              # 与时柱、时辰不符
+    {'lunar_month': 13},
+    {'lunar_month': 0},
+    {'lunar_day': 31},
+    {'time_zhi': 12},
+    {'ju': 9},
+])
+def test_tampered_payload_rejected(changes):
+    report_cache.clear()
+    data = encode_chart(1990, 5, 6, 10, '男')
+    forged = forge(data, **changes)
+    assert forged != data
+    with pytest.raises(ValueError):
+        render_report(forged)
+    assert len(report_cache) == 0
+    # 正常排盘不受影响
+    assert generate_fortune_report(1990, 5, 6, 10, '男')['大运'] == render_report(data)['八字']['大运']
+
+
+def test_corrupted_payload_rejected():
+    data = bytearray(encode_chart(1990, 5, 6, 10, '男'))
+    with pytest.raises(ValueError):
+        decode_chart(bytes(data[:-1]))
+    data[5] ^= 1
+    with pytest.raises(ValueError):
+        decode_chart(bytes(data))
@@ -0,0 +1,21 @@
+import pytest
+
+import fast_calendar
+
+
+@pytest.mark.parametrize('start_year, end_year', [(1900, 1901), (2099, 2100)])
+def test_table_matches_lunar_python_at_boundaries(start_year, end_year):
+    assert fast_calendar.verify(start_year=start_year, end_year=end_year, verbose=False) == []
+
+
+def test_save_failure_warns(monkeypatch, tmp_path):
+    class Unsaveable:
+        def save(self, path):
+            raise OSError("只读文件系统")
+
+    calendar = Unsaveable()
+    monkeypatch.setattr(fast_calendar, '_calendar', None)
+    monkeypatch.setattr(fast_calendar, 'TABLE_FILE', str(tmp_path / 'missing.bin'))
+    monkeypatch.setattr(fast_calendar, 'build_table', lambda: calendar)
+    with pytest.warns(RuntimeWarning, match="历表写入失败"):
+        assert fast_calendar.get_calendar() is calendar
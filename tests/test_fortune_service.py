@@ -0,0 +1,53 @@
+"""命盘服务：/render 只接受与历法一致的编码，内部错误不向客户端透露异常信息"""
+import asyncio
+import json
+import zlib
+
+import pytest
+
+import chart_codec
+from chart_codec import encode_chart, to_text
+from fortune_service import FortuneService
+
+
+@pytest.fixture
+def service():
+    svc = FortuneService(workers=1)
+    yield svc
+    svc.close()
+
+
+def request(service, method, target, payload=None):
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    status, _, data, _ = asyncio.run(service.handle(method, target, body))
+    return status, json.loads(data)
+
+
+def forged_chart(changes):
+    data = encode_chart(1990, 5, 6, 10, '男')
+    fields = list(chart_codec._BODY.unpack(data[:chart_codec._BODY.size]))
+    for index, value in changes.items():
+        fields[index] = value
+    body = chart_codec._BODY.pack(*fields)
+    return to_text(body + chart_codec._CRC.pack(zlib.crc32(body)))
+
+
+def test_render_rejects_forged_payload(service):
+    status, result = request(service, 'POST', '/render', {'chart': to_text(encode_chart(1990, 5, 6, 10, '男'))})
+    assert status == 200
+    real_da_yun = result['八字']['大运']
+    # 起运改成 4 年（范围内、但与历法不符），干支序号改成 200
+    for changes in ({11: 4}, {4: 200}):
+        status, result = request(service, 'POST', '/render', {'chart': forged_chart(changes)})
+        assert status == 400, result
+    status, result = request(service, 'GET', '/fortune?year=1990&month=5&day=6&hour=10&gender=男')
+    assert status == 200 and result['大运'] == real_da_yun
+
+
+def test_internal_error_is_not_echoed(service, monkeypatch):
+    async def boom(endpoint, params):
+        raise RuntimeError('secret detail')
+    monkeypatch.setattr(service, 'compute', boom)
+    status, result = request(service, 'GET', '/fortune?year=1990&month=5&day=6&hour=10')
+    assert status == 500
+    assert 'secret' not in result['error'] and 'RuntimeError' not in result['error']
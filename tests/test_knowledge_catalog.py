@@ -0,0 +1,61 @@
+"""知识目录：随机增删后各种列表与按定义排序的结果一致，墓碑压缩后仍一致"""
+import random
+
+from knowledge_catalog import KnowledgeCatalog
+
+CATEGORIES = ('八字', '紫微斗数', '易经')
+
+
+def expected_ids(live, category, order_by, descending):
+    items = [(cat, item, seq) for item_id, (cat, item, seq) in live.items() if category in (None, cat)]
+    if order_by == 'title':
+        keys = sorted(((item['title'], item['id']) for _, item, _ in items), reverse=descending)
+        return [item_id for _, item_id in keys]
+    keys = sorted(((item['added_at'], seq, item['id']) for _, item, seq in items), reverse=descending)
+    return [item_id for _, _, item_id in keys]
+
+
+def test_random_add_remove_matches_reference():
+    rng = random.Random(11)
+    catalog = KnowledgeCatalog()
+    live = {}
+    seq = 0
+    for step in range(3000):
+        if live and rng.random() < 0.45:
+            item_id = rng.choice(list(live))
+            assert catalog.remove(item_id) is live.pop(item_id)[1]
+            assert catalog.remove(item_id) is None
+        else:
+            category = rng.choice(CATEGORIES)
+            item = {'id': catalog.new_id(category), 'title': f'文档{rng.randrange(50)}',
+                    # 多数按时间递增，偶尔补录更早的条目
+                    'added_at': f'2024-01-01T{step // 60 % 24:02d}:{step % 60:02d}' if rng.random() < 0.9
+                    else f'2023-{rng.randint(1, 12):02d}-01'}
+            catalog.add(category, item)
+            live[item['id']] = (category, item, seq)
+            seq += 1
+        if step % 50 == 0:
+            assert len(catalog) == len(live)
+            for category in CATEGORIES + (None, '堪舆'):
+                for order_by in ('added_at', 'title'):
+                    for descending in (True, False):
+                        assert catalog.ids(category, order_by, descending) == \
+                            expected_ids(live, category, order_by, descending)
+            newest = expected_ids(live, None, 'added_at', True)
+            assert [item['id'] for item in catalog.recent(7)] == newest[:7]
+            assert [item['id'] for item in catalog.recent()] == newest
+            assert catalog.recent(0) == []
+            assert sorted(catalog.category_names()) == sorted({cat for cat, _, _ in live.values()})
+    # 墓碑不会无限堆积
+    assert len(catalog._dead) * 2 <= len(catalog._by_time)
+
+
+def test_re_add_same_id_moves_to_newest():
+    catalog = KnowledgeCatalog()
+    catalog.add('八字', {'id': 'a', 'title': 'A', 'added_at': '2024-01-01'})
+    catalog.add('八字', {'id': 'b', 'title': 'B', 'added_at': '2024-01-02'})
+    catalog.add('易经', {'id': 'a', 'title': 'A2', 'added_at': '2024-01-03'})
+    assert catalog.ids() == ['a', 'b']
+    assert catalog.ids('八字') == ['b']
+    assert catalog.category('a') == '易经'
+    assert [item['title'] for item in catalog.recent()] == ['A2', 'B']
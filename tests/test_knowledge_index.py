@@ -0,0 +1,106 @@
+"""知识库索引：增删后倒排表与语料统计精确复原；SQLite 增量保存的行与整体重建一致"""
+import copy
+import json
+import random
+import sqlite3
+
+from benchmarks.cases import synthetic_entries
+from knowledge_base import KnowledgeBase
+from knowledge_index import KnowledgeIndex, SqliteIndexStore
+
+SHORT = '太短，不进索引'
+# 与合成语料不共用词汇的段落：删除后这些词的倒排表与统计行应整行消失
+UNIQUE = [
+    '量子计算机与区块链技术在天文望远镜观测中的应用研究，涉及算法、芯片与软件工程。' * 2,
+    '咖啡烘焙的温度曲线决定风味，浅烘保留果酸，深烘带来焦糖与巧克力的香气与口感。' * 2,
+    '马拉松训练需要循序渐进地增加跑量，配合力量练习、拉伸放松与充足的睡眠恢复体能。' * 2,
+    '城市地铁线路规划综合考虑客流、换乘站点、施工成本与沿线居民出行需求和噪声影响。' * 2,
+]
+
+
+def snapshot(index):
+    stats = index.stats
+    return copy.deepcopy({
+        'postings': index.postings,
+        'doc_len': index.doc_len,
+        'doc_terms': {item_id: sorted(terms) for item_id, terms in index.doc_terms.items()},
+        'titles': index.titles,
+        'title_docs': index.title_docs,
+        'title_chars': index.title_chars,
+        'skipped': index.skipped,
+        'total_len': index.total_len,
+        'n_docs': stats.n_docs,
+        'terms': {term: (stats.tf[i], stats.df[i]) for term, i in stats.vocab.items() if stats.df[i]},
+        'cooc': {stats.terms[a]: {stats.terms[b]: count for b, count in row.items()}
+                 for a, row in stats.cooc.items()},
+    })
+
+
+def test_add_then_remove_restores_index_and_stats():
+    entries = synthetic_entries(60)
+    index = KnowledgeIndex()
+    index.rebuild((f'a{i}', e['title'], e['content']) for i, e in enumerate(entries[:40]))
+    before = snapshot(index)
+    vocab = set(index.stats.vocab)
+    probes = list(index.postings)[:20]
+    related = {term: index.stats.related(term) for term in probes}
+
+    added = [(f'b{i}', e['title'], e['content']) for i, e in enumerate(entries[40:])]
+    added += [(f'c{i}', f'独有{i}', text) for i, text in enumerate(UNIQUE)] + [('b-short', '短', SHORT)]
+    for doc in added:
+        index.add(*doc)
+    assert snapshot(index) != before
+    for item_id, _, _ in reversed(added):
+        index.remove(item_id)
+
+    assert snapshot(index) == before
+    stats = index.stats
+    # 只由新增块带来的词计数归零
+    assert all(stats.tf[i] == stats.df[i] == 0 for term, i in stats.vocab.items() if term not in vocab)
+    assert {term: stats.related(term) for term in probes} == related
+
+
+def sqlite_rows(conn):
+    return {
+        'docs': sorted((item_id, title, length, terms and json.loads(terms)) for item_id, title, length, terms
+                       in conn.execute('SELECT id, title, length, terms FROM index_docs')),
+        'terms': sorted(map(tuple, conn.execute('SELECT term, tf, df FROM stats_terms'))),
+        'pairs': sorted(map(tuple, conn.execute('SELECT a, b, count FROM stats_pairs'))),
+        'meta': sorted(map(tuple, conn.execute('SELECT key, value FROM index_meta'))),
+    }
+
+
+def rebuilt(kb):
+    """由知识库现有的段落块整体重建一份索引，写入内存中的 SQLite"""
+    conn = sqlite3.connect(':memory:')
+    index = KnowledgeIndex(SqliteIndexStore(conn))
+    index.rebuild(kb._iter_index_docs())
+    index.save()
+    return index, conn
+
+
+def test_incremental_sqlite_rows_match_rebuild(tmp_path):
+    rng = random.Random(5)
+    entries = synthetic_entries(80)
+    kb = KnowledgeBase(str(tmp_path), backend='sqlite')
+    kb.add_knowledge_many(entries[:40])
+    unique_id = None
+    for round_, text in enumerate(UNIQUE):
+        # 每轮加入一篇独有词汇的文档，下一轮删掉，使部分词的 df 归零
+        if unique_id is not None:
+            kb.delete_knowledge(None, unique_id)
+        unique_id = kb.add_knowledge('易经', f'独有{round_}', text)
+        for _ in range(6):
+            entry = rng.choice(entries)
+            kb.add_knowledge(entry['category'], entry['title'], entry['content'])
+            kb.delete_knowledge(None, rng.choice(kb.list_item_ids()))
+        kb.add_knowledge('八字', '短', SHORT)
+
+        ref, ref_conn = rebuilt(kb)
+        assert sqlite_rows(kb.store.conn) == sqlite_rows(ref_conn), round_
+        # 重新打开时直接由增量保存的行还原，不触发重建
+        kb.store.close()
+        kb = KnowledgeBase(str(tmp_path), backend='sqlite')
+        assert kb.index.stats.n_docs == len(kb.index.doc_len)
+        assert snapshot(kb.index) == snapshot(ref), round_
+    kb.store.close()
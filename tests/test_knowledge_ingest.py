@@ -0,0 +1,57 @@
+"""文件批量导入：提取期间不持知识库锁；重复文件跳过，内容变化的同名文件替换旧条目"""
+import threading
+
+import docx
+
+from knowledge_base import KnowledgeBase
+
+TEXT = '甲木日主生于寅月，得令而旺，喜庚金修剪、丙火疏泄。正官透干，格局清纯。'
+
+
+def write_docx(path, paragraphs):
+    document = docx.Document()
+    for text in paragraphs:
+        document.add_paragraph(text)
+    document.save(path)
+    return str(path)
+
+
+def lock_is_free(kb):
+    """在另一个线程里试着取锁"""
+    result = []
+
+    def probe():
+        acquired = kb.lock.acquire(timeout=1)
+        if acquired:
+            kb.lock.release()
+        result.append(acquired)
+    thread = threading.Thread(target=probe)
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_ingest_does_not_hold_lock_while_extracting(tmp_path):
+    kb = KnowledgeBase(str(tmp_path / 'kb'))
+    paths = [write_docx(tmp_path / f'八字{i}.docx', [f'第{i}篇' + TEXT * 10, TEXT * 5]) for i in range(2)]
+    during = []
+
+    def progress(p):
+        if p.status == 'parsing':
+            during.append(lock_is_free(kb))
+    results = kb.ingest_files(paths, category='八字', workers=1, progress=progress)
+    assert [r['status'] for r in results] == ['added', 'added']
+    assert during and all(during)
+    for r in results:
+        assert kb.get_item_content(kb.get_item(r['item_id']))
+    assert kb.index.doc_ids() == kb.store.chunk_ids()
+
+    # 未改动的文件跳过；内容变了的同名文件导入新版本并删除旧条目
+    assert [r['status'] for r in kb.ingest_files(paths, category='八字', workers=1)] == ['skipped', 'skipped']
+    old_id = results[0]['item_id']
+    write_docx(tmp_path / '八字0.docx', [TEXT * 12])
+    replaced = kb.ingest_files(paths[:1], category='八字', workers=1)[0]
+    assert replaced['status'] == 'added' and kb.get_item(old_id) is None
+    assert len(kb.catalog) == 2
+    assert kb.index.doc_ids() == kb.store.chunk_ids()
+    kb.store.close()
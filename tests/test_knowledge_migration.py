@@ -0,0 +1,63 @@
+"""旧版 knowledge.json 迁移到 SQLite：重复 id 改用新 id，未切块的条目迁移时切块"""
+import json
+import os
+
+from knowledge_base import KnowledgeBase, chunk_text
+from knowledge_store import SqliteKnowledgeStore, migrate_json_to_sqlite
+
+TEXT = '八字，也叫四柱，是从历法查出的天干地支八个字。' * 30
+
+
+def write_legacy(path):
+    data = {
+        '八字基础': [
+            {'id': '八字基础_1_1700000000', 'title': '甲', 'added_at': '2023-11-14T22:13:20',
+             'chunks': [{'id': '八字基础_1_1700000000#0', 'page': 1, 'offset': 0, 'content': '第一份' + TEXT}]},
+            # 同一秒上传两次，旧方案给出相同 id
+            {'id': '八字基础_1_1700000000', 'title': '乙', 'added_at': '2023-11-14T22:13:20',
+             'chunks': [{'id': '八字基础_1_1700000000#0', 'page': 1, 'offset': 0, 'content': '第二份' + TEXT},
+                        {'id': '八字基础_1_1700000000#1', 'page': 2, 'offset': 10, 'content': '续' + TEXT}]},
+        ],
+        '命理分析': [
+            # 更早的版本：整段 content，没有 chunks
+            {'id': '命理分析_0_1600000000', 'title': '五行', 'added_at': '2020-09-13T12:26:40', 'content': TEXT * 3},
+        ],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    return data
+
+
+def test_migrate_duplicate_ids_and_unchunked(tmp_path):
+    json_path, db_path = str(tmp_path / 'knowledge.json'), str(tmp_path / 'knowledge.db')
+    write_legacy(json_path)
+    assert migrate_json_to_sqlite(json_path, db_path, chunk_text) == 3
+    assert not os.path.exists(db_path + '.migrating')
+
+    store = SqliteKnowledgeStore(db_path)
+    items = store.load_items()
+    ids = [item['id'] for _, item in items]
+    assert len(set(ids)) == 3
+    assert ids[0] == '八字基础_1_1700000000'
+    assert [item['title'] for _, item in items] == ['甲', '乙', '五行']
+    for _, item in items:
+        chunks = store.get_chunks(item['id'])
+        assert chunks
+        assert [chunk['id'] for chunk in chunks] == [f"{item['id']}#{seq}" for seq in range(len(chunks))]
+    renamed = store.get_chunks(ids[1])
+    assert renamed[0]['content'].startswith('第二份') and renamed[1]['page'] == 2
+    unchunked = store.get_chunks(ids[2])
+    assert ''.join(chunk['content'] for chunk in unchunked).replace('\n', '') == (TEXT * 3).replace('\n', '')
+    store.close()
+
+
+def test_knowledge_base_opens_legacy_store(tmp_path):
+    write_legacy(str(tmp_path / 'knowledge.json'))
+    kb = KnowledgeBase(str(tmp_path))
+    assert len(kb.catalog) == 3
+    assert kb.index.doc_ids() == kb.store.chunk_ids()
+    kb.store.close()
+    # 再次启动直接使用已迁移的数据库
+    kb = KnowledgeBase(str(tmp_path))
+    assert len(kb.catalog) == 3
+    kb.store.close()
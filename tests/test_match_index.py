@@ -0,0 +1,50 @@
+"""合婚预筛索引：随机增删后 MatchIndex.query 与全量扫描 MatchIndex.scan 的结果逐一相同"""
+import numpy as np
+import pytest
+
+from bazi_match import FEATURE_DTYPE
+from match_index import MatchIndex, verify_index
+
+
+def random_features(rng, n):
+    feats = np.zeros(n, dtype=FEATURE_DTYPE)
+    feats['day_stem'] = rng.integers(0, 10, n)
+    feats['day_branch'] = rng.integers(0, 12, n)
+    feats['year_branch'] = rng.integers(0, 12, n)
+    feats['weak'] = rng.integers(0, 5, n)
+    feats['strong'] = rng.integers(0, 5, n)
+    return feats
+
+
+@pytest.mark.parametrize('candidate_gender', ['女', '男'])
+def test_query_matches_scan_under_random_updates(candidate_gender):
+    rng = np.random.default_rng(7)
+    index = MatchIndex(candidate_gender)
+    clients = random_features(rng, 40)
+    next_id = 0
+    for _ in range(30):
+        # 新增一批，其中部分编号重复加入（按新特征更新）
+        n = int(rng.integers(1, 80))
+        ids = list(range(next_id, next_id + n))
+        next_id += n
+        if len(index):
+            ids += [int(cid) for cid in rng.choice(next_id - n, size=min(5, next_id - n), replace=False)]
+        index.add_many(ids, random_features(rng, len(ids)))
+        # 随机移除一部分，偶尔移除不存在的编号
+        for cid in rng.choice(next_id, size=min(next_id, int(rng.integers(0, 40))), replace=False):
+            index.remove(int(cid))
+        assert index.remove(next_id + 1) is False
+
+        for k, min_score in ((10, 0), (1, 0), (None, 75), (50, 60)):
+            assert verify_index(index, clients, k, min_score) == []
+
+
+def test_empty_index():
+    rng = np.random.default_rng(1)
+    index = MatchIndex()
+    client = random_features(rng, 1)[0]
+    assert index.query(client) == index.scan(client) == []
+    index.add(3, random_features(rng, 1)[0])
+    index.remove(3)
+    assert len(index) == 0
+    assert index.query(client) == index.scan(client) == []
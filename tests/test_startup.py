@@ -0,0 +1,10 @@
+"""启动预算：各入口模块的导入耗时不超过 benchmarks.startup.BUDGETS，不间接导入重型依赖，
+在放有旧版 knowledge.json 的目录中导入也不会迁移或建索引（升级后的首次启动）
+"""
+from benchmarks import startup
+
+
+def test_startup_budget():
+    lines = []
+    failures = startup.check(echo=lines.append)
+    assert failures == [], '\n'.join(lines)
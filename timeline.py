@@ -0,0 +1,132 @@
+"""
+流年 / 流月 / 流日时间线
+
+年、月、日的干支都是六十甲子上的等差序列，只有“从哪一刻起换柱”需要节气：
+年以立春为界，月以十二“节”为界，日以子夜为界。这里直接用 fast_calendar 的节气表
+定位区间起点，之后逐段顺推，按需产出，不构造任何 lunar_python 对象。
+
+传入命盘（四柱六十甲子序号，见 bazi_core.pillar_codes）时，每段还附带十神和事件编码：
+    十神      以日干论该段天干
+    事件编码  位掩码，见 EVENT_NAMES（冲日支、合日支、值太岁、冲太岁、贵人）
+
+    for p in iter_timeline(date(2025, 1, 1), date(2026, 1, 1), 'month', codes):
+        print(p.start, ganzhi_name(p.gz), TEN_GODS[p.ten_god], event_names(p.events))
+"""
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from bazi_core import TEN_GOD_MATRIX, NOBLEMAN_MASK
+from fast_calendar import get_calendar, _EPOCH_ORDINAL, _JDN_OFFSET
+
+UNITS = ('year', 'month', 'day')
+
+# 事件编码各位的含义
+EVENT_CHONG_DAY = 1      # 地支冲日支
+EVENT_HE_DAY = 2         # 地支与日支六合
+EVENT_TAI_SUI = 4        # 地支同年支（值太岁）
+EVENT_CHONG_TAI_SUI = 8  # 地支冲年支
+EVENT_NOBLEMAN = 16      # 地支为日干的天乙贵人
+EVENT_NAMES = ('冲日支', '合日支', '值太岁', '冲太岁', '贵人')
+
+# 区间 [start, end)，gz 为六十甲子序号；未给命盘时 ten_god 与 events 为 None
+Period = namedtuple('Period', ['unit', 'start', 'end', 'gz', 'ten_god', 'events'])
+
+_EPOCH = datetime(1900, 1, 1)
+
+
+def event_names(events):
+    """事件编码转名称列表"""
+    return [name for i, name in enumerate(EVENT_NAMES) if events & (1 << i)]
+
+
+def period_codes(gz, codes):
+    """某段干支相对命盘的 (十神, 事件编码)"""
+    me = codes[2] % 10
+    day_branch = codes[2] % 12
+    year_branch = codes[0] % 12
+    branch = gz % 12
+    events = 0
+    if (branch - day_branch) % 12 == 6:
+        events |= EVENT_CHONG_DAY
+    if (branch + day_branch) % 12 == 1:
+        events |= EVENT_HE_DAY
+    if branch == year_branch:
+        events |= EVENT_TAI_SUI
+    if (branch - year_branch) % 12 == 6:
+        events |= EVENT_CHONG_TAI_SUI
+    if NOBLEMAN_MASK[me] >> branch & 1:
+        events |= EVENT_NOBLEMAN
+    return TEN_GOD_MATRIX[me][gz % 10], events
+
+
+def _to_secs(moment):
+    if isinstance(moment, datetime):
+        delta = moment - _EPOCH
+        return delta.days * 86400 + delta.seconds
+    return (moment.toordinal() - _EPOCH_ORDINAL) * 86400
+
+
+def _to_datetime(secs):
+    return _EPOCH + timedelta(seconds=secs)
+
+
+def _boundaries(unit, cal):
+    """(边界时刻序列, 第 i 段的干支)：第 i 段从 bounds[i] 开始"""
+    if unit == 'year':
+        base = cal._li_chun_year0 - 4
+        return cal.li_chun, lambda i: (base + i) % 60
+    if unit == 'month':
+        base = cal._month_base + 1
+        return cal.jie, lambda i: (base + i) % 60
+    raise ValueError(f"未知的时间单位: {unit}")
+
+
+def iter_timeline(start, end, unit='year', codes=None):
+    """
+    逐段产出与 [start, end) 相交的年 / 月 / 日区间（Period），惰性计算。
+    start、end 为 date 或 datetime；codes 为命盘四柱序号，可省略。
+    """
+    if unit not in UNITS:
+        raise ValueError(f"未知的时间单位: {unit}")
+    cal = get_calendar()
+    lo, hi = _to_secs(start), _to_secs(end)
+    first = (cal._start_ordinal - _EPOCH_ORDINAL) * 86400
+    last = (cal._end_ordinal + 1 - _EPOCH_ORDINAL) * 86400
+    if lo < first or hi > last:
+        raise ValueError(f"时间超出历表范围({cal.start_year}-{cal.end_year}): {start} ~ {end}")
+
+    if unit == 'day':
+        day = lo // 86400
+        while day * 86400 < hi:
+            gz = (day + _EPOCH_ORDINAL + _JDN_OFFSET - 11) % 60
+            yield _period('day', day * 86400, (day + 1) * 86400, gz, codes)
+            day += 1
+        return
+
+    bounds, gz_of = _boundaries(unit, cal)
+    # 含 lo 的那一段从 bounds[i] 开始；表首之前的部分无从定界
+    i = max(bisect_right(bounds, lo) - 1, 0)
+    while i + 1 < len(bounds) and bounds[i] < hi:
+        yield _period(unit, bounds[i], bounds[i + 1], gz_of(i), codes)
+        i += 1
+
+
+def iter_years(first_year, last_year, codes=None):
+    """
+    按干支纪年逐年产出 first_year..last_year（含），每年从当年立春起至次年立春止。
+    """
+    cal = get_calendar()
+    bounds, gz_of = _boundaries('year', cal)
+    for year in range(first_year, last_year + 1):
+        i = year - cal._li_chun_year0
+        if not 0 <= i < len(bounds) - 1:
+            raise ValueError(f"年份超出历表范围({cal.start_year}-{cal.end_year}): {year}")
+        yield _period('year', bounds[i], bounds[i + 1], gz_of(i), codes)
+
+
+def _period(unit, start, end, gz, codes):
+    if codes is None:
+        return Period(unit, _to_datetime(start), _to_datetime(end), gz, None, None)
+    ten_god, events = period_codes(gz, codes)
+    return Period(unit, _to_datetime(start), _to_datetime(end), gz, ten_god, events)
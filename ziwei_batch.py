@@ -0,0 +1,147 @@
+"""
+紫微斗数批量排盘 (NumPy)
+
+ziwei_core 的各张表转成数组后，整批命盘的命身宫、五行局、主星辅星、四化与大限都是一次花式索引。
+农历月日直接从 fast_calendar 的农历表按日序号取出，全程不生成中文；需要展示时用 iter_labels。
+"""
+import numpy as np
+
+from fast_calendar import get_calendar
+from bazi_batch import _ordinals, _hours, _gender_codes
+from ziwei_core import (
+    PALACE_NAMES, ALL_STARS, HUA_NAMES, HUA_SHIFT, LIFE_PALACE, BODY_PALACE, LIFE_JU, ZIWEI_POS, STAR_LAYOUT,
+    PALACE_STARS, MONTH_POS, HOUR_POS, STEM_POS, FIRE_BELL_POS, MONTH_STARS, HOUR_STARS, STEM_STARS, FIRE_BELL_STARS, HUA_STARS, DA_XIAN,
+    star_names, aux_names, hua_codes, ju_label
+)
+from bazi_core import DI_ZHI
+
+# 每行一张命盘；stars 按地支 (子..亥) 存该宫的 32 位宫位字（星曜 + 四化，见 ziwei_core），
+# star_pos 按 ALL_STARS 顺序存各星所在地支，forward 为大限是否顺行
+ZIWEI_DTYPE = np.dtype([
+    ('life', np.uint8),
+    ('body', np.uint8),
+    ('ju', np.uint8),
+    ('ziwei', np.uint8),
+    ('year_stem', np.uint8),
+    ('forward', np.bool_),
+    ('stars', np.uint32, (12,)),
+    ('star_pos', np.uint8, (len(ALL_STARS),)),
+])
+
+_LIFE_PALACE = np.array(LIFE_PALACE, dtype=np.uint8)
+_BODY_PALACE = np.array(BODY_PALACE, dtype=np.uint8)
+_LIFE_JU = np.array(LIFE_JU, dtype=np.uint8)
+_ZIWEI_POS = np.array(ZIWEI_POS, dtype=np.uint8)
+_STAR_LAYOUT = np.array(STAR_LAYOUT, dtype=np.uint8)
+_PALACE_STARS = np.array(PALACE_STARS, dtype=np.uint32)
+_MONTH_POS = np.array(MONTH_POS, dtype=np.uint8)
+_HOUR_POS = np.array(HOUR_POS, dtype=np.uint8)
+_STEM_POS = np.array(STEM_POS, dtype=np.uint8)
+_FIRE_BELL_POS = np.array(FIRE_BELL_POS, dtype=np.uint8)
+_MONTH_STARS = np.array(MONTH_STARS, dtype=np.uint32)
+_HOUR_STARS = np.array(HOUR_STARS, dtype=np.uint32)
+_STEM_STARS = np.array(STEM_STARS, dtype=np.uint32)
+_FIRE_BELL_STARS = np.array(FIRE_BELL_STARS, dtype=np.uint32)
+_HUA_STARS = np.array(HUA_STARS, dtype=np.int64)
+_DA_XIAN = np.array(DA_XIAN, dtype=np.uint8)
+
+
+def ziwei_codes_batch(lunar_months, lunar_days, hour_idx, year_stems, year_branches, genders='男'):
+    """
+    由 (农历月, 农历日, 时辰, 年干, 年支) 数组批量排盘，返回 ZIWEI_DTYPE 结构化数组。
+    性别只影响大限顺逆，可为 '男'/'女' 或 1/0。
+    """
+    lunar_months = np.asarray(lunar_months, dtype=np.int64)
+    months = lunar_months % 12
+    days = np.asarray(lunar_days, dtype=np.int64)
+    hours = np.asarray(hour_idx, dtype=np.int64)
+    stems = np.asarray(year_stems, dtype=np.int64)
+    n = len(days)
+
+    result = np.zeros(n, dtype=ZIWEI_DTYPE)
+    life = _LIFE_PALACE[months, hours]
+    ju = _LIFE_JU[stems, life]
+    ziwei = _ZIWEI_POS[ju, days]
+    result['life'] = life
+    result['body'] = _BODY_PALACE[months, hours]
+    result['ju'] = ju
+    result['ziwei'] = ziwei
+    result['year_stem'] = stems
+    result['forward'] = (stems % 2 == 0) == _gender_codes(genders, n).astype(bool)
+
+    # 辅星：月系按本月，闰月同
+    aux_month = (np.abs(lunar_months) - 1) % 12
+    groups = np.asarray(year_branches, dtype=np.int64) % 4
+    stars = (_PALACE_STARS[ziwei] | _MONTH_STARS[aux_month] | _HOUR_STARS[hours] | _STEM_STARS[stems]
+             | _FIRE_BELL_STARS[groups, hours])
+    positions = np.concatenate([_STAR_LAYOUT[ziwei], _MONTH_POS[aux_month], _HOUR_POS[hours],
+                                _STEM_POS[stems], _FIRE_BELL_POS[groups, hours]], axis=1)
+    # 四化：找出四颗化星所在的宫，置上对应位
+    hua_pos = np.take_along_axis(positions, _HUA_STARS[stems], axis=1)
+    rows = np.arange(n)
+    for k in range(4):
+        stars[rows, hua_pos[:, k]] |= np.uint32(1 << (HUA_SHIFT + k))
+    result['stars'] = stars
+    result['star_pos'] = positions
+    return result
+
+
+def analyze_ziwei_batch(years, months, days, hours, genders='男'):
+    """批量紫微排盘，输入为公历年月日时（与性别）数组；日期须在历表范围内"""
+    cal = get_calendar()
+    years = np.asarray(years, dtype=np.int64)
+    hours = _hours(hours)
+    ordinals = _ordinals(years, np.asarray(months, dtype=np.int64), np.asarray(days, dtype=np.int64))
+    index = ordinals - cal._start_ordinal
+    if index.size and (index.min() < 0 or ordinals.max() > cal._end_ordinal):
+        raise ValueError(f"存在超出历表范围({cal.start_year}-{cal.end_year})的日期")
+
+    # 农历表：bit0-4 农历日，bit5-8 农历月，bit9 闰月，bit10 农历年=公历年-1
+    packed = np.frombuffer(cal.lunar_days, dtype=np.uint16)[index].astype(np.int64)
+    lunar_day = packed & 0x1F
+    lunar_month = (packed >> 5) & 0x0F
+    lunar_month = np.where(packed & 0x200, -lunar_month, lunar_month)
+    lunar_year = years - ((packed >> 10) & 1)
+    hour_idx = ((hours + 1) // 2) % 12
+    return ziwei_codes_batch(lunar_month, lunar_day, hour_idx, (lunar_year - 4) % 10, (lunar_year - 4) % 12, genders)
+
+
+def palace_matrix(result):
+    """(N, 12) 宫位字矩阵，列按 PALACE_NAMES 顺序（命宫、兄弟宫……）"""
+    columns = (result['life'][:, None].astype(np.int64) - np.arange(12)) % 12
+    return np.take_along_axis(result['stars'], columns, axis=1)
+
+
+def da_xian_ages(result):
+    """(N, 12) 各宫大限起始岁数，列按地支 (子..亥)"""
+    return _DA_XIAN[result['ju'], result['forward'].astype(np.int64), result['life']]
+
+
+def iter_labels(result):
+    """按行惰性地转换为与 analyze_ziwei 相同的命盘结构（不含总体评断）"""
+    for row in result:
+        life, body = int(row['life']), int(row['body'])
+        hua_stars = HUA_STARS[row['year_stem']]
+        da_xian = DA_XIAN[row['ju']][int(row['forward'])][life]
+        palaces = {}
+        for i, name in enumerate(PALACE_NAMES):
+            p_idx = (life - i) % 12
+            word = int(row['stars'][p_idx])
+            palaces[name] = {
+                'position': DI_ZHI[p_idx],
+                'stars': star_names(word),
+                'aux_stars': aux_names(word),
+                'sihua': [ALL_STARS[hua_stars[k]] + HUA_NAMES[k] for k in hua_codes(word)],
+                'da_xian': [da_xian[p_idx], da_xian[p_idx] + 9],
+                'is_body': p_idx == body
+            }
+        yield {
+            '命宫位置': DI_ZHI[life],
+            '身宫位置': DI_ZHI[body],
+            '五行局': ju_label(int(row['ju'])),
+            '命宫主星': star_names(int(row['stars'][life])),
+            '十二宫分析': palaces,
+            '四化': {HUA_NAMES[k]: ALL_STARS[hua_stars[k]] for k in range(4)},
+            '大限': sorted(({'palace': name, 'position': info['position'], 'ages': info['da_xian']}
+                           for name, info in palaces.items()), key=lambda d: d['ages'][0])
+        }
@@ -1,4 +1,9 @@
-from lunar_python import Solar, Lunar
+from chart_cache import report_cache, copy_report
+from chart_context import as_context
+from ziwei_core import (
+    PALACE_NAMES, PALACE_STEM, NA_YIN_JU, JU_ELEMENTS, JU_NUMBERS, ALL_STARS, HUA_NAMES, HUA_STARS, DA_XIAN,
+    star_names, aux_names, hua_codes, ziwei_chart, palace_word, ju_label, da_xian_forward
+)
 
 # 地支索引
 DI_ZHI = ['子', '丑', '寅', '卯', '辰', '巳', '午', '未', '申', '酉', '戌', '亥']
@@ -6,41 +11,17 @@ DI_ZHI = ['子', '丑', '寅', '卯', '辰', '巳', '午', '未', '申', '酉',
 TIAN_GAN = ['甲', '乙', '丙', '丁', '戊', '己', '庚', '辛', '壬', '癸']
 
 def get_palace_stems(year_stem):
-    """五虎遁起宫干"""
-    # 甲己之年丙作首，乙庚之岁戊为头，丙辛之岁寻庚上，丁壬壬寅顺行流，戊癸甲寅定局周。
-    start_map = {'甲': 2, '己': 2, '乙': 4, '庚': 4, '丙': 6, '辛': 6, '丁': 8, '壬': 8, '戊': 0, '癸': 0}
-    start_stem_idx = start_map.get(year_stem)
-    
-    palace_stems = []
-    for i in range(12):
-        # 寅位是索引2，但遁干是从寅位开始算的
-        # 我们索引0是子，所以需要调整偏移
-        # 寅(2) -> start_stem_idx, 卯(3) -> start_stem_idx+1 ...
-        # 子(0) -> start_stem_idx-2, 丑(1) -> start_stem_idx-1
-        stem_idx = (start_stem_idx + (i - 2)) % 10
-        palace_stems.append(TIAN_GAN[stem_idx])
-    return palace_stems
+    """五虎遁起宫干（查 ziwei_core 宫干表）"""
+    return [TIAN_GAN[s] for s in PALACE_STEM[TIAN_GAN.index(year_stem)]]
 
 def get_wuxing_ju(palace_stem, palace_branch_idx):
-    """定五行局"""
-    # 这里的逻辑基于命宫的天干地支
-    # 六十甲子纳音定局
-    # 简化对应关系
-    nai_yin_map = {
-        ('甲', '子'): '金', ('乙', '丑'): '金', ('丙', '寅'): '火', ('丁', '卯'): '火', ('戊', '辰'): '木', ('己', '巳'): '木',
-        ('庚', '午'): '土', ('辛', '未'): '土', ('壬', '申'): '金', ('癸', '酉'): '金', ('甲', '戌'): '火', ('乙', '亥'): '火',
-        ('丙', '子'): '水', ('丁', '丑'): '水', ('戊', '寅'): '土', ('己', '卯'): '土', ('庚', '辰'): '金', ('辛', '巳'): '金',
-        ('壬', '午'): '木', ('癸', '未'): '木', ('甲', '申'): '水', ('乙', '酉'): '水', ('丙', '戌'): '土', ('丁', '亥'): '土',
-        ('戊', '子'): '火', ('己', '丑'): '火', ('庚', '寅'): '木', ('辛', '卯'): '木', ('壬', '辰'): '水', ('癸', '巳'): '水',
-        ('甲', '午'): '金', ('乙', '未'): '金', ('丙', '申'): '火', ('丁', '酉'): '火', ('戊', '戌'): '木', ('己', '亥'): '木',
-        ('庚', '子'): '土', ('辛', '丑'): '土', ('壬', '寅'): '金', ('癸', '卯'): '金', ('甲', '辰'): '火', ('乙', '巳'): '火',
-        ('丙', '午'): '水', ('丁', '未'): '水', ('戊', '申'): '土', ('己', '酉'): '土', ('庚', '戌'): '金', ('辛', '亥'): '金',
-        ('壬', '子'): '木', ('癸', '丑'): '木', ('甲', '寅'): '水', ('乙', '卯'): '水', ('丙', '辰'): '土', ('丁', '巳'): '土',
-        ('戊', '午'): '火', ('己', '未'): '火', ('庚', '申'): '木', ('辛', '酉'): '木', ('壬', '戌'): '水', ('癸', '亥'): '水'
-    }
-    ju_name = nai_yin_map.get((palace_stem, DI_ZHI[palace_branch_idx]), '木')
-    ju_num_map = {'水': 2, '木': 3, '火': 4, '土': 5, '金': 6}
-    return ju_name, ju_num_map[ju_name]
+    """定五行局：命宫干支的纳音（查 ziwei_core 纳音表）"""
+    stem = TIAN_GAN.index(palace_stem)
+    if (stem - palace_branch_idx) % 2:
+        # 阴阳不配，不成干支
+        return '木', 3
+    ju = NA_YIN_JU[(6 * stem - 5 * palace_branch_idx) % 60]
+    return JU_ELEMENTS[ju], JU_NUMBERS[ju]
 
 # 主星五行属性
 STAR_ELEMENTS = {
@@ -49,91 +30,61 @@ STAR_ELEMENTS = {
     '七杀': '金', '破军': '水'
 }
 
-def analyze_ziwei(year, month, day, hour, gender, bazi_context=None):
-    """进行精准紫微斗数分析，并融入八字五行因子"""
-    solar = Solar.fromYmdHms(year, month, day, hour, 0, 0)
-    lunar = solar.getLunar()
-    
-    lunar_month = lunar.getMonth()
-    lunar_day = lunar.getDay()
-    # 时辰索引：子1, 丑2... 转换为 0-11
-    # lunar_python 的 getTimeZhiIndex 返回 0(子), 1(丑)...
-    hour_idx = lunar.getTimeZhiIndex()
-    
-    # 1. 定命身宫
-    # 命宫：寅宫起正月，顺数月，逆数时
-    life_palace_idx = (2 + (lunar_month - 1) - hour_idx) % 12
-    # 身宫：寅宫起正月，顺数月，顺数时
-    body_palace_idx = (2 + (lunar_month - 1) + hour_idx) % 12
-    
-    # 2. 起宫干
-    year_stem = lunar.getYearGan()
-    palace_stems = get_palace_stems(year_stem)
+def analyze_ziwei(year, month=None, day=None, hour=None, gender=None, bazi_context=None):
+    """进行精准紫微斗数分析，并融入八字五行因子；可传 ChartContext 代替年月日时与性别"""
+    ctx = as_context(year, month, day, hour, gender)
+    gender = ctx.gender
+    lunar_month = ctx.lunar_month
+    lunar_day = ctx.lunar_day
+    # 时辰索引 0(子), 1(丑)...
+    hour_idx = ctx.time_zhi
+    year_stem = (ctx.lunar_year - 4) % 10
+    year_branch = (ctx.lunar_year - 4) % 12
     
-    # 3. 定命身宫干
-    life_palace_stem = palace_stems[life_palace_idx]
-    
-    # 4. 定五行局
-    ju_name, ju_num = get_wuxing_ju(life_palace_stem, life_palace_idx)
-    
-    # 5. 定紫微星位置 (查表法的数学逼近)
-    quotient = lunar_day // ju_num
-    remainder = lunar_day % ju_num
-    
-    if remainder != 0:
-        m = ju_num - remainder
-        if m % 2 != 0:
-            ziwei_idx = (2 + quotient + 1 + m) % 12
-        else:
-            ziwei_idx = (2 + quotient + 1 - m) % 12
-    else:
-        ziwei_idx = (2 + quotient) % 12
-
-    # 6. 布十四主星
-    # 紫微星系：紫微、天机(逆1)、太阳(逆3)、武曲(逆4)、天同(逆5)、廉贞(逆8)
-    star_pos = {}
-    ziwei_stars = ['紫微', '天机', None, '太阳', '武曲', '天同', None, None, '廉贞']
-    for i, star in enumerate(ziwei_stars):
-        if star:
-            pos = (ziwei_idx - i) % 12
-            if pos not in star_pos: star_pos[pos] = []
-            star_pos[pos].append(star)
-            
-    # 天府星系：天府(找紫微对称)、太阴、贪狼、巨门、天相、天梁、七杀、破军
-    # 对称轴：寅申 (索引2和8)
-    # 天府与紫微在 寅申 轴上对称计算： (2 + 8) - ziwei_idx = 10 - ziwei_idx
-    tianfu_idx = (10 - ziwei_idx) % 12
-    tianfu_stars = ['天府', '太阴', '贪狼', '巨门', '天相', '天梁', '七杀', None, None, None, '破军']
-    for i, star in enumerate(tianfu_stars):
-        if star:
-            pos = (tianfu_idx + i) % 12
-            if pos not in star_pos: star_pos[pos] = []
-            star_pos[pos].append(star)
+    # 命身宫、五行局、紫微位置、辅星与四化均为查表，每宫汇成一个位字
+    life_palace_idx, body_palace_idx, ju, _, chart = ziwei_chart(
+        lunar_month, lunar_day, hour_idx, year_stem, year_branch)
+    hua_stars = HUA_STARS[year_stem]
+    forward = da_xian_forward(year_stem, gender)
+    da_xian = DA_XIAN[ju][forward][life_palace_idx]
 
-    # 7. 整理十二宫
-    names = ['命宫', '兄弟宫', '夫妻宫', '子女宫', '财帛宫', '疾厄宫', 
-             '迁移宫', '奴仆宫', '官禄宫', '田宅宫', '福德宫', '父母宫']
+    # 整理十二宫
     palace_analysis = {}
     for i in range(12):
         p_idx = (life_palace_idx - i) % 12
-        stars = star_pos.get(p_idx, [])
-        palace_analysis[names[i]] = {
+        word = palace_word(chart, p_idx)
+        palace_analysis[PALACE_NAMES[i]] = {
             'position': DI_ZHI[p_idx],
-            'stars': stars,
+            'stars': star_names(word),
+            'aux_stars': aux_names(word),
+            'sihua': [ALL_STARS[hua_stars[k]] + HUA_NAMES[k] for k in hua_codes(word)],
+            'da_xian': [da_xian[p_idx], da_xian[p_idx] + 9],
             'is_body': p_idx == body_palace_idx
         }
 
-    life_stars = star_pos.get(life_palace_idx, [])
+    life_stars = palace_analysis['命宫']['stars']
     
     return {
         '命宫位置': DI_ZHI[life_palace_idx],
         '身宫位置': DI_ZHI[body_palace_idx],
-        '五行局': f'{ju_name}局({ju_num})',
+        '五行局': ju_label(ju),
         '命宫主星': life_stars,
         '十二宫分析': palace_analysis,
+        '四化': {HUA_NAMES[k]: ALL_STARS[hua_stars[k]] for k in range(4)},
+        '大限': _da_xian_list(palace_analysis, life_palace_idx, forward),
         '总体评断': generate_overall_judgment(life_stars, gender, bazi_context)
     }
 
+def _da_xian_list(palace_analysis, life_palace_idx, forward):
+    """大限按先后排列：自命宫起，顺行依地支递增，逆行递减"""
+    step = 1 if forward else -1
+    result = []
+    for k in range(12):
+        name = PALACE_NAMES[(-k * step) % 12]
+        info = palace_analysis[name]
+        result.append({'palace': name, 'position': info['position'], 'ages': info['da_xian']})
+    return result
+
 def generate_overall_judgment(life_stars, gender, bazi_context):
     if not bazi_context:
         # 回退逻辑
@@ -167,5 +118,11 @@ def generate_overall_judgment(life_stars, gender, bazi_context):
         
     return judgment
 
-def generate_ziwei_report(year, month, day, hour, gender, bazi_context=None):
-    return analyze_ziwei(year, month, day, hour, gender, bazi_context)
\ No newline at end of file
+def generate_ziwei_report(year, month=None, day=None, hour=None, gender=None, bazi_context=None):
+    ctx = as_context(year, month, day, hour, gender)
+    # 总体评断只用到八字的这几项，一并纳入缓存键
+    context_key = None
+    if bazi_context:
+        context_key = tuple(bazi_context.get(k) for k in ('日元', '喜用五行', '日主强弱'))
+    key = ('ziwei',) + ctx.key + (context_key,)
+    return copy_report(report_cache.get_or_compute(key, lambda: analyze_ziwei(ctx, bazi_context=bazi_context)))
\ No newline at end of file
@@ -0,0 +1,233 @@
+"""
+紫微斗数整数编码核心
+
+一张命盘只取决于 (农历月, 农历日, 时辰, 年干)：月与时定命宫、身宫，年干起宫干，
+命宫干支纳音定五行局，局数与农历日定紫微星，紫微一定十四主星全部随之确定。
+这些关系在导入时全部展开成小表，排盘只做下标运算。
+
+辅星（六吉、六煞、禄存）按月、时、年干、年支各查一张表，四化按年干查表，大限由命宫、五行局与顺逆确定。
+
+编码：地支 0-11 (子..亥)、天干 0-9 (甲..癸)、五行局 0-4 (水二局..金六局)、
+星曜 0-26 按 ALL_STARS 顺序（0-13 主星、14-26 辅星）。每宫一个 32 位字：
+bit0-26 为宫内星曜，bit27-30 为该宫的 化禄/化权/化科/化忌，一张完整命盘即 12 个字。
+"""
+
+PALACE_NAMES = ('命宫', '兄弟宫', '夫妻宫', '子女宫', '财帛宫', '疾厄宫',
+                '迁移宫', '奴仆宫', '官禄宫', '田宅宫', '福德宫', '父母宫')
+
+# 紫微星系在前、天府星系在后，同宫多星时按此顺序排列
+MAIN_STARS = ('紫微', '天机', '太阳', '武曲', '天同', '廉贞',
+              '天府', '太阴', '贪狼', '巨门', '天相', '天梁', '七杀', '破军')
+
+# 紫微星系自紫微逆数的宫数，天府星系自天府顺数的宫数
+_ZIWEI_OFFSETS = (0, 1, 3, 4, 5, 8)
+_TIANFU_OFFSETS = (0, 1, 2, 3, 4, 5, 6, 10)
+
+JU_ELEMENTS = ('水', '木', '火', '土', '金')
+JU_NUMBERS = (2, 3, 4, 5, 6)
+_JU_CODE = {e: i for i, e in enumerate(JU_ELEMENTS)}
+# 六十甲子纳音五行，下标为六十甲子序号
+_NA_YIN = '金金火火木木土土金金火火水水土土金金木木水水土土火火木木水水金金火火木木土土金金火火水水土土金金木木水水土土火火木木水水'
+NA_YIN_JU = tuple(_JU_CODE[e] for e in _NA_YIN)
+
+
+def _palace_stem(year_stem, branch):
+    # 五虎遁：甲己丙寅、乙庚戊寅、丙辛庚寅、丁壬壬寅、戊癸甲寅，自寅宫顺排
+    return (year_stem % 5 * 2 + branch) % 10
+
+
+# 宫干 PALACE_STEM[年干][地支]
+PALACE_STEM = tuple(tuple(_palace_stem(s, b) for b in range(12)) for s in range(10))
+
+# 命宫、身宫 [农历月 % 12][时辰]：寅宫起正月，顺数月；命宫逆数时，身宫顺数时
+LIFE_PALACE = tuple(tuple((1 + m - h) % 12 for h in range(12)) for m in range(12))
+BODY_PALACE = tuple(tuple((1 + m + h) % 12 for h in range(12)) for m in range(12))
+
+# 五行局 LIFE_JU[年干][命宫地支]：命宫干支的纳音
+LIFE_JU = tuple(tuple(NA_YIN_JU[(6 * PALACE_STEM[s][b] - 5 * b) % 60] for b in range(12)) for s in range(10))
+
+
+def _ziwei_position(ju_num, lunar_day):
+    quotient, remainder = divmod(lunar_day, ju_num)
+    if remainder == 0:
+        return (2 + quotient) % 12
+    m = ju_num - remainder
+    if m % 2:
+        return (2 + quotient + 1 + m) % 12
+    return (2 + quotient + 1 - m) % 12
+
+
+# 紫微星所在地支 ZIWEI_POS[五行局][农历日]，下标 0 不用
+ZIWEI_POS = tuple(tuple(_ziwei_position(n, d) for d in range(31)) for n in JU_NUMBERS)
+
+
+def _layout(ziwei):
+    tianfu = (10 - ziwei) % 12  # 天府与紫微以寅申为轴对称
+    return tuple((ziwei - k) % 12 for k in _ZIWEI_OFFSETS) + tuple((tianfu + k) % 12 for k in _TIANFU_OFFSETS)
+
+
+# 十四主星所在地支 STAR_LAYOUT[紫微地支][主星]
+STAR_LAYOUT = tuple(_layout(z) for z in range(12))
+# 各地支宫内主星掩码 PALACE_STARS[紫微地支][地支]
+PALACE_STARS = tuple(
+    tuple(sum(1 << i for i, pos in enumerate(layout) if pos == b) for b in range(12))
+    for layout in STAR_LAYOUT
+)
+_MASK_NAMES = {mask: tuple(MAIN_STARS[i] for i in range(14) if mask >> i & 1)
+               for row in PALACE_STARS for mask in row}
+
+
+MAIN_MASK = (1 << 14) - 1
+
+
+def star_names(word):
+    """宫位字（或主星掩码）转主星名列表"""
+    return list(_MASK_NAMES[word & MAIN_MASK])
+
+
+def ziwei_codes(lunar_month, lunar_day, hour_idx, year_stem):
+    """
+    一张命盘的核心编码，返回 (命宫地支, 身宫地支, 五行局, 紫微地支)。
+    农历闰月沿用 lunar_python 的负数月份，取模后参与运算（与逐步推算的结果一致）。
+    """
+    m = lunar_month % 12
+    life = LIFE_PALACE[m][hour_idx]
+    ju = LIFE_JU[year_stem][life]
+    return life, BODY_PALACE[m][hour_idx], ju, ZIWEI_POS[ju][lunar_day]
+
+
+def ju_label(ju):
+    return f'{JU_ELEMENTS[ju]}局({JU_NUMBERS[ju]})'
+
+
+# ---- 辅星 ----
+
+AUX_STARS = ('左辅', '右弼', '文昌', '文曲', '地空', '地劫',
+             '天魁', '天钺', '禄存', '擎羊', '陀罗', '火星', '铃星')
+ALL_STARS = MAIN_STARS + AUX_STARS
+STAR_INDEX = {s: i for i, s in enumerate(ALL_STARS)}
+
+# 禄存：甲寅 乙卯 丙戊巳 丁己午 庚申 辛酉 壬亥 癸子；擎羊在前一位，陀罗在后一位
+_LU_CUN = (2, 3, 5, 6, 5, 6, 8, 9, 11, 0)
+# 天魁、天钺：甲戊庚牛羊，乙己鼠猴乡，丙丁猪鸡位，壬癸兔蛇藏，六辛逢马虎
+_KUI = (1, 0, 11, 11, 1, 0, 1, 6, 3, 3)
+_YUE = (7, 8, 9, 9, 7, 8, 7, 2, 5, 5)
+# 火星、铃星起子时之宫，按年支三合局（年支 % 4：申子辰、巳酉丑、寅午戌、亥卯未）
+_FIRE_START = (2, 3, 1, 9)
+_BELL_START = (10, 10, 3, 10)
+
+
+def _masks(positions, first):
+    """星曜所在地支 -> 12 宫掩码，first 为第一颗星的编号"""
+    return tuple(sum(1 << (first + i) for i, pos in enumerate(positions) if pos == b) for b in range(12))
+
+
+# 月系：左辅辰宫起正月顺数，右弼戌宫起正月逆数；下标为 (农历月 - 1) % 12，闰月按本月
+MONTH_POS = tuple(((4 + m) % 12, (10 - m) % 12) for m in range(12))
+# 时系：文昌戌宫起子时逆数，文曲辰宫起子时顺数，地空亥宫逆数，地劫亥宫顺数
+HOUR_POS = tuple(((10 - h) % 12, (4 + h) % 12, (11 - h) % 12, (11 + h) % 12) for h in range(12))
+# 年干系：天魁、天钺、禄存、擎羊、陀罗
+STEM_POS = tuple((_KUI[s], _YUE[s], _LU_CUN[s], (_LU_CUN[s] + 1) % 12, (_LU_CUN[s] - 1) % 12) for s in range(10))
+# 年支系：火星、铃星自起宫按时辰顺数，FIRE_BELL_POS[年支 % 4][时辰]
+FIRE_BELL_POS = tuple(tuple(((_FIRE_START[g] + h) % 12, (_BELL_START[g] + h) % 12) for h in range(12))
+                      for g in range(4))
+
+MONTH_STARS = tuple(_masks(p, 14) for p in MONTH_POS)
+HOUR_STARS = tuple(_masks(p, 16) for p in HOUR_POS)
+STEM_STARS = tuple(_masks(p, 20) for p in STEM_POS)
+FIRE_BELL_STARS = tuple(tuple(_masks(p, 25) for p in row) for row in FIRE_BELL_POS)
+
+# ---- 四化 ----
+
+HUA_NAMES = ('化禄', '化权', '化科', '化忌')
+HUA_SHIFT = 27
+_HUA = {
+    '甲': ('廉贞', '破军', '武曲', '太阳'), '乙': ('天机', '天梁', '紫微', '太阴'),
+    '丙': ('天同', '天机', '文昌', '廉贞'), '丁': ('太阴', '天同', '天机', '巨门'),
+    '戊': ('贪狼', '太阴', '右弼', '天机'), '己': ('武曲', '贪狼', '天梁', '文曲'),
+    '庚': ('太阳', '武曲', '太阴', '天同'), '辛': ('巨门', '太阳', '文曲', '文昌'),
+    '壬': ('天梁', '紫微', '左辅', '武曲'), '癸': ('破军', '巨门', '太阴', '贪狼')
+}
+# 四化星 HUA_STARS[年干] = (化禄, 化权, 化科, 化忌) 的星曜编号，均落在主星与月系、时系辅星之内
+HUA_STARS = tuple(tuple(STAR_INDEX[name] for name in _HUA[stem]) for stem in '甲乙丙丁戊己庚辛壬癸')
+
+# ---- 大限 ----
+
+
+def _da_xian(life, ju, forward):
+    step = 1 if forward else -1
+    return tuple(JU_NUMBERS[ju] + 10 * ((b - life) * step % 12) for b in range(12))
+
+
+# 各宫大限起始岁数 DA_XIAN[五行局][顺行][命宫地支][地支]：自命宫起局数岁，每宫十年，阳男阴女顺行
+DA_XIAN = tuple(tuple(tuple(_da_xian(life, ju, forward) for life in range(12)) for forward in (0, 1))
+                for ju in range(5))
+
+
+def da_xian_forward(year_stem, gender):
+    return (year_stem % 2 == 0) == (gender == '男')
+
+
+# ---- 整盘 ----
+# 一张命盘打包成一个整数：第 b 个 32 位字即地支 b 的宫位字。
+# 主星、月系、时系三部分各自连同落在其中的四化预先合成，排盘只需三次查表、两次按位或。
+
+WORD_BITS = 32
+WORD_MASK = (1 << WORD_BITS) - 1
+
+
+def _pack(words):
+    return sum(w << (WORD_BITS * b) for b, w in enumerate(words))
+
+
+def _hua_bits(year_stem, positions, first):
+    """编号 first 起的一组星中被年干化到的，置上所在宫的四化位"""
+    bits = 0
+    for k, star in enumerate(HUA_STARS[year_stem]):
+        if first <= star < first + len(positions):
+            bits |= 1 << (WORD_BITS * positions[star - first] + HUA_SHIFT + k)
+    return bits
+
+
+# CHART_MAIN[年干][紫微地支]：十四主星
+CHART_MAIN = tuple(tuple(_pack(PALACE_STARS[z]) | _hua_bits(s, STAR_LAYOUT[z], 0) for z in range(12))
+                   for s in range(10))
+# CHART_MONTH[年干][月]：左辅右弼与年干系诸星
+CHART_MONTH = tuple(tuple(_pack(MONTH_STARS[m]) | _pack(STEM_STARS[s]) | _hua_bits(s, MONTH_POS[m], 14)
+                          for m in range(12)) for s in range(10))
+# CHART_HOUR[年干][年支 % 4][时辰]：时系诸星与火铃
+CHART_HOUR = tuple(tuple(tuple(_pack(HOUR_STARS[h]) | _pack(FIRE_BELL_STARS[g][h]) | _hua_bits(s, HOUR_POS[h], 16)
+                               for h in range(12)) for g in range(4)) for s in range(10))
+
+
+def ziwei_chart(lunar_month, lunar_day, hour_idx, year_stem, year_branch):
+    """
+    完整命盘编码，返回 (命宫地支, 身宫地支, 五行局, 紫微地支, 整盘)。
+    整盘为打包整数，用 palace_word 取各宫宫位字；含主星、辅星与四化。
+    """
+    life, body, ju, ziwei = ziwei_codes(lunar_month, lunar_day, hour_idx, year_stem)
+    chart = (CHART_MAIN[year_stem][ziwei] | CHART_MONTH[year_stem][(abs(lunar_month) - 1) % 12]
+             | CHART_HOUR[year_stem][year_branch % 4][hour_idx])
+    return life, body, ju, ziwei, chart
+
+
+def palace_word(chart, branch):
+    return chart >> (WORD_BITS * branch) & WORD_MASK
+
+
+_AUX_NAMES = {}
+
+
+def aux_names(word):
+    """宫位字转辅星名列表"""
+    key = word >> 14 & 0x1FFF
+    names = _AUX_NAMES.get(key)
+    if names is None:
+        names = _AUX_NAMES[key] = tuple(AUX_STARS[i] for i in range(13) if key >> i & 1)
+    return list(names)
+
+
+def hua_codes(word):
+    """宫位字中的四化编码列表（0 化禄 … 3 化忌）"""
+    bits = word >> HUA_SHIFT
+    return [k for k in range(4) if bits >> k & 1] if bits else []